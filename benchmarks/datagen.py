@@ -0,0 +1,197 @@
+"""
+Generate a synthetic ACC data repository for benchmarking.
+
+    python benchmarks/datagen.py /tmp/acc-bench --experiments 100000
+
+The repository contains COMBINED.xlsx and data.Sheet1.csv with the same experiments, gbif.json and
+sources.bib for most - but not all - species and DOIs (so that lookups of the missing ones can be
+benchmarked against stub servers), a Taxon.tsv subset of the GBIF backbone and an ordering CSV.
+"""
+import csv
+import json
+import random
+import argparse
+import pathlib
+
+import openpyxl
+
+from clldutils.misc import slug
+
+from pyacc.validate import COLUMNS
+
+TAXON_COLUMNS = [
+    'taxonID', 'datasetID', 'parentNameUsageID', 'acceptedNameUsageID', 'originalNameUsageID',
+    'scientificName', 'scientificNameAuthorship', 'canonicalName', 'genericName',
+    'specificEpithet', 'infraspecificEpithet', 'taxonRank', 'nameAccordingTo', 'namePublishedIn',
+    'taxonomicStatus', 'nomenclaturalStatus', 'taxonRemarks', 'kingdom', 'phylum', 'class',
+    'order', 'family', 'genus']
+SYLLABLES = [
+    'ra', 'to', 'cu', 'mi', 'pe', 'lo', 'sa', 'ne', 'vi', 'do', 'ca', 'ti', 'mo', 'ru', 'la',
+    'phi', 'ster', 'gon', 'len', 'dri']
+KEY_OFFSET = 1000000
+# Number of taxa per parent taxon, from phylum down to species:
+FANOUT = [4, 5, 5, 5, 3]
+
+
+def word(i, suffix=''):
+    res = []
+    while True:
+        i, r = divmod(i, len(SYLLABLES))
+        res.append(SYLLABLES[r])
+        if not i:
+            break
+        i -= 1
+    return ''.join(res) + suffix
+
+
+def classification(i):
+    """
+    :return: `dict` with the classification of the `i`-th species.
+    """
+    res = dict(kingdom='Animalia')
+    genus = i // FANOUT[-1]
+    family = genus // FANOUT[3]
+    order = family // FANOUT[2]
+    klass = order // FANOUT[1]
+    phylum = klass // FANOUT[0]
+    res.update([
+        ('phylum', word(phylum, 'phyta').capitalize()),
+        ('class', word(klass, 'ia').capitalize()),
+        ('order', word(order, 'iformes').capitalize()),
+        ('family', word(family, 'idae').capitalize()),
+        ('genus', word(genus, 'us').capitalize()),
+    ])
+    res['species'] = '{} {}'.format(res['genus'], word(i, 'is'))
+    return res
+
+
+def gbif_metadata(i):
+    md = classification(i)
+    key = KEY_OFFSET + i
+    md.update(
+        key=key,
+        nubKey=key,
+        scientificName='{} (Author, 1900)'.format(md['species']),
+        canonicalName=md['species'],
+        rank='SPECIES',
+        taxonomicStatus='ACCEPTED')
+    return key, md
+
+
+def bibtex(doi, i):
+    return """@article{{{0},
+    author = {{Author, A. and Other, B.}},
+    title = {{A study of cognition {1}}},
+    journal = {{Journal of Comparative Cognition}},
+    year = {{{2}}},
+    doi = {{{3}}},
+    key = {{{3}}}
+}}
+""".format(slug(doi), i, 1970 + i % 50, doi)
+
+
+def generate(out, experiments=1000, seed=42, xlsx=True):
+    rand = random.Random(seed)
+    out = pathlib.Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    nspecies = max(10, experiments // 50)
+    ndois = max(5, experiments // 5)
+    # The dataset covers a random subset of the species in the backbone:
+    species = rand.sample(range(nspecies * 5), nspecies)
+
+    rows = []
+    for i in range(experiments):
+        sp = species[rand.randrange(nspecies) if i >= nspecies else i]
+        doi = rand.randrange(ndois)
+        rows.append([
+            'Review {}'.format(doi % 20),
+            'Reviewer{} Person{}'.format(doi % 20, doi % 7),
+            str(doi),
+            str(i),
+            'common {}'.format(word(sp)),
+            classification(sp)['species'],
+            '10.1000/acc.{}'.format(doi),
+            rand.choice(['physical', 'social']),
+            rand.choice(['memory', 'learning', 'planning', 'communication']),
+            'ability {}'.format(rand.randrange(40)),
+            str(rand.randrange(1, 100)),
+            rand.choice(['experimental', 'observational', 'other']),
+            str(1970 + doi % 50),
+            'NA',
+        ])
+    description = ['Description of {}'.format(c) for c in COLUMNS]
+
+    with (out / 'data.Sheet1.csv').open('w', encoding='utf8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerow(description)
+        writer.writerows(rows)
+
+    if xlsx:
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet('Sheet1')
+        for row in [COLUMNS, description] + rows:
+            ws.append(row)
+        wb.save(str(out / 'COMBINED.xlsx'))
+
+    # 2% of the species and DOIs are missing from gbif.json and sources.bib:
+    gbif = {}
+    for sp in species:
+        if rand.random() > 0.02:
+            gbif[classification(sp)['species']] = gbif_metadata(sp)
+    with (out / 'gbif.json').open('w', encoding='utf8') as f:
+        json.dump(gbif, f, indent=4)
+
+    with (out / 'sources.bib').open('w', encoding='utf8') as f:
+        for doi in sorted(set(int(r[2]) for r in rows)):
+            if rand.random() > 0.02:
+                f.write(bibtex('10.1000/acc.{}'.format(doi), doi))
+                f.write('\n')
+
+    with (out / 'Taxon.tsv').open('w', encoding='utf8') as f:
+        f.write('\t'.join(TAXON_COLUMNS) + '\n')
+        for i in range(nspecies * 5):
+            key, md = gbif_metadata(i)
+            row = dict(
+                taxonID=str(key),
+                scientificName=md['scientificName'],
+                scientificNameAuthorship='(Author, 1900)',
+                canonicalName=md['canonicalName'],
+                genericName=md['genus'],
+                specificEpithet=md['species'].split()[1],
+                taxonRank='species',
+                taxonomicStatus='accepted')
+            row.update(
+                (r, md[r]) for r in ['kingdom', 'phylum', 'class', 'order', 'family', 'genus'])
+            f.write('\t'.join(row.get(c, '') for c in TAXON_COLUMNS) + '\n')
+            if i % 10 == 0:  # Some synonyms:
+                row.update(
+                    taxonID=str(key + 5000000),
+                    acceptedNameUsageID=str(key),
+                    scientificName=md['species'] + 'a (Other, 1950)',
+                    canonicalName=md['species'] + 'a',
+                    taxonomicStatus='synonym')
+                f.write('\t'.join(row.get(c, '') for c in TAXON_COLUMNS) + '\n')
+
+    ordered = [classification(i)['species'] for i in range(nspecies * 5)]
+    rand.shuffle(ordered)
+    with (out / 'ordered.csv').open('w', encoding='utf8') as f:
+        f.write('species\n')
+        for name in ordered[:int(len(ordered) * 0.8)]:
+            f.write(name + '\n')
+    return out
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('out', help='Directory to write the data repository to')
+    parser.add_argument('--experiments', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--no-xlsx', help='Do not write COMBINED.xlsx', action='store_true', default=False)
+    args = parser.parse_args(args)
+    generate(args.out, experiments=args.experiments, seed=args.seed, xlsx=not args.no_xlsx)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+"""
+Run the benchmarks on a synthetic data repository and store the results as JSON.
+
+    python benchmarks/datagen.py /tmp/acc-bench --experiments 100000
+    python benchmarks/run.py /tmp/acc-bench --output bench-HEAD.json
+    python benchmarks/run.py /tmp/acc-bench --compare bench-HEAD.json
+
+Each benchmark runs in a fresh Python process - after its (untimed) setup, which runs in a
+process of its own - and reports wall time and peak resident memory of that process. GBIF API and
+DOI to BibTeX lookups are served by local stub servers.
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+import shutil
+import pathlib
+import argparse
+import platform
+import threading
+import contextlib
+import subprocess
+import collections
+import http.server
+import socketserver
+import urllib.parse
+import multiprocessing
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+import datagen  # noqa: E402
+
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(setup=None, restore=()):
+    """
+    Register a benchmark.
+
+    :param setup: Function to prepare the data repository, called with the same arguments as the \
+    benchmark.
+    :param restore: Names of files in the data repository which the benchmark modifies, and which \
+    are restored afterwards.
+    """
+    def wrapper(func):
+        BENCHMARKS[func.__name__] = (func, setup, restore)
+        return func
+    return wrapper
+
+
+def cli(repos, *args):
+    from pyacc.__main__ import main
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        main(['--repos', str(repos)] + list(args), log=logging.getLogger(__name__))
+
+
+def snapshot(repos, urls):
+    """
+    Setup function, making sure the pickled experiments are available.
+    """
+    from pyacc import ACC
+
+    ACC(repos).experiments
+
+
+@benchmark()
+def experiments(repos, urls):
+    from pyacc import ACC
+
+    ACC(repos, use_cache=False).experiments
+
+
+@benchmark(setup=snapshot)
+def experiments_snapshot(repos, urls):
+    from pyacc import ACC
+
+    ACC(repos).experiments
+
+
+@benchmark()
+def sources(repos, urls):
+    from pyacc import ACC
+
+    ACC(repos, use_cache=False).sources
+
+
+@benchmark(restore=['data.Sheet1.csv'])
+def dump(repos, urls):
+    from pyacc import ACC
+
+    ACC(repos).dump(force=True)
+
+
+@benchmark(setup=snapshot)
+def check(repos, urls):
+    from pyacc import ACC
+
+    ACC(repos).check()
+
+
+@benchmark(setup=snapshot)
+def ls(repos, urls):
+    cli(repos, 'ls', '--group-by', 'parameter', '--group-by', 'order')
+
+
+@benchmark(setup=snapshot)
+def ls_filter(repos, urls):
+    cli(repos, 'ls', '--filter', 'area=memory', '--filter', 'type=other')
+
+
+@benchmark(setup=snapshot)
+def gbif_tree(repos, urls):
+    cli(repos, 'gbif', '--counts')
+
+
+@benchmark(setup=snapshot, restore=['gbif.json'])
+def gbif_update(repos, urls):
+    from pyacc import ACC
+    from pyacc.gbif import GBIF
+
+    ACC(repos, use_cache=False).update_gbif(api=GBIF(api_url=urls['gbif'], rate=None))
+
+
+@benchmark(setup=snapshot, restore=['sources.bib'])
+def bib(repos, urls):
+    from pyacc import ACC
+    from pyacc import util
+
+    util.DOI2BIB_URL = urls['doi2bib'] + '/?doi={}'
+    ACC(repos, use_cache=False).write_bib()
+
+
+def _remove_index(repos, urls):
+    for name in ['backbone.pickle', 'names.pickle']:
+        p = pathlib.Path(repos) / '.cache' / name
+        if p.exists():
+            p.unlink()
+    snapshot(repos, urls)
+
+
+@benchmark(setup=_remove_index)
+def coverage(repos, urls):
+    cli(repos, 'coverage', str(pathlib.Path(repos) / 'Taxon.tsv'))
+
+
+def _index(repos, urls):
+    coverage(repos, urls)
+
+
+@benchmark(setup=_index)
+def coverage_cached(repos, urls):
+    cli(repos, 'coverage', str(pathlib.Path(repos) / 'Taxon.tsv'))
+
+
+@benchmark(setup=snapshot)
+def order(repos, urls):
+    cli(repos, 'order', str(pathlib.Path(repos) / 'ordered.csv'))
+
+
+@benchmark(setup=snapshot)
+def export_sqlite(repos, urls):
+    cli(repos, 'export', str(pathlib.Path(repos) / '.cache' / 'export.sqlite'))
+
+
+def _peak_rss():
+    """
+    :return: Peak resident set size of the current process in MB.
+    """
+    if resource is None:  # pragma: no cover
+        return None
+    res = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in KB elsewhere:
+    return res / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _run(name, step, repos, urls, queue):
+    func, setup, _ = BENCHMARKS[name]
+    func = setup if step == 'setup' else func
+    try:
+        start = time.perf_counter()
+        func(repos, urls)
+        queue.put(dict(seconds=time.perf_counter() - start, peak_rss_mb=_peak_rss()))
+    except Exception as e:
+        queue.put(dict(error='{}: {}'.format(e.__class__.__name__, e)))
+
+
+def run_in_process(name, step, repos, urls):
+    # We use non-daemonic processes, because some benchmarks spawn worker processes themselves.
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(name, step, str(repos), urls, queue))
+    proc.start()
+    res = queue.get()
+    proc.join()
+    return res
+
+
+def run(name, repos, urls, repeat=1):
+    _, setup, restore = BENCHMARKS[name]
+    res = None
+    for _ in range(repeat):
+        backups = []
+        for fname in restore:
+            p = pathlib.Path(repos) / fname
+            backups.append((p, p.parent / (p.name + '.bak')))
+            shutil.copy(str(p), str(backups[-1][1]))
+        try:
+            if setup:
+                r = run_in_process(name, 'setup', repos, urls)
+                if 'error' in r:
+                    return r
+            r = run_in_process(name, 'run', repos, urls)
+        finally:
+            for p, backup in backups:
+                os.replace(str(backup), str(p))
+        if 'error' in r:
+            return r
+        if res is None or r['seconds'] < res['seconds']:
+            res = r
+    return res
+
+
+#
+# Stub servers for remote lookups:
+#
+class GBIFHandler(http.server.BaseHTTPRequestHandler):
+    keys = {}  # Maps canonical names from Taxon.tsv to taxon IDs.
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, obj):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(obj).encode('utf8'))
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path.rstrip('/') == '/species/match':
+            name = urllib.parse.parse_qs(url.query)['name'][0]
+            if name in self.keys:
+                self._json({'usageKey': self.keys[name]})
+            else:
+                self._json({'matchType': 'NONE'})
+        else:
+            _, md = datagen.gbif_metadata(int(url.path.split('/')[-1]) - datagen.KEY_OFFSET)
+            self._json(md)
+
+
+class DOI2BibHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        doi = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)['doi'][0]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.end_headers()
+        self.wfile.write('<html>\n<textarea>\n{}</textarea>\n</html>'.format(
+            datagen.bibtex(doi, int(doi.split('.')[-1]))).encode('utf8'))
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+@contextlib.contextmanager
+def stub_servers(repos):
+    with (pathlib.Path(repos) / 'Taxon.tsv').open(encoding='utf8') as f:
+        header = f.readline().rstrip('\n').split('\t')
+        id_, name = header.index('taxonID'), header.index('canonicalName')
+        for line in f:
+            row = line.rstrip('\n').split('\t')
+            GBIFHandler.keys.setdefault(row[name], int(row[id_]))
+    servers = collections.OrderedDict([
+        ('gbif', Server(('127.0.0.1', 0), GBIFHandler)),
+        ('doi2bib', Server(('127.0.0.1', 0), DOI2BibHandler)),
+    ])
+    for server in servers.values():
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield {
+        name: 'http://127.0.0.1:{}'.format(server.server_address[1])
+        for name, server in servers.items()}
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+
+def metadata(repos):
+    import pyacc
+
+    try:
+        commit = subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=str(pathlib.Path(__file__).parent),
+            stderr=subprocess.DEVNULL).decode('utf8').strip()
+    except (OSError, subprocess.CalledProcessError):  # pragma: no cover
+        commit = None
+    with (pathlib.Path(repos) / 'data.Sheet1.csv').open(encoding='utf8') as f:
+        nexperiments = sum(1 for _ in f) - 2
+    return collections.OrderedDict([
+        ('commit', commit),
+        ('pyacc', pyacc.__version__),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('date', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('experiments', nexperiments),
+    ])
+
+
+def compare(results, previous):
+    print('{:<22} {:>10} {:>10} {:>8} {:>10} {:>10}'.format(
+        'benchmark', 'seconds', 'before', 'ratio', 'MB', 'before'))
+    for name, res in results.items():
+        old = previous.get(name, {})
+        if 'error' in res:
+            print('{:<22} {}'.format(name, res['error']))
+            continue
+        print('{:<22} {:>10.3f} {:>10} {:>8} {:>10.1f} {:>10}'.format(
+            name,
+            res['seconds'],
+            '{:.3f}'.format(old['seconds']) if 'seconds' in old else '',
+            '{:.2f}'.format(res['seconds'] / old['seconds']) if old.get('seconds') else '',
+            res['peak_rss_mb'] or 0,
+            '{:.1f}'.format(old['peak_rss_mb']) if old.get('peak_rss_mb') else ''))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('repos', help='Data repository, created with datagen.py')
+    parser.add_argument(
+        '--experiments',
+        help='Generate the data repository with this number of experiments, if it does not exist',
+        type=int,
+        default=1000)
+    parser.add_argument(
+        '-b', '--benchmark',
+        help='Name of a benchmark to run (may be repeated; default: all)',
+        choices=list(BENCHMARKS),
+        action='append',
+        default=[])
+    parser.add_argument(
+        '--repeat', help='Number of runs per benchmark, reporting the fastest', type=int, default=1)
+    parser.add_argument('--output', help='Path of the JSON file to write the results to')
+    parser.add_argument('--compare', help='JSON file with previous results to compare to')
+    args = parser.parse_args(args)
+
+    repos = pathlib.Path(args.repos)
+    if not repos.exists():
+        datagen.generate(repos, experiments=args.experiments)
+
+    results = collections.OrderedDict()
+    with stub_servers(repos) as urls:
+        for name in args.benchmark or BENCHMARKS:
+            results[name] = run(name, repos, urls, repeat=args.repeat)
+            print(name, json.dumps(results[name]), file=sys.stderr)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding='utf8') as f:
+            previous = json.load(f)['results']
+    compare(results, previous)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            json.dump(dict(metadata=metadata(repos), results=results), f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
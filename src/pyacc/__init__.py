@@ -1 +1,3 @@
 from pyacc.api import ACC  # noqa: F401
+
+__version__ = '0.1.1.dev0'
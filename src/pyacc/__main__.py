@@ -1,17 +1,130 @@
+import ast
 import sys
+import argparse
+import pathlib
+import pkgutil
+import importlib
 import contextlib
 
-from clldutils.clilib import register_subcommands, get_parser_and_subparsers, ParserError, PathType
+from clldutils.clilib import get_parser_and_subparsers, ParserError, PathType, Formatter
 from clldutils.loglib import Logging
+from clldutils import jsonlib
 
 import pyacc.commands
 from pyacc import ACC
+from pyacc import instrument
+
+
+def iter_commands(pkg=pyacc.commands):
+    """
+    Discover the subcommands in `pkg` without importing them.
+
+    :return: Generator of pairs (name, docstring).
+    """
+    for _, name, ispkg in pkgutil.iter_modules(pkg.__path__):
+        if not ispkg:
+            path = pathlib.Path(pkg.__path__[0]) / '{}.py'.format(name)
+            doc = ast.get_docstring(ast.parse(path.read_text(encoding='utf8')), clean=False)
+            if not doc:
+                raise ValueError('Command "{0}" is missing a docstring.'.format(name))
+            yield name, doc
+
+
+def add_options(parser):
+    """
+    Add the global options of `acc` to `parser`.
+    """
+    parser.add_argument('--repos', default='.', type=PathType(type='dir'), help='acc-data')
+    parser.add_argument(
+        '--no-cache',
+        help="Bypass the caches for remote lookups (GBIF, DOI to BibTeX) and parsed data",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--purge-cache',
+        help="Remove all entries from the cache for remote lookups before running the command",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--profile',
+        help="Print timings of pipeline stages, counters and peak memory to stderr",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--profile-output',
+        metavar='PATH',
+        help="Write profiling data to PATH: cProfile stats if PATH ends with .prof, a JSON trace "
+             "of stages and counters otherwise (implies --profile)",
+        default=None)
+
+
+def selected_command(args, commands):
+    """
+    :return: The name of the subcommand in the command line `args` or `None`.
+    """
+    # A minimal parser, knowing the global options - so that their values are not mistaken for
+    # the command - and ignoring everything after the command:
+    parser = argparse.ArgumentParser(prog='acc', add_help=False)
+    parser.add_argument('--log')
+    parser.add_argument('--log-level')
+    add_options(parser)
+    parser.add_argument('command', nargs='?')
+    command = parser.parse_known_args(args)[0].command
+    return command if command in commands else None
+
+
+def register_subcommands(parser, subparsers, args):
+    """
+    Register all subcommands with the parser - but only import the module of the subcommand
+    selected in `args`, to register its arguments.
+    """
+    commands = dict(iter_commands())
+    selected = selected_command(args, commands)
+    for name, doc in sorted(commands.items()):
+        subparser = subparsers.add_parser(
+            name,
+            help=doc.strip().splitlines()[0],
+            description=doc,
+            formatter_class=Formatter)
+        if name == selected:
+            mod = importlib.import_module('{}.{}'.format(pyacc.commands.__name__, name))
+            if hasattr(mod, 'register'):
+                mod.register(subparser)
+            subparser.set_defaults(main=mod.run)
+
+
+@contextlib.contextmanager
+def profiled(output=None):
+    """
+    Record instrumentation data while running a command, printing a summary to stderr and
+    writing cProfile stats or a JSON trace to `output`.
+    """
+    profile = None
+    if output and output.endswith('.prof'):
+        import cProfile
+
+        profile = cProfile.Profile()
+    with instrument.Recorder(trace=bool(output)) as rec:
+        if profile:
+            profile.enable()
+        try:
+            yield rec
+        finally:
+            if profile:
+                profile.disable()
+                profile.dump_stats(output)
+            elif output:
+                jsonlib.dump(rec.as_dict(), output, indent=4)
+            rec.summary()
 
 
 def main(args=None, catch_all=False, parsed_args=None, log=None):
     parser, subparsers = get_parser_and_subparsers('acc')
-    parser.add_argument('--repos', default='.', type=PathType(type='dir'), help='acc-data')
-    register_subcommands(subparsers, pyacc.commands)
+    add_options(parser)
+    if args is None:
+        args = sys.argv[1:]
+    if not parsed_args:
+        register_subcommands(parser, subparsers, args)
 
     args = parsed_args or parser.parse_args(args=args)
 
@@ -20,13 +133,19 @@ def main(args=None, catch_all=False, parsed_args=None, log=None):
         return 1
 
     with contextlib.ExitStack() as stack:
-        args.api = ACC(args.repos)
+        output = getattr(args, 'profile_output', None)
+        if getattr(args, 'profile', False) or output:
+            stack.enter_context(profiled(output))
+        args.api = ACC(args.repos, use_cache=not args.no_cache)
+        if args.purge_cache:
+            args.api.purge_cache()
         if not log:  # pragma: no cover
             stack.enter_context(Logging(args.log, level=args.log_level))
         else:
             args.log = log
         try:
-            return args.main(args) or 0
+            with instrument.stage('command.' + args._command):
+                return args.main(args) or 0
         except KeyboardInterrupt:  # pragma: no cover
             return 0
         except ParserError as e:
@@ -1,26 +1,42 @@
+import os
 import re
+import sys
+import pickle
+import hashlib
+import zipfile
+import tempfile
+import functools
+import collections
 import urllib.parse
+import concurrent.futures
 
-import newick
-import openpyxl
-from csvw import dsv
 from clldutils.apilib import API
 from clldutils.misc import slug, lazyproperty
-from clldutils.source import Source
 from clldutils.jsonlib import update_ordered, load
+from clldutils import jsonlib
+from clldutils.path import md5
 import attr
-import nameparser
 
-from pyacc import util
-from pyacc import gbif
+import pyacc
+from pyacc import instrument
+from pyacc.cache import Cache
+from pyacc.query import ExperimentTable
+from pyacc.store import open_store
+from pyacc.taxonomy import Taxonomy
+from pyacc.validate import COLUMNS
 
 
-def species_converter(s):
-    return {
-        'pan troglydytes': 'pan troglodytes',
-        'Vuvecia vuriegutu vuriegutu': 'Varecia variegata variegata',
-        'psittacus eithacus': 'psittacus erithacus'
-    }.get(s, s)
+# Default corrections of misspelled latin species names. More can be added in the data repository
+# in species_corrections.json - see `ACC.species_corrections`.
+SPECIES_CORRECTIONS = collections.OrderedDict([
+    ('pan troglydytes', 'pan troglodytes'),
+    ('Vuvecia vuriegutu vuriegutu', 'Varecia variegata variegata'),
+    ('psittacus eithacus', 'psittacus erithacus'),
+])
+
+
+def species_converter(s, corrections=None):
+    return (SPECIES_CORRECTIONS if corrections is None else corrections).get(s, s)
 
 
 def clean_doi(s):
@@ -78,173 +94,583 @@ class GBIF:
         return Classification.from_metadata(self.metadata)
 
 
-@attr.s
+def _intern(s):
+    return sys.intern(s) if isinstance(s, str) else s
+
+
+@functools.lru_cache(maxsize=None)
+def _reviewer(s):
+    """
+    Reviewer names are parsed only once per distinct name - and the resulting `HumanName`
+    shared between experiments.
+    """
+    import nameparser
+
+    return nameparser.HumanName(s)
+
+
+@functools.lru_cache(maxsize=2 ** 16)
+def _slug(s):
+    return _intern(slug(s))
+
+
+# Names of the `Experiment` attributes initialized from the `COLUMNS` of a row, in the same order:
+FIELDS = [
+    'review_title',
+    'reviewer',
+    'paper_number',
+    'experiment_number',
+    'species',
+    'species_latin',
+    'doi',
+    'domain',
+    'area',
+    'parameter',
+    'sample_size',
+    'type',
+    'year',
+    'source_abstract',
+]
+
+
+@attr.s(slots=True)
 class Experiment:
-    review_title = attr.ib()
-    reviewer = attr.ib(converter=nameparser.HumanName)  # Contribution
+    """
+    Values of columns with few distinct values are interned. Derived IDs are computed once, upon
+    initialization.
+    """
+    review_title = attr.ib(converter=_intern)
+    reviewer = attr.ib(converter=_reviewer)  # Contribution
     paper_number = attr.ib()
     experiment_number = attr.ib()
-    species = attr.ib()  # Language
-    species_latin = attr.ib(converter=species_converter)
+    species = attr.ib(converter=_intern)  # Language
+    species_latin = attr.ib(converter=_intern)  # Corrected in `from_dict`.
     doi = attr.ib(converter=clean_doi, validator=valid_doi)  # Source
-    domain = attr.ib()
-    area = attr.ib()
-    parameter = attr.ib()  # Parameter
+    domain = attr.ib(converter=_intern)
+    area = attr.ib(converter=_intern)
+    parameter = attr.ib(converter=_intern)  # Parameter
     sample_size = attr.ib()
-    type = attr.ib(validator=attr.validators.in_(['experimental', 'observational', 'other']))
+    type = attr.ib(
+        converter=_intern,
+        validator=attr.validators.in_(['experimental', 'observational', 'other']))
     year = attr.ib(converter=lambda s: int(s) if s else None)
     source_abstract = attr.ib(converter=lambda s: s if s != 'NA' else None)
     source = attr.ib(default=None)
     gbif = attr.ib(default=None)
-
-    @property
-    def contributor_id(self):
-        return slug(self.reviewer.last + self.reviewer.first)
-
-    @property
-    def contribution_id(self):
-        return '{0}-{1}'.format(self.contributor_id, slug(self.review_title))
+    contributor_id = attr.ib(init=False, repr=False, eq=False)
+    contribution_id = attr.ib(init=False, repr=False, eq=False)
+    species_id = attr.ib(init=False, repr=False, eq=False)
+    parameter_id = attr.ib(init=False, repr=False, eq=False)
+    id = attr.ib(init=False, repr=False, eq=False)
+
+    def __attrs_post_init__(self):
+        self.contributor_id = _slug(self.reviewer.last + self.reviewer.first)
+        self.contribution_id = '{0}-{1}'.format(self.contributor_id, _slug(self.review_title))
+        self.species_id = _slug(self.species_latin)
+        self.parameter_id = _slug(self.parameter)
+        self.id = '{0}-{1}-{2}-{3}'.format(
+            self.contributor_id, _slug(self.doi), self.experiment_number, self.species_id)
 
     @property
     def contribution_name(self):
         return '{0} by {1}'.format(self.review_title, self.reviewer)
 
-    @property
-    def species_id(self):
-        return slug(self.species_latin)
-
-    @property
-    def parameter_id(self):
-        return slug(self.parameter)
-
-    @property
-    def id(self):
-        return '{0}-{1}-{2}-{3}'.format(
-            self.contributor_id, slug(self.doi), self.experiment_number, self.species_id)
-
     @classmethod
-    def from_dict(cls, d, sources):
-        res = cls(
-            review_title=d['Working Title'],
-            reviewer=d['Reviewer'],
-            paper_number=d['Paper #'],
-            experiment_number=d['Experiment #'],
-            species=d['Species   (common name)'],
-            species_latin=d['Species         (latin name)'],
-            doi=d['DOI'],
-            domain=d['Domain'],
-            area=d['Area'],
-            parameter=d['Cognitive ability'],
-            sample_size=d['Sample size'],
-            type=d['Research Kind'],
-            year=d['Publication Year'],
-            source_abstract=d['Abstract'],
-        )
+    def from_dict(cls, d, sources, corrections=None):
+        """
+        :param corrections: Mapping of misspelled to correct latin species names.
+        """
+        kw = dict(zip(FIELDS, (d[c] for c in COLUMNS)))
+        kw['species_latin'] = species_converter(kw['species_latin'], corrections)
+        res = cls(**kw)
         res.source = sources.get(res.doi)
         if res.source:
             res.source.setdefault('year', str(res.year))
         return res
 
 
+def _excel_value(x):
+    if x is None:
+        return ""
+    if isinstance(x, float):
+        return '{0}'.format(int(x))
+    return '{0}'.format(x).strip()
+
+
+XLSX_NS = {
+    'm': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+}
+# Parts of an xlsx archive which are shared by all sheets, and determine the exported values:
+XLSX_SHARED_PARTS = ['xl/sharedStrings.xml', 'xl/styles.xml']
+
+
+def _sheet_fingerprints(xlsx):
+    """
+    Compute fingerprints of the sheets of an xlsx workbook, without parsing cell data.
+
+    An xlsx file is a zip archive with one XML part per sheet. The fingerprint of a sheet is the \
+    md5 checksum of its part - and of the parts shared by all sheets (shared strings and styles).
+
+    :return: `OrderedDict` mapping sheet names to fingerprints, in the order of the sheets.
+    """
+    from xml.etree import ElementTree
+
+    def digest(z, names):
+        res = hashlib.md5()
+        for name in names:
+            if name in z.NameToInfo:
+                with z.open(name) as fp:
+                    for chunk in iter(lambda: fp.read(2 ** 16), b''):
+                        res.update(chunk)
+        return res
+
+    with zipfile.ZipFile(str(xlsx)) as z:
+        rels = {
+            rel.get('Id'): rel.get('Target') for rel in ElementTree.fromstring(
+                z.read('xl/_rels/workbook.xml.rels')).findall('rel:Relationship', XLSX_NS)}
+        shared = digest(z, XLSX_SHARED_PARTS).hexdigest()
+        res = collections.OrderedDict()
+        for sheet in ElementTree.fromstring(z.read('xl/workbook.xml')).iterfind(
+                'm:sheets/m:sheet', XLSX_NS):
+            target = rels[sheet.get('{{{}}}id'.format(XLSX_NS['r']))]
+            part = target[1:] if target.startswith('/') else 'xl/' + target
+            d = digest(z, [part])
+            d.update(shared.encode('ascii'))
+            res[sheet.get('name')] = d.hexdigest()
+    return res
+
+
+def _dump_sheet(xlsx, sname, path, checksum=None):
+    """
+    Export one sheet of an xlsx workbook to CSV, streaming rows from a read-only workbook.
+
+    This is a module-level function, so that it can be run in worker processes.
+
+    :param checksum: md5 checksum of the CSV as exported previously. If the new export has \
+    the same checksum and `path` exists, `path` is left untouched.
+    :return: pair (checksum, flag signaling whether `path` has been (re)written).
+    """
+    import openpyxl
+    from csvw import dsv
+
+    tmp = path.parent / (path.name + '.tmp')
+    wb = openpyxl.load_workbook(str(xlsx), read_only=True, data_only=True)
+    try:
+        with dsv.UnicodeWriter(tmp) as writer:
+            for row in wb[sname].iter_rows(values_only=True):
+                writer.writerow([_excel_value(v) for v in row])
+    finally:
+        wb.close()
+    new_checksum = md5(tmp)
+    if new_checksum == checksum and path.exists():
+        tmp.unlink()
+        return new_checksum, False
+    os.replace(str(tmp), str(path))
+    return new_checksum, True
+
+
+# Version of the layout of the experiments snapshot. It must be increased when the attributes of
+# `Experiment` change, so that snapshots of the old layout are not loaded.
+SNAPSHOT_FORMAT = 1
+
+
+def _load_sources(items):
+    """
+    :param items: `list` of triples (genre, citation key, `list` of field items).
+    :return: `OrderedDict` mapping DOIs to `Source` objects.
+    """
+    from clldutils.source import Source
+
+    return collections.OrderedDict(
+        (src['key'], src) for src in
+        (Source(genre, id_, fields, _check_id=False) for genre, id_, fields in items))
+
+
 class ACC(API):
-    def dump(self):
-        def _excel_value(x):
-            if x is None:
-                return ""
-            if isinstance(x, float):
-                return '{0}'.format(int(x))
-            return '{0}'.format(x).strip()
-
-        res = {}
-        outdir = self.repos
-        wb = openpyxl.load_workbook(str(self.path('COMBINED.xlsx')), data_only=True)
-        for sname in wb.sheetnames:
-            sheet = wb[sname]
-            path = outdir.joinpath('data.' + slug(sname, lowercase=False) + '.csv')
-            with dsv.UnicodeWriter(path) as writer:
-                for row in sheet.rows:
-                    writer.writerow([_excel_value(col.value) for col in row])
-            res[sname] = path
+    def __init__(self, repos=None, use_cache=True):
+        API.__init__(self, repos)
+        self.use_cache = use_cache
+
+    @lazyproperty
+    def cache(self):
+        """
+        Persistent cache for remote lookups or `None`, if caching is disabled.
+        """
+        if self.use_cache:
+            return Cache(self.path('.cache', 'http.sqlite'))
+
+    def purge_cache(self):
+        """
+        Remove all entries from the cache for remote lookups - also if caching is disabled.
+        """
+        path = self.path('.cache', 'http.sqlite')
+        if self.cache:
+            self.cache.purge()
+        elif path.exists():
+            Cache(path).purge()
+
+    @instrument.staged('dump')
+    def dump(self, workers=None, force=False):
+        """
+        Export the sheets of `COMBINED.xlsx` to `data.<sheet>.csv`.
+
+        Fingerprints of the sheets - see `_sheet_fingerprints` - and checksums of the exported
+        CSV files are kept in a manifest, so that sheets which did not change are not even parsed,
+        and CSV files with unchanged content are not rewritten (and keep their mtime). If size and
+        mtime of the workbook did not change since the last dump, the workbook isn't even read.
+
+        :param workers: Maximal number of worker processes exporting sheets concurrently. \
+        Defaults to the number of CPUs; `1` exports all sheets in the current process.
+        :param force: Flag signaling whether to rewrite all CSV files.
+        :return: `dict` mapping names of regenerated sheets to CSV paths.
+        """
+        xlsx = self.path('COMBINED.xlsx')
+        stat = xlsx.stat()
+        wbstat = [stat.st_size, stat.st_mtime_ns]
+        manifest_path = self.path('.cache', 'dump.json')
+        manifest = load(manifest_path) if manifest_path.exists() and not force else {}
+        if manifest.get('workbook') == wbstat and all(
+                self.path(s['path']).exists() for s in manifest['sheets'].values()):
+            return collections.OrderedDict()
+
+        old = manifest.get('sheets', {})
+        fingerprints = _sheet_fingerprints(xlsx)
+        sheets, results = [], []
+        for sname, fingerprint in fingerprints.items():
+            path = self.path('data.' + slug(sname, lowercase=False) + '.csv')
+            prev = old.get(sname, {})
+            if prev.get('fingerprint') == fingerprint and path.exists():
+                results.append((sname, path, (prev['md5'], False)))
+            else:
+                sheets.append((sname, path))
+
+        def checksum(sname):
+            return old.get(sname, {}).get('md5')
+
+        if workers == 1 or len(sheets) < 2:
+            results.extend(
+                (sname, path, _dump_sheet(xlsx, sname, path, checksum(sname)))
+                for sname, path in sheets)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(workers or os.cpu_count() or 1, len(sheets))) as executor:
+                futures = [
+                    (sname, path, executor.submit(_dump_sheet, xlsx, sname, path, checksum(sname)))
+                    for sname, path in sheets]
+                results.extend((sname, path, f.result()) for sname, path, f in futures)
+        order = {sname: i for i, sname in enumerate(fingerprints)}
+        results.sort(key=lambda r: order[r[0]])
+
+        instrument.count('dump.sheets', len(results))
+        instrument.count('dump.sheets.changed', sum(1 for _, _, (_, changed) in results if changed))
+        manifest = collections.OrderedDict([
+            ('workbook', wbstat),
+            ('sheets', collections.OrderedDict(
+                (sname, dict(path=path.name, md5=res[0], fingerprint=fingerprints[sname]))
+                for sname, path, res in results)),
+        ])
+        manifest_path.parent.mkdir(exist_ok=True)
+        jsonlib.dump(manifest, manifest_path, indent=4)
+        return collections.OrderedDict(
+            (sname, path) for sname, path, (_, changed) in results if changed)
+
+    @instrument.staged('ingest')
+    def ingest(self, paths, workers=None, force=False):
+        """
+        Merge the rows of per-reviewer workbooks or CSV files into `data.Sheet1.csv`, see \
+        `pyacc.ingest`.
+
+        :param paths: Paths of the xlsx or CSV files.
+        :param workers: Maximal number of worker processes reading files concurrently. Defaults \
+        to the number of CPUs; `1` reads all files in the current process.
+        :param force: Flag signaling whether to also ingest files which did not change.
+        :return: `pyacc.ingest.IngestReport`
+        """
+        from pyacc.ingest import ingest
+
+        res = ingest(self, paths, workers=workers, force=force)
+        self.__dict__.pop('experiments', None)
+        self.__dict__.pop('table', None)
         return res
 
-    def update_gbif(self):
-        with update_ordered(self.path('gbif.json'), indent=4) as d:
-            api = gbif.GBIF()
-            for ex in self.experiments:
-                if ex.species_latin not in d:
-                    try:
-                        d[ex.species_latin] = api.species_data(ex.species_latin)
-                    except Exception as e:
-                        print(ex.species_latin)
-                        print(e)
-                        continue
-
-    def tree(self):
-        res = {}
-        for ex in self.experiments:
-            if ex.gbif:
-                nodes = [ex.gbif.metadata.get(k)
-                         for k in 'kingdom phylum class order family genus species'.split()]
-                sub = res
-                for n in nodes:
-                    if n is None:
-                        break
-                    if n not in sub:
-                        sub[n] = {}
-                    sub = sub[n]
-                sub[ex.species_latin] = ex.species
-
-        def make_node(name, children):
-            if isinstance(children, dict):
-                return newick.Node.create(
-                    name,
-                    descendants=[
-                        make_node(n, c) for n, c in children.items()])
-            #return newick.Node.create('{} - {}'.format(name, children))
-            return newick.Node.create(children)
-
-        for n, i in res.items():
-            print(n)
-            print(make_node(n, i).ascii_art(show_internal=False)
-                  .replace('─────────────────────', '────')
-                  .replace('                     ', '    ')
-                  )
-
-    def write_bib(self):
-        #
-        # FIXME: keep old records, only update new stuff
-        #
-        seen = set()
-        with self.path('sources.bib').open('w', encoding='utf8') as fp:
-            for ex in self.experiments:
-                if ex.doi not in seen:
-                    bibtex = util.doi2bibtex(ex.doi)
-                    if bibtex:
-                        fp.write('\n\n{}\n\n'.format(bibtex))
-                    else:
-                        fp.write('\n\n% FIXME: {}\n\n'.format(ex.doi))
-                    seen.add(ex.doi)
+    @lazyproperty
+    def gbif_store(self):
+        """
+        Store of GBIF data for the latin species names, see `pyacc.store.open_store`.
+        """
+        return open_store(self.repos)
+
+    def unmatched_species(self):
+        """
+        :return: `list` of latin species names of experiments which are not in the GBIF store.
+        """
+        names = list(collections.OrderedDict((ex.species_latin, None) for ex in self.experiments))
+        known = self.gbif_store.get_many(names)
+        return [name for name in names if name not in known]
+
+    @instrument.staged('update_gbif')
+    def update_gbif(self, api=None):
+        """
+        Look up GBIF data for all species which are not yet in the GBIF store.
+
+        Results are added to the store in batches (see `pyacc.store.Store.batch_size`), so an
+        interrupted update of `gbif.sqlite` only loses the lookups of the current batch. `gbif.json`
+        is written once, when the update is done or interrupted.
+
+        :param api: `pyacc.gbif.GBIF` instance to use for the lookups.
+        :return: `list` of names which could not be looked up.
+        """
+        missing, failed, batch = self.unmatched_species(), [], []
+        store = self.gbif_store
+        if api is None:
+            from pyacc import gbif
+
+            api = gbif.GBIF(cache=self.cache)
+        try:
+            for name, res, e in api.species_data_many(missing):
+                if e:
+                    print(name)
+                    print(e)
+                    failed.append(name)
+                    continue
+                batch.append((name, res))
+                if len(batch) >= store.batch_size:
+                    store.update(batch)
+                    batch = []
+        finally:
+            if batch:
+                store.update(batch)
+            store.flush()
+        if len(failed) < len(missing):
+            # The GBIF data of experiments has changed:
+            for prop in ['experiments', 'table']:
+                self.__dict__.pop(prop, None)
+        return failed
+
+    @instrument.staged('correct_species')
+    def correct_species(self, matcher, threshold=0.9, apply=False):
+        """
+        Look up corrections for the latin species names which are not in the GBIF store.
+
+        :param matcher: `pyacc.names.Matcher` for the vocabulary of correct names.
+        :param apply: Flag signaling whether to add the best matches to `species_corrections.json`.
+        :return: `OrderedDict` mapping names to `list`s of `pyacc.names.Match`.
+        """
+        res = collections.OrderedDict(
+            (name, matcher.match(name, threshold=threshold)) for name in self.unmatched_species())
+        corrections = collections.OrderedDict(
+            (name, matches[0].name) for name, matches in res.items()
+            if matches and matches[0].name != name)
+        if apply and corrections:
+            with update_ordered(self.path('species_corrections.json'), indent=4) as d:
+                d.update(corrections)
+            for prop in ['species_corrections', 'experiments', 'table']:
+                self.__dict__.pop(prop, None)
+        return res
 
+    @instrument.staged('tree')
+    def tree(self, fp=None, format='ascii', **kw):
+        """
+        Write the taxonomy of the species in the dataset to `fp` (default: `sys.stdout`).
+
+        :param format: One of `ascii`, `newick` or `json`.
+        :param kw: Keyword arguments for the renderer, see `pyacc.taxonomy.Taxonomy.write_ascii`.
+        """
+        Taxonomy.from_experiments(self.experiments).write(fp or sys.stdout, format=format, **kw)
+
+    @instrument.staged('write_bib')
+    def write_bib(self, incremental=True, workers=8):
+        """
+        Write BibTeX records for the DOIs of all experiments to `sources.bib`.
+
+        :param incremental: Keep the records already in `sources.bib`, only looking up DOIs which \
+        are missing or for which the lookup failed before (marked with `% FIXME`).
+        :param workers: Number of DOI lookups to run concurrently.
+        :return: `dict` mapping the DOIs which have been looked up to BibTeX or `None`.
+        """
+        from pyacc import util
+        from pyacc.bibtex import BibFile
+
+        path = self.path('sources.bib')
+        # We keep existing records verbatim:
+        old = collections.OrderedDict(
+            (e.fields['key'], e.text) for e in BibFile(path) if 'key' in e.fields) \
+            if incremental else {}
+        dois = list(collections.OrderedDict((ex.doi, None) for ex in self.experiments))
+        missing = [doi for doi in dois if doi not in old]
+        known = set(dois)
+        obsolete = [doi for doi in old if doi not in known]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            new = collections.OrderedDict(zip(missing, executor.map(
+                functools.partial(util.doi2bibtex, cache=self.cache), missing)))
+
+        # Write to a temporary file first, so that we do not end up with a truncated file if
+        # something goes wrong.
+        tmp = path.parent / (path.name + '.tmp')
+        with tmp.open('w', encoding='utf8') as fp:
+            for doi in dois + obsolete:
+                bibtex = old[doi] if doi in old else new[doi]
+                if bibtex:
+                    fp.write('\n\n{}\n\n'.format(bibtex))
+                else:
+                    fp.write('\n\n% FIXME: {}\n\n'.format(doi))
+        os.replace(str(tmp), str(path))
+        self.__dict__.pop('sources', None)
+        return new
+
+    @instrument.staged('validate')
+    def validate(self, workers=1, references=True):
+        """
+        Validate `data.Sheet1.csv` in one streaming pass, see `pyacc.validate`.
+
+        :param workers: Number of worker processes checking chunks of rows; `None` means number \
+        of CPUs.
+        :param references: Flag signaling whether to check DOIs and species against \
+        `sources.bib` and the GBIF store.
+        :return: `pyacc.validate.Report`
+        """
+        from csvw import dsv
+        from pyacc.bibtex import BibFile
+        from pyacc.validate import validate, Report, Issue
+
+        sources, species = None, None
+        if references:
+            sources = collections.Counter(
+                e.fields['key'] for e in BibFile(self.path('sources.bib')) if 'key' in e.fields)
+            species = self.gbif_store
+
+        rows = dsv.reader(self.path('data.Sheet1.csv'), dicts=True)
+        # Row 1 is the header, row 2 the column descriptions:
+        first = next(iter(rows), None)
+        missing = [c for c in COLUMNS if first is None or c not in first]
+        if missing:
+            res = Report()
+            res.add(Issue(1, 'columns', 'missing columns: {}'.format(', '.join(missing))))
+            return res
+        return validate(
+            enumerate(rows, start=3),
+            sources=sources,
+            species=species,
+            corrections=self.species_corrections,
+            workers=workers)
+
+    @instrument.staged('check')
     def check(self):
-        eids = set()
-        for ex in self.experiments:
-            if ex.id in eids:
-                raise ValueError('duplicate experiment ID: {}'.format(ex.id))
-            eids.add(ex.id)
+        """
+        :raises ValueError: If `validate` reports errors.
+        """
+        errors = self.validate(references=False).errors
+        if errors:
+            raise ValueError('\n'.join(str(e) for e in errors))
 
     @lazyproperty
+    @instrument.staged('sources')
     def sources(self):
-        srcs = [
-            Source.from_bibtex('@' + s)
-            for s in self.path('sources.bib').read_text(encoding='utf8').split('@') if s.strip()]
-        return {src['key']: src for src in srcs}
+        from pyacc.bibtex import BibFile
+
+        return collections.OrderedDict(
+            (src['key'], src) for src in BibFile(self.path('sources.bib')).iter_sources())
 
     @lazyproperty
+    def species_corrections(self):
+        """
+        Mapping of misspelled to correct latin species names: `SPECIES_CORRECTIONS`, updated with
+        the mapping in `species_corrections.json`.
+        """
+        res = collections.OrderedDict(SPECIES_CORRECTIONS)
+        p = self.path('species_corrections.json')
+        if p.exists():
+            res.update(load(p))
+        # Corrections of corrected names are applied right away:
+        for name, target in res.items():
+            seen = {name}
+            while target in res and target not in seen:
+                seen.add(target)
+                target = res[target]
+            res[name] = target
+        return res
+
+    @lazyproperty
+    @instrument.staged('table')
+    def table(self):
+        """
+        Columnar view of the experiments, see `pyacc.query.ExperimentTable`.
+        """
+        return ExperimentTable(self.experiments)
+
+    @lazyproperty
+    @instrument.staged('experiments')
     def experiments(self):
-        gbif = load(self.path('gbif.json'))
-        res = [
-            Experiment.from_dict(d, self.sources)
-            for d in list(dsv.reader(self.path('data.Sheet1.csv'), dicts=True))[1:]]
+        """
+        The experiments are cached as pickled snapshot, keyed with the checksums of the input
+        files, the pyacc version and the `SNAPSHOT_FORMAT`, thus only parsed again if something
+        changed.
+        """
+        key = [SNAPSHOT_FORMAT, pyacc.__version__, self.gbif_store.fingerprint()] + [
+            md5(p) if p.exists() else None
+            for p in [self.path(n) for n in [
+                'data.Sheet1.csv', 'sources.bib', 'species_corrections.json']]]
+        snapshot = self.path('.cache', 'experiments.pickle')
+        if self.use_cache and snapshot.exists():
+            try:
+                with instrument.stage('experiments.snapshot.load'), snapshot.open('rb') as fp:
+                    instrument.count('bytes.read', snapshot.stat().st_size)
+                    data = pickle.load(fp)
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                # A truncated snapshot, or one referencing classes which do not exist anymore:
+                data = {}
+            if data.get('key') == key:
+                instrument.count('snapshot.hits')
+                sources = _load_sources(data['sources'])
+                for ex in data['experiments']:
+                    ex.source = sources.get(ex.doi)
+                if 'sources' not in self.__dict__:
+                    self.__dict__['sources'] = sources
+                return data['experiments']
+        if self.use_cache:
+            instrument.count('snapshot.misses')
+
+        res = self._read_experiments()
+        if self.use_cache:
+            snapshot.parent.mkdir(exist_ok=True)
+            sources = self.sources
+            # The sources are pickled once, as plain tuples - not as attribute of each experiment:
+            for ex in res:
+                ex.source = None
+            # Each writer uses its own temporary file - other `ACC` instances on the repository
+            # may be writing a snapshot at the same time:
+            fp = tempfile.NamedTemporaryFile(
+                dir=str(snapshot.parent), prefix=snapshot.name + '.', suffix='.tmp', delete=False)
+            try:
+                with instrument.stage('experiments.snapshot.save'), fp:
+                    pickle.dump(
+                        dict(key=key, experiments=res, sources=[
+                            (src.genre, src.id, list(src.items())) for src in sources.values()]),
+                        fp,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(fp.name, str(snapshot))
+            except BaseException:
+                os.remove(fp.name)
+                raise
+            finally:
+                for ex in res:
+                    ex.source = sources.get(ex.doi)
+        return res
+
+    def _read_experiments(self):
+        from csvw import dsv
+
+        sources, corrections = self.sources, self.species_corrections
+        with instrument.stage('experiments.read'):
+            csv = self.path('data.Sheet1.csv')
+            instrument.count('bytes.read', csv.stat().st_size)
+            res = [
+                Experiment.from_dict(d, sources, corrections=corrections)
+                for d in list(dsv.reader(csv, dicts=True))[1:]]
+            instrument.count('rows.parsed', len(res))
+        gbif = self.gbif_store.get_many(ex.species_latin for ex in res)
         for ex in res:
             key, md = gbif.get(ex.species_latin, (None, None))
             if key:
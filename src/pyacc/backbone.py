@@ -0,0 +1,276 @@
+"""
+Streaming access to the GBIF backbone taxonomy, i.e. to the `Taxon.tsv` file from
+https://hosted-datasets.gbif.org/datasets/backbone/backbone-current.zip
+
+`Taxon.tsv` is several GB big, so we never load it into memory. Instead, lines are read through
+a large buffer, lines which cannot match are skipped based on a cheap substring test, and only
+the columns we need are split off.
+"""
+import os
+import abc
+import sys
+import pickle
+import pathlib
+import collections
+
+from pyacc.query import Column
+
+RANKS = ['phylum', 'class', 'order', 'family', 'genus']
+BUFSIZE = 4 * 1024 * 1024
+
+
+def iter_rows(path, columns, prefilter=None):
+    """
+    :param columns: Names of the columns to extract.
+    :param prefilter: Iterable of strings, all of which must be contained in a line for the line \
+    to be considered.
+    :return: Generator of `list`s with the values of `columns` for each row.
+    """
+    prefilter = list(prefilter or [])
+    with pathlib.Path(path).open(encoding='utf8', buffering=BUFSIZE) as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+        indices = [header.index(c) for c in columns]
+        maxsplit = max(indices) + 1
+        for line in f:
+            if prefilter and not all(s in line for s in prefilter):
+                continue
+            row = line.rstrip('\r\n').split('\t', maxsplit)
+            if len(row) < maxsplit:
+                continue
+            yield [row[i] for i in indices]
+
+
+def iter_species(path, kingdom='Animalia'):
+    """
+    :return: Generator of `dict`s mapping `RANKS` to names, for the accepted species of `kingdom`.
+    """
+    for row in iter_rows(
+            path,
+            ['kingdom', 'taxonomicStatus', 'taxonRank'] + RANKS,
+            prefilter=['\t{}\t'.format(kingdom), '\taccepted\t', '\tspecies\t']):
+        if row[0] == kingdom and row[1] == 'accepted' and row[2] == 'species':
+            yield dict(zip(RANKS, row[3:]))
+
+
+class Index(abc.ABC):
+    """
+    Base class for data extracted from the backbone, pickled to a binary file.
+    """
+    format_version = 1
+
+    def __init__(self, kingdom='Animalia', source=None):
+        self.version = self.format_version
+        self.kingdom = kingdom
+        self.source = source
+
+    @staticmethod
+    def fingerprint(path):
+        """
+        Hashing the big TSV file would be slow, so we identify it by name, size and mtime.
+        """
+        stat = os.stat(str(path))
+        return [str(pathlib.Path(path).resolve()), stat.st_size, stat.st_mtime_ns]
+
+    @classmethod
+    @abc.abstractmethod
+    def from_taxa(cls, path, kingdom='Animalia'):
+        """
+        Build the index from the backbone.
+
+        :param path: Path of `Taxon.tsv`.
+        """
+
+    @classmethod
+    def load(cls, path):
+        with pathlib.Path(path).open('rb') as f:
+            res = pickle.load(f)
+        if not isinstance(res, cls) or res.version != cls.format_version:
+            raise ValueError('Incompatible index {}'.format(path))
+        return res
+
+    @classmethod
+    def cached(cls, taxa, path, kingdom='Animalia'):
+        """
+        Load the index for `taxa` from `path` - or build it and save it to `path` if it doesn't
+        exist or is outdated.
+        """
+        path = pathlib.Path(path)
+        if path.exists():
+            try:
+                res = cls.load(path)
+                if res.kingdom == kingdom and res.source == cls.fingerprint(taxa):
+                    return res
+            except (ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                # An index of another format version - or an unreadable one - is rebuilt:
+                pass
+        res = cls.from_taxa(taxa, kingdom=kingdom)
+        res.save(path)
+        return res
+
+    def save(self, path):
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.parent / (path.name + '.tmp')
+        with tmp.open('wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(str(tmp), str(path))
+
+
+def taxon_counts(columns):
+    """
+    Count the child taxa of all taxa, using dictionary encoded rank columns.
+
+    :param columns: `list` of `pyacc.query.Column`, one per rank in `RANKS`, with one row per \
+    species.
+    :return: `list` of `dict`s, one per rank in `RANKS`, mapping taxa - i.e. tuples of names from \
+    phylum down to the rank - to their number of child taxa (or species, for genera).
+    """
+    # We count species per genus on tuples of integer codes, and then roll the counts up:
+    counts = [collections.Counter(zip(*[col.codes for col in columns]))]
+    for i in range(len(columns) - 1, 0, -1):
+        counts.insert(0, collections.Counter(key[:i] for key in counts[0]))
+    values = [col.values for col in columns]
+    return [
+        {tuple(v[c] for v, c in zip(values, key)): n for key, n in counter.items()}
+        for counter in counts]
+
+
+class SpeciesIndex(Index):
+    """
+    Compact representation of the classification of the accepted species of a kingdom in the
+    backbone: One dictionary encoded `Column` per rank - and the `taxon_counts` computed from them.
+    """
+    format_version = 2
+
+    def __init__(self, kingdom='Animalia', source=None):
+        Index.__init__(self, kingdom=kingdom, source=source)
+        self.columns = [Column() for _ in RANKS]
+        self.counts = None
+
+    @classmethod
+    def from_taxa(cls, path, kingdom='Animalia'):
+        res = cls(kingdom=kingdom, source=cls.fingerprint(path))
+        for species in iter_species(path, kingdom=kingdom):
+            res.add(species)
+        res.counts = taxon_counts(res.columns)
+        return res
+
+    def add(self, species):
+        for rank, col in zip(RANKS, self.columns):
+            col.append(species[rank])
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def __iter__(self):
+        values = [col.values for col in self.columns]
+        for codes in zip(*[col.codes for col in self.columns]):
+            yield dict(zip(RANKS, [v[c] for v, c in zip(values, codes)]))
+
+
+def normalize_name(name):
+    return ' '.join(name.lower().split())
+
+
+class NameIndex(Index):
+    """
+    Index to resolve species names against the backbone, without network access.
+
+    Names are looked up as exact canonical name, exact scientific name or normalized (lowercased,
+    whitespace-collapsed) canonical name. Synonyms resolve to their accepted taxon. If a name is
+    ambiguous, accepted taxa win over synonyms, and otherwise the first taxon in the file.
+    """
+    columns = [
+        'taxonID', 'acceptedNameUsageID', 'scientificName', 'canonicalName',
+        'scientificNameAuthorship', 'taxonRank', 'taxonomicStatus', 'kingdom'] + RANKS
+    ranks = {'species', 'subspecies', 'variety'}
+
+    def __init__(self, kingdom='Animalia', source=None):
+        Index.__init__(self, kingdom=kingdom, source=source)
+        self.taxa = {}  # Maps taxonID to row of accepted taxa.
+        self.names = {}  # Maps name keys to pairs (taxonID, accepted flag).
+
+    @classmethod
+    def from_taxa(cls, path, kingdom='Animalia'):
+        res = cls(kingdom=kingdom, source=cls.fingerprint(path))
+        prefilter = ['\t{}\t'.format(kingdom)] if kingdom else None
+        for row in iter_rows(path, cls.columns, prefilter=prefilter):
+            if (kingdom and row[7] != kingdom) or row[5] not in cls.ranks:
+                continue
+            res.add(row)
+        return res
+
+    def add(self, row):
+        row = tuple(sys.intern(v) for v in row)
+        accepted = row[6] == 'accepted'
+        if accepted:
+            self.taxa[row[0]] = row
+        target = row[0] if accepted else row[1]
+        if not target:
+            return
+        for key in [row[3], row[2], normalize_name(row[3])]:
+            if key and (key not in self.names or (accepted and not self.names[key][1])):
+                self.names[key] = (target, accepted)
+
+    def __len__(self):
+        return len(self.taxa)
+
+    @staticmethod
+    def metadata(row):
+        """
+        :return: `dict` with the same keys as the corresponding GBIF API response.
+        """
+        res = collections.OrderedDict([
+            ('key', int(row[0])),
+            ('nubKey', int(row[0])),
+            ('scientificName', row[2]),
+            ('canonicalName', row[3]),
+            ('authorship', row[4]),
+            ('rank', row[5].upper()),
+            ('taxonomicStatus', row[6].upper()),
+            ('kingdom', row[7]),
+        ])
+        res.update([(rank, value) for rank, value in zip(RANKS, row[8:]) if value])
+        if row[5] == 'species':
+            res['species'] = row[3]
+        return res
+
+    def resolve(self, name):
+        """
+        :return: pair (key, metadata) in the format stored in `gbif.json` or `None`.
+        """
+        for key in [name, normalize_name(name)]:
+            if key in self.names:
+                row = self.taxa.get(self.names[key][0])
+                if row:
+                    return int(row[0]), self.metadata(row)
+
+
+class Resolver:
+    """
+    Resolves names against a `NameIndex`, optionally falling back to the GBIF API for names
+    which cannot be resolved locally.
+
+    Implements the interface of `pyacc.gbif.GBIF` used by `ACC.update_gbif`.
+    """
+    def __init__(self, index, fallback=None):
+        self.index = index
+        self.fallback = fallback
+
+    def species_data_many(self, names):
+        """
+        :return: generator of triples (name, (key, metadata) or None, exception or None), in the \
+        order of `names`.
+        """
+        local = [(name, self.index.resolve(name)) for name in names]
+        # Names which cannot be resolved locally are passed to the fallback in one go, so that it
+        # can look them up concurrently. Its results come in the same order:
+        fallback = iter(self.fallback.species_data_many(
+            [name for name, res in local if not res])) if self.fallback else None
+        for name, res in local:
+            if res:
+                yield name, res, None
+            elif fallback:
+                yield next(fallback)
+            else:
+                yield name, None, KeyError('No backbone match for {}'.format(name))
@@ -0,0 +1,208 @@
+"""
+A single-pass reader for BibTeX files.
+
+Entries are located by scanning the (memory mapped) file once, keeping track of brace depth and
+quoted strings, so `@` characters within field values (e.g. in email addresses or URLs) do not
+break parsing. Entries are yielded lazily and can be looked up by byte offset.
+"""
+import re
+import mmap
+import pathlib
+import collections
+
+from clldutils.source import Source
+
+from pyacc import instrument
+
+ENTRY_START = re.compile(rb'@\s*(?P<genre>[a-zA-Z_]+)\s*(?P<delim>[{(])')
+SPECIAL = re.compile(rb'[{})"]')
+FIELD_NAME = re.compile(r'[\s,]*(?P<name>[^\s=,{}"#]+)\s*=\s*')
+BARE_VALUE = re.compile(r'[^\s,#}]+')
+BRACE = re.compile(r'[{}]')
+NON_ENTRIES = {'comment', 'preamble', 'string'}
+
+
+def _closing_brace(s, i):
+    """
+    :return: index of the brace in `s` closing the one at index `i`.
+    """
+    depth = 0
+    for m in BRACE.finditer(s, i):
+        depth += 1 if m.group() == '{' else -1
+        if depth == 0:
+            return m.start()
+    raise ValueError('Unbalanced braces')
+
+
+def _closing_quote(s, i):
+    """
+    :return: index of the double quote in `s` closing the one at index `i`.
+    """
+    depth = 0
+    for j in range(i + 1, len(s)):
+        c = s[j]
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+        elif c == '"' and depth == 0:
+            return j
+    raise ValueError('Unterminated quoted string')
+
+
+def parse_fields(s):
+    """
+    Parse the `name = value` pairs from the body of a BibTeX entry.
+
+    Values may be delimited by braces or quotes, may be bare numbers or macro names, may span
+    multiple lines and may be concatenated with `#`. Outer delimiters are stripped.
+    """
+    res, i, n = collections.OrderedDict(), 0, len(s)
+    while i < n:
+        m = FIELD_NAME.match(s, i)
+        if not m:
+            break
+        name, i, parts = m.group('name'), m.end(), []
+        while i < n:
+            if s[i] == '{':
+                j = _closing_brace(s, i)
+                parts.append(s[i + 1:j])
+                i = j + 1
+            elif s[i] == '"':
+                j = _closing_quote(s, i)
+                parts.append(s[i + 1:j])
+                i = j + 1
+            else:
+                v = BARE_VALUE.match(s, i)
+                if not v:
+                    break
+                parts.append(v.group())
+                i = v.end()
+            while i < n and s[i].isspace():
+                i += 1
+            if i < n and s[i] == '#':
+                i += 1
+                while i < n and s[i].isspace():
+                    i += 1
+                continue
+            break
+        res[name] = ''.join(parts).strip()
+    return res
+
+
+class Entry:
+    """
+    A BibTeX entry, located at byte `offset` with `length` bytes in a file.
+    """
+    __slots__ = ['genre', 'id', 'offset', 'length', 'text', '_body', '_fields']
+
+    def __init__(self, genre, id_, offset, length, text, body=None):
+        self.genre = genre
+        self.id = id_
+        self.offset = offset
+        self.length = length
+        self.text = text
+        self._body = body or 0
+        self._fields = None
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            self._fields = parse_fields(self.text[self._body:-1].partition(',')[2])
+        return self._fields
+
+    def as_source(self, _check_id=True):
+        return Source(self.genre, self.id, self.fields, _check_id=_check_id)
+
+
+def _entry_end(buf, start, delim):
+    """
+    :return: index of the character closing the entry which has its opening delimiter at `start`.
+    """
+    depth, quoted = 0, False
+    for m in SPECIAL.finditer(buf, start + 1):
+        c = m.group()
+        if c == b'{':
+            depth += 1
+        elif c == b'}':
+            if depth == 0 and delim == b'{':
+                return m.start()
+            depth -= 1
+        elif c == b'"' and depth == 0:
+            quoted = not quoted
+        elif c == b')' and depth == 0 and delim == b'(' and not quoted:
+            return m.start()
+    raise ValueError('Unterminated BibTeX entry at byte {}'.format(start))
+
+
+def iter_entries(buf):
+    """
+    Scan a bytes-like object for BibTeX entries.
+
+    Text between entries - including `% comments` - is skipped, as are `@comment`, `@string`
+    and `@preamble` blocks.
+    """
+    pos = 0
+    while True:
+        m = ENTRY_START.search(buf, pos)
+        if not m:
+            return
+        end = _entry_end(buf, m.start('delim'), m.group('delim'))
+        pos = end + 1
+        genre = m.group('genre').decode('ascii').lower()
+        if genre in NON_ENTRIES:
+            continue
+        text = bytes(buf[m.start():pos]).decode('utf8')
+        body = text.index(m.group('delim').decode()) + 1
+        yield Entry(
+            genre,
+            text[body:].partition(',')[0].strip(),
+            m.start(),
+            pos - m.start(),
+            text,
+            body=body)
+
+
+class BibFile:
+    """
+    Lazy access to the entries of a BibTeX file.
+
+    .. code-block:: python
+
+        >>> bib = BibFile('sources.bib')
+        >>> sources = {src['key']: src for src in bib.iter_sources()}
+        >>> idx = bib.index('key')  # Maps values of the "key" field to (offset, length).
+        >>> src = bib.get(*idx['10.1000/xyz'])
+    """
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+
+    def __iter__(self):
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+        with self.path.open('rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                instrument.count('bytes.read', len(buf))
+                for entry in iter_entries(buf):
+                    yield entry
+
+    def iter_sources(self, _check_id=True):
+        for entry in self:
+            yield entry.as_source(_check_id=_check_id)
+
+    def index(self, field=None):
+        """
+        :param field: Name of a field to use as index key - or `None` to use the citation key.
+        :return: `dict` mapping keys to pairs (offset, length).
+        """
+        return collections.OrderedDict(
+            (e.fields.get(field) if field else e.id, (e.offset, e.length))
+            for e in self if (not field) or field in e.fields)
+
+    def get(self, offset, length):
+        """
+        Read the entry at `offset`, without parsing anything else.
+        """
+        with self.path.open('rb') as f:
+            f.seek(offset)
+            return next(iter_entries(f.read(length)))
@@ -0,0 +1,256 @@
+"""
+A build pipeline, running the steps to curate the data only when their inputs changed.
+
+The steps are modeled as stages with input and output files - relative to the data repository -
+forming a DAG: A stage depends on the stages producing its inputs.
+
+.. code-block:: text
+
+    COMBINED.xlsx -> dump -> data.*.csv -> gbif -> gbif.json -> order -> taxa_sortkeys.json
+                                        -> bib -> sources.bib  -> coverage -> gbif_coverage.json
+
+Fingerprints of the inputs of a stage are recorded in `.cache/build.json` when the stage has run
+successfully. A file counts as changed if its size and mtime differ from the recorded ones - and
+its md5 checksum, too - so a build where nothing changed only needs to `stat` the input files.
+
+Stages run in waves, in topological order, and the stages of a wave - e.g. `gbif` and `bib` -
+run in parallel threads, each with its own `ACC` instance.
+"""
+import fnmatch
+import pathlib
+import argparse
+import importlib
+import collections
+import concurrent.futures
+
+import attr
+from clldutils import jsonlib
+from clldutils.path import md5
+
+from pyacc import instrument
+
+UP_TO_DATE = 'up to date'
+
+
+def run_command(name, argv, api, log):
+    """
+    Run the `acc` subcommand `name` with arguments `argv`.
+    """
+    mod = importlib.import_module('pyacc.commands.' + name)
+    parser = argparse.ArgumentParser(prog='acc ' + name)
+    if hasattr(mod, 'register'):
+        mod.register(parser)
+    args = parser.parse_args(argv)
+    args.api, args.log = api, log
+    return mod.run(args)
+
+
+@attr.s
+class Stage:
+    """
+    :ivar func: Function to run the stage, called with the `ACC` instance and a logger.
+    :ivar inputs: Names of input files, relative to the data repository, or absolute paths.
+    :ivar outputs: Names (or glob patterns) of output files, relative to the data repository.
+    :ivar params: Parameters of the stage - a change of these also triggers a rebuild.
+    """
+    name = attr.ib()
+    func = attr.ib()
+    inputs = attr.ib(default=attr.Factory(list))
+    outputs = attr.ib(default=attr.Factory(list))
+    params = attr.ib(default=attr.Factory(list))
+
+    def produces(self, name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.outputs)
+
+
+class Pipeline:
+    def __init__(self, repos, stages, state_path=None):
+        self.repos = pathlib.Path(repos)
+        self.stages = collections.OrderedDict((s.name, s) for s in stages)
+        self.state_path = state_path or self.repos / '.cache' / 'build.json'
+        self.state = jsonlib.load(self.state_path) if self.state_path.exists() else {}
+        self.upstream = collections.OrderedDict(
+            (stage.name, [
+                other.name for other in stages
+                if other is not stage and any(other.produces(i) for i in stage.inputs)])
+            for stage in stages)
+
+    def waves(self):
+        """
+        :return: `list` of `list`s of stage names, such that each stage only depends on stages \
+        in previous waves.
+        """
+        done, res = set(), []
+        while len(done) < len(self.stages):
+            wave = [
+                name for name in self.stages
+                if name not in done and all(u in done for u in self.upstream[name])]
+            if not wave:
+                raise ValueError('Cyclic dependencies between stages: {}'.format(
+                    ', '.join(n for n in self.stages if n not in done)))
+            res.append(wave)
+            done.update(wave)
+        return res
+
+    def _fingerprint(self, stage, old=None):
+        old = (old or {}).get('inputs', {})
+        res = collections.OrderedDict()
+        for name in stage.inputs:
+            path = self.repos / name
+            if not path.exists():
+                res[name] = None
+                continue
+            st = path.stat()
+            prev = old.get(name)
+            if prev and prev[:2] == [st.st_size, st.st_mtime_ns]:
+                res[name] = prev
+            else:
+                res[name] = [st.st_size, st.st_mtime_ns, md5(path)]
+        return res
+
+    def _outputs_exist(self, stage):
+        for pattern in stage.outputs:
+            if not list(self.repos.glob(pattern)):
+                return False
+        return True
+
+    def status(self, name):
+        """
+        :return: Pair (reason to rebuild stage `name` or `UP_TO_DATE`, fingerprint of its inputs).
+        """
+        stage, old = self.stages[name], self.state.get(name)
+        fp = self._fingerprint(stage, old)
+        if not old:
+            return 'never built', fp
+        if old.get('params') != stage.params:
+            return 'parameters changed', fp
+        # Inputs are compared by md5 checksum - or absence:
+        changed = [
+            n for n, v in fp.items()
+            if (v or [None] * 3)[2] != (old['inputs'].get(n) or [None] * 3)[2]]
+        if changed:
+            return 'changed: {}'.format(', '.join(changed)), fp
+        if not self._outputs_exist(stage):
+            return 'missing outputs', fp
+        return UP_TO_DATE, fp
+
+    def plan(self, force=False):
+        """
+        :return: `OrderedDict` mapping stage names to the reason why they would be rebuilt or \
+        `UP_TO_DATE`, assuming that rebuilt stages change their outputs.
+        """
+        res = collections.OrderedDict()
+        for wave in self.waves():
+            for name in wave:
+                reason = 'forced' if force else self.status(name)[0]
+                if reason == UP_TO_DATE:
+                    dirty = [u for u in self.upstream[name] if res[u] != UP_TO_DATE]
+                    if dirty:
+                        reason = 'after {}'.format(', '.join(dirty))
+                res[name] = reason
+        return res
+
+    def run(self, api_factory, log, force=False, jobs=None):
+        """
+        Run the stages which are not up to date.
+
+        :param api_factory: Callable returning a fresh `ACC` instance - called once per stage, \
+        because the lazily loaded data of an instance must not be shared between threads.
+        :return: `OrderedDict` mapping stage names to one of `built`, `UP_TO_DATE`, `failed` or \
+        `skipped` (if an upstream stage failed).
+        """
+        res = collections.OrderedDict()
+        for wave in self.waves():
+            todo = []
+            for name in wave:
+                if any(res[u] in ('failed', 'skipped') for u in self.upstream[name]):
+                    res[name] = 'skipped'
+                    continue
+                reason, fp = self.status(name)
+                if force or reason != UP_TO_DATE:
+                    todo.append((self.stages[name], fp))
+                    log.info('{0}: {1}'.format(name, 'forced' if force else reason))
+                else:
+                    res[name] = UP_TO_DATE
+                    if name in self.state:
+                        # Record new mtimes of files with unchanged content, to not hash them again:
+                        self.state[name]['inputs'] = fp
+            if not todo:
+                self._save()
+                continue
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=jobs or len(todo)) as ex:
+                futures = [
+                    (stage, fp, ex.submit(self._run_stage, stage, api_factory, log))
+                    for stage, fp in todo]
+                for stage, fp, future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        log.error('{0} failed: {1}'.format(stage.name, e))
+                        res[stage.name] = 'failed'
+                        continue
+                    res[stage.name] = 'built'
+                    self.state[stage.name] = dict(inputs=fp, params=stage.params)
+            self._save()
+        return res
+
+    def _save(self):
+        self.state_path.parent.mkdir(exist_ok=True)
+        jsonlib.dump(self.state, self.state_path, indent=4)
+
+    @staticmethod
+    def _run_stage(stage, api_factory, log):
+        api = api_factory()
+        with instrument.stage('build.' + stage.name):
+            stage.func(api, log)
+
+
+def _dump(api, log):
+    run_command('dump', [], api, log)
+
+
+def _gbif(api, log):
+    failed = api.update_gbif()
+    if failed:
+        log.warning('{} names could not be matched'.format(len(failed)))
+
+
+def _bib(api, log):
+    run_command('bib', [], api, log)
+
+
+def pipeline(repos, ordered=None, taxa=None):
+    """
+    :param ordered: Path of the ordering (species list or tree) for `acc order` - or `None` to \
+    omit the stage.
+    :param taxa: Path of `Taxon.tsv` for `acc coverage` - or `None` to omit the stage.
+    :return: The `Pipeline` of the `acc` subcommands.
+    """
+    repos = pathlib.Path(repos)
+    gbif = 'gbif.sqlite' if (repos / 'gbif.sqlite').exists() else 'gbif.json'
+    data = ['data.Sheet1.csv', 'species_corrections.json']
+    stages = []
+    if (repos / 'COMBINED.xlsx').exists():
+        stages.append(Stage('dump', _dump, ['COMBINED.xlsx'], ['data.*.csv']))
+    stages.extend([
+        Stage('gbif', _gbif, data, [gbif]),
+        Stage('bib', _bib, ['data.Sheet1.csv'], ['sources.bib']),
+    ])
+    if ordered:
+        ordered = str(pathlib.Path(ordered).resolve())
+        stages.append(Stage(
+            'order',
+            lambda api, log: run_command('order', [ordered], api, log),
+            data + [gbif, ordered],
+            ['taxa_sortkeys.json'],
+            params=[ordered]))
+    if taxa:
+        taxa = str(pathlib.Path(taxa).resolve())
+        stages.append(Stage(
+            'coverage',
+            lambda api, log: run_command('coverage', [taxa], api, log),
+            data + [gbif, taxa],
+            ['gbif_coverage.json'],
+            params=[taxa]))
+    return Pipeline(repos, stages)
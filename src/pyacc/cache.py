@@ -0,0 +1,129 @@
+"""
+A persistent cache for the results of remote lookups (GBIF API, DOI to BibTeX conversion).
+
+Values must be JSON serializable. `None` is treated as result of a failed lookup and cached
+with a separate - typically shorter - TTL (negative caching).
+"""
+import json
+import time
+import sqlite3
+import pathlib
+import threading
+
+from pyacc import instrument
+
+MISSING = object()
+DAY = 24 * 60 * 60
+
+
+class Cache:
+    """
+    Key-value store backed by a SQLite database, with TTL-based expiry and LRU eviction once
+    the total size of the cached values exceeds `max_size` bytes.
+    """
+    def __init__(self, path, ttl=90 * DAY, negative_ttl=7 * DAY, max_size=200 * 1024 * 1024):
+        self.path = pathlib.Path(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._db = None
+        self._size = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                str(self.path), isolation_level=None, check_same_thread=False)
+            self._db.execute("""\
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    size INTEGER,
+    expires REAL,
+    accessed REAL
+)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+            self._size = self._db.execute(
+                "SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+        return self._db
+
+    def __len__(self):
+        with self._lock:
+            return self.db.execute("SELECT count(*) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """
+        :return: The cached value or `MISSING` if there is no (unexpired) entry for `key`.
+        """
+        now = time.time()
+        with self._lock:
+            row = self.db.execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                instrument.count('cache.misses')
+                return MISSING
+            if row[1] < now:
+                self._delete(key)
+                instrument.count('cache.misses')
+                return MISSING
+            self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        instrument.count('cache.hits')
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        value = json.dumps(value)
+        with self._lock:
+            self._delete(key)
+            self.db.execute(
+                "INSERT INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl, now))
+            self._size += len(value)
+            if self._size > self.max_size:
+                self._evict()
+
+    def lookup(self, key, func, *args, **kw):
+        """
+        Return the cached value for `key`, computing - and caching - it by calling `func` if
+        necessary.
+        """
+        res = self.get(key)
+        if res is MISSING:
+            res = func(*args, **kw)
+            self.set(key, res)
+        return res
+
+    def purge(self):
+        with self._lock:
+            self.db.execute("DELETE FROM entries")
+            self.db.execute("VACUUM")
+            self._size = 0
+
+    def _delete(self, key):
+        row = self.db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row:
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._size -= row[0]
+
+    def _evict(self):
+        """
+        Remove expired entries and then least recently used ones, until the cache size is down
+        to 90% of `max_size`.
+        """
+        self.db.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        self._size = self.db.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+        target = int(self.max_size * 0.9)
+        if self._size <= target:
+            return
+        removed, keys = 0, []
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if self._size - removed <= target:
+                break
+            keys.append((key,))
+            removed += size
+        self.db.executemany("DELETE FROM entries WHERE key = ?", keys)
+        self._size -= removed
@@ -1,11 +1,22 @@
 """
-
+Write BibTeX for the DOIs of all experiments to sources.bib.
 """
 
 
 def register(parser):
-    pass
+    parser.add_argument(
+        '--full',
+        help="Look up all DOIs, rather than only the ones which are not in sources.bib yet",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--workers',
+        help="Number of concurrent DOI lookups",
+        type=int,
+        default=8)
 
 
 def run(args):
-    args.api.write_bib()
+    res = args.api.write_bib(incremental=not args.full, workers=args.workers)
+    args.log.info('{0} DOIs looked up, {1} failed'.format(
+        len(res), len([v for v in res.values() if not v])))
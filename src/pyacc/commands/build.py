@@ -0,0 +1,63 @@
+"""
+Run the curation steps - dump, gbif, bib, order and coverage - for which inputs changed.
+
+The steps form a pipeline: COMBINED.xlsx -> data.*.csv -> gbif.json/sources.bib ->
+taxa_sortkeys.json/gbif_coverage.json. Fingerprints of the inputs of each step are kept in
+.cache/build.json, and a step only runs if its inputs changed since it last ran successfully - or
+if a step it depends on ran. Independent steps (e.g. gbif and bib) run in parallel.
+
+The order and coverage steps are only included if --ordered and --taxa are given.
+"""
+from clldutils.clilib import PathType, Table, add_format
+
+from pyacc import ACC
+from pyacc.build import pipeline
+
+
+def register(parser):
+    add_format(parser)
+    parser.add_argument(
+        '--ordered',
+        metavar='ORDERED',
+        help="Species list or tree to order taxa by (see `acc order`)",
+        type=PathType(type='file'),
+        default=None)
+    parser.add_argument(
+        '--taxa',
+        metavar='TAXA',
+        help="Path to Taxon.tsv of the GBIF backbone, to compute coverage (see `acc coverage`)",
+        type=PathType(type='file'),
+        default=None)
+    parser.add_argument(
+        '--dry-run',
+        help="Only list the steps which would run, and why",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--force',
+        help="Run all steps, regardless of changes",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--jobs',
+        help="Maximal number of steps to run in parallel (default: all independent steps)",
+        type=int,
+        default=None)
+
+
+def run(args):
+    pl = pipeline(args.api.repos, ordered=args.ordered, taxa=args.taxa)
+    if args.dry_run:
+        with Table(args, 'step', 'status') as t:
+            for name, reason in pl.plan(force=args.force).items():
+                t.append([name, reason])
+        return
+
+    res = pl.run(
+        lambda: ACC(args.api.repos, use_cache=args.api.use_cache),
+        args.log,
+        force=args.force,
+        jobs=args.jobs)
+    for name, status in res.items():
+        args.log.info('{0}: {1}'.format(name, status))
+    return 1 if 'failed' in res.values() else 0
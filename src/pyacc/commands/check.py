@@ -0,0 +1,57 @@
+"""
+Validate data.Sheet1.csv, reporting all problems with their row numbers.
+
+Errors are invalid values and duplicate experiment IDs or DOI records. Experiments with DOIs not
+in sources.bib or species not in gbif.json are reported as warnings.
+"""
+import json
+import collections
+
+from clldutils.clilib import Table, add_format
+
+
+def register(parser):
+    add_format(parser)
+    parser.add_argument(
+        '--workers',
+        help="Number of processes checking rows in parallel (default: number of CPUs)",
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--errors-only',
+        help="Do not report warnings",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--summary',
+        help="Only report the number of problems per rule",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--json',
+        help="Print the full report as JSON",
+        action='store_true',
+        default=False)
+
+
+def run(args):
+    report = args.api.validate(workers=args.workers)
+    if args.errors_only:
+        report.issues = report.errors
+
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=4))
+    elif args.summary:
+        with Table(args, 'severity', 'rule', 'count') as t:
+            for (severity, rule), n in sorted(report.counts().items()):
+                t.append([severity, rule, n])
+    else:
+        with Table(args, 'row', 'severity', 'rule', 'column', 'message') as t:
+            for issue in report.issues:
+                t.append([
+                    issue.row, issue.severity, issue.rule, issue.column or '', issue.message])
+
+    counts = collections.Counter(i.severity for i in report.issues)
+    args.log.info('{0} rows: {1} errors, {2} warnings'.format(
+        report.rows, counts['error'], counts['warning']))
+    return 0 if report.ok else 1
@@ -0,0 +1,50 @@
+"""
+Propose corrections for latin species names which could not be matched in GBIF.
+
+Names are matched approximately against the names with GBIF data and - optionally - the species
+names in the GBIF backbone. With --apply, the best matches are added to species_corrections.json,
+from where they are applied when reading the experiments. Run `acc gbif -U` afterwards to look up
+the corrected names.
+"""
+from clldutils.clilib import PathType, Table, add_format
+
+from pyacc.names import BackboneMatcher, Matcher
+
+
+def register(parser):
+    add_format(parser)
+    parser.add_argument(
+        '--backbone',
+        metavar='TAXA',
+        help="Path to Taxon.tsv of the GBIF backbone, to match against all its species names. "
+             "The index built from it is cached in .cache/matcher.pickle",
+        type=PathType(type='file'),
+        default=None)
+    parser.add_argument(
+        '--threshold',
+        help="Minimal similarity of names to be proposed as correction",
+        type=float,
+        default=0.85)
+    parser.add_argument(
+        '--apply',
+        help="Add the best match for each name to species_corrections.json",
+        action='store_true',
+        default=False)
+
+
+def run(args):
+    if args.backbone:
+        matcher = BackboneMatcher.cached(
+            args.backbone, args.api.path('.cache', 'matcher.pickle'))
+    else:
+        matcher = Matcher()
+    for name, (_, md) in args.api.gbif_store.items():
+        matcher.add(name)
+        if md.get('canonicalName'):
+            matcher.add(md['canonicalName'])
+
+    res = args.api.correct_species(matcher, threshold=args.threshold, apply=args.apply)
+    with Table(args, 'name', 'correction', 'score') as t:
+        for name, matches in res.items():
+            for m in matches or [None]:
+                t.append([name, m.name if m else '', '{:.2f}'.format(m.score) if m else ''])
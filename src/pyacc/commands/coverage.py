@@ -8,80 +8,69 @@ Notes:
 - download the source archive (https://hosted-datasets.gbif.org/datasets/backbone/backbone-current.zip)
 - extract
 - pass path to Taxon.tsv as "taxa" argument.
+
+The accepted species of Animalia are extracted from Taxon.tsv once, and stored - together with
+the number of child taxa per taxon - in a compact index file, which is re-used as long as
+Taxon.tsv does not change.
+
+Coverage is written to gbif_coverage.json and - with --export - to one CSV or JSON file per rank.
 """
 import collections
 
-import attr
 from clldutils.clilib import PathType
-
 from clldutils import jsonlib
-from pyacc.api import Classification
-
+from csvw.dsv import UnicodeWriter
 
-class Taxa(dict):
-    def add(self, t):
-        if isinstance(t, Classification):
-            t = attr.asdict(t)
-            t['class'] = t.pop('klass')
-        if t['phylum'] not in self:
-            self[t['phylum']] = {}
-        if t['class'] not in self[t['phylum']]:
-            self[t['phylum']][t['class']] = {}
-        if t['order'] not in self[t['phylum']][t['class']]:
-            self[t['phylum']][t['class']][t['order']] = {}
-        if t['family'] not in self[t['phylum']][t['class']][t['order']]:
-            self[t['phylum']][t['class']][t['order']][t['family']] = {}
-        if t['genus'] not in self[t['phylum']][t['class']][t['order']][t['family']]:
-            self[t['phylum']][t['class']][t['order']][t['family']][t['genus']] = 0
-        self[t['phylum']][t['class']][t['order']][t['family']][t['genus']] += 1
+from pyacc.backbone import SpeciesIndex, RANKS
+from pyacc.coverage import Coverage, CHILDREN
 
 
 def register(parser):
     parser.add_argument('taxa', type=PathType(type='file'))
+    parser.add_argument(
+        '--index',
+        help="Path of the species index built from TAXA (default: .cache/backbone.pickle in the "
+             "data repository)",
+        type=PathType(type='file', must_exist=False),
+        default=None)
+    parser.add_argument(
+        '--export',
+        metavar='DIR',
+        help="Directory to write coverage.<rank>.csv (or .json) files to",
+        type=PathType(type='dir', must_exist=False),
+        default=None)
+    parser.add_argument(
+        '--export-format',
+        choices=['csv', 'json'],
+        default='csv')
 
 
 def run(args):
-    acc = Taxa()
-    seen = set()
+    species = collections.OrderedDict()
     for ex in args.api.experiments:
-        species = ex.gbif.name
-        if species not in seen:
-            seen.add(species)
-            acc.add(ex.gbif.classification)
-    #print(acc)
-    gbif, head = Taxa(), None
-    for i, line in enumerate(args.taxa.open(encoding='utf8').readlines()):
-        if i == 0:
-            head = line.strip().split('\t')
-            continue
-        cols = line.strip().split('\t')
-        d = dict(zip(head, cols))
+        if ex.gbif and ex.gbif.name not in species:
+            clf = ex.gbif.classification
+            species[ex.gbif.name] = {rank: getattr(clf, 'klass' if rank == 'class' else rank)
+                                     for rank in RANKS}
+    coverage = Coverage.from_species(
+        species.values(),
+        SpeciesIndex.cached(
+            args.taxa, args.index or args.api.path('.cache', 'backbone.pickle')).counts)
 
-        if d['kingdom'] != 'Animalia':
-            continue
-        if d['taxonomicStatus'] != 'accepted':
-            continue
-        if d['taxonRank'] != 'species':
-            continue
-        if 'genus' in d:
-            gbif.add(d)
+    for taxon, covered, total in coverage:
+        i = len(taxon) - 1
+        print('{}{} {}: {}/{} {}'.format(
+            '  ' * i, RANKS[i].capitalize(), taxon[-1], covered, total, CHILDREN[i]))
+    jsonlib.dump(coverage.as_dict(), args.api.path('gbif_coverage.json'), indent=4)
 
-    coverage = collections.OrderedDict()
-    for phylum, classes in acc.items():
-        print('Phylum {}: {}/{} classes'.format(phylum, len(classes), len(gbif[phylum])))
-        coverage[(phylum,)] = (len(classes), len(gbif[phylum]))
-        for klass, orders in classes.items():
-            print('  Class {}: {}/{} orders'.format(klass, len(orders), len(gbif[phylum][klass])))
-            coverage[(phylum, klass)] = (len(orders), len(gbif[phylum][klass]))
-            for order, families in orders.items():
-                print('    Order {}: {}/{} families'.format(order, len(families), len(gbif[phylum][klass][order])))
-                coverage[(phylum, klass, order)] = (len(families), len(gbif[phylum][klass][order]))
-                for family, genera in families.items():
-                    print('      Family {}: {}/{} genera'.format(family, len(genera), len(gbif[phylum][klass][order][family])))
-                    coverage[(phylum, klass, order, family)] = (len(genera), len(gbif[phylum][klass][order][family]))
-                    for genus, nspec in genera.items():
-                        print('        Genus {}: {}/{} species'.format(
-                            genus, nspec, gbif[phylum][klass][order][family].get(genus)))
-                        coverage[(phylum, klass, order, family, genus)] = (nspec, gbif[phylum][klass][order][family][genus])
-    coverage = collections.OrderedDict([('_'.join(k), v) for k, v in coverage.items()])
-    jsonlib.dump(coverage, args.api.path('gbif_coverage.json'), indent=4)
+    if args.export:
+        args.export.mkdir(parents=True, exist_ok=True)
+        for rank in RANKS:
+            path = args.export / 'coverage.{}.{}'.format(rank, args.export_format)
+            rows = coverage.iter_rows(rank)
+            if args.export_format == 'csv':
+                with UnicodeWriter(path) as w:
+                    w.writerows(rows)
+            else:
+                header = next(rows)
+                jsonlib.dump([dict(zip(header, row)) for row in rows], path, indent=4)
@@ -1,12 +1,25 @@
 """
-
+Export the sheets of COMBINED.xlsx to CSV and check the data.
 """
 
 
 def register(parser):
-    pass
+    parser.add_argument(
+        '--workers',
+        help="Maximal number of processes exporting sheets in parallel (default: number of CPUs)",
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--force',
+        help="Rewrite all CSV files, even for sheets which did not change",
+        action='store_true',
+        default=False)
 
 
 def run(args):
-    args.api.dump()
+    regenerated = args.api.dump(workers=args.workers, force=args.force)
+    for sname, path in regenerated.items():
+        args.log.info('{0} -> {1}'.format(sname, path.name))
+    if not regenerated:
+        args.log.info('no sheets changed')
     args.api.check()
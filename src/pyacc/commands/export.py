@@ -0,0 +1,30 @@
+"""
+Export experiments, contributors, species, parameters, sources and GBIF classifications to a
+normalized SQLite database.
+
+With --incremental, only rows which changed since the last export to the same database are
+written.
+"""
+from clldutils.clilib import PathType
+
+from pyacc.database import export
+
+
+def register(parser):
+    parser.add_argument(
+        'db',
+        metavar='DB',
+        help="Path of the SQLite database",
+        type=PathType(type='file', must_exist=False))
+    parser.add_argument(
+        '--incremental',
+        help="Only write rows which were added or changed - and delete rows which were removed - "
+             "since the last export",
+        action='store_true',
+        default=False)
+
+
+def run(args):
+    for table, (written, deleted) in export(
+            args.api, args.db, incremental=args.incremental).items():
+        args.log.info('{0}: {1} rows written, {2} rows deleted'.format(table, written, deleted))
@@ -1,11 +1,100 @@
 """
 Retrieve and display information from GBIF for all species in the dataset
+
+GBIF data is stored in gbif.json - or, after running with --sqlite, in gbif.sqlite, which allows
+looking up and adding species without reading and rewriting all data. Use --export to write
+gbif.json from gbif.sqlite, e.g. to commit changes to version control.
 """
+from clldutils.clilib import PathType
+
+from pyacc.gbif import GBIF
+from pyacc.store import JSONStore, SQLiteStore
+from pyacc.backbone import NameIndex, Resolver
+
+
 def register(parser):
     parser.add_argument('-U', '--update', default=False, action='store_true')
+    parser.add_argument(
+        '--sqlite',
+        help="Copy the data from gbif.json to gbif.sqlite, which is used from then on",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--export',
+        help="Write gbif.json from gbif.sqlite (after updating)",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--workers',
+        help="Number of concurrent requests to the GBIF API when updating",
+        type=int,
+        default=8)
+    parser.add_argument(
+        '--rate',
+        help="Maximal number of requests per second to the GBIF API when updating",
+        type=float,
+        default=10)
+    parser.add_argument(
+        '--backbone',
+        metavar='TAXA',
+        help="Path to Taxon.tsv of the GBIF backbone, to resolve names locally when updating. "
+             "The name index built from it is cached in .cache/names.pickle",
+        type=PathType(type='file'),
+        default=None)
+    parser.add_argument(
+        '--offline',
+        help="Do not fall back to the GBIF API for names which cannot be resolved with --backbone",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--format',
+        help="Format of the taxonomy tree",
+        choices=['ascii', 'newick', 'json'],
+        default='ascii')
+    parser.add_argument(
+        '--depth',
+        help="Maximal depth of the taxonomy tree, e.g. 2 to only list kingdoms and phyla",
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--collapse',
+        help="Collapse chains of taxa with just one child into one node",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--counts',
+        help="Add the number of experiments to each taxon",
+        action='store_true',
+        default=False)
+    parser.add_argument(
+        '--output',
+        help="Path of the file to write the taxonomy tree to (default: stdout)",
+        type=PathType(type='file', must_exist=False),
+        default=None)
 
 
 def run(args):
+    if args.sqlite:
+        store = SQLiteStore(args.api.path(SQLiteStore.filename))
+        store.load(args.api.path(JSONStore.filename))
+        args.api.gbif_store = store
+        args.log.info('{} species in {}'.format(len(store), store.path.name))
     if args.update:
-        args.api.update_gbif()
-    args.api.tree()
+        api = GBIF(workers=args.workers, rate=args.rate, cache=args.api.cache)
+        if args.backbone:
+            api = Resolver(
+                NameIndex.cached(args.backbone, args.api.path('.cache', 'names.pickle')),
+                fallback=None if args.offline else api)
+        failed = args.api.update_gbif(api=api)
+        if failed:
+            args.log.warning(
+                '{} names could not be matched - run `acc correct` to look for typos'.format(
+                    len(failed)))
+    if args.export:
+        args.api.gbif_store.export(args.api.path(JSONStore.filename))
+    kw = dict(max_depth=args.depth, collapse=args.collapse, counts=args.counts)
+    if args.output:
+        with args.output.open('w', encoding='utf8') as fp:
+            args.api.tree(fp, format=args.format, **kw)
+    else:
+        args.api.tree(format=args.format, **kw)
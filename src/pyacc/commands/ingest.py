@@ -0,0 +1,38 @@
+"""
+Merge per-reviewer workbooks (xlsx) or CSV files into data.Sheet1.csv.
+
+Columns are matched by name - ignoring case and whitespace. Rows are deduplicated by experiment
+ID; rows with the ID of an already merged experiment but different values are reported as
+conflicts and not merged. Files which did not change since they were last ingested are skipped.
+"""
+from clldutils.clilib import PathType, Table, add_format
+
+
+def register(parser):
+    add_format(parser)
+    parser.add_argument(
+        'inputs',
+        metavar='FILE',
+        nargs='+',
+        help="Path of an xlsx or CSV file",
+        type=PathType(type='file'))
+    parser.add_argument(
+        '--workers',
+        help="Maximal number of processes reading files in parallel (default: number of CPUs)",
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--force',
+        help="Also ingest files which did not change since they were last ingested",
+        action='store_true',
+        default=False)
+
+
+def run(args):
+    report = args.api.ingest(args.inputs, workers=args.workers, force=args.force)
+    for issue in report.issues:
+        (args.log.error if issue.severity == 'error' else args.log.warning)(str(issue))
+    with Table(args, 'file', 'status', 'rows', 'added', 'duplicates', 'conflicts') as t:
+        for i in report.inputs.values():
+            t.append([i.path, i.status, i.rows, i.added, i.duplicates, i.conflicts])
+    return 0 if report.ok else 1
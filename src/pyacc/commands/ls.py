@@ -1,14 +1,69 @@
 """
+List experiments - or counts of experiments grouped by columns.
 
+Filter and group-by columns: id, doi, species, species_latin, parameter, domain, area, reviewer,
+contributor_id, type, year, kingdom, phylum, class, order, family, genus.
 """
-from clldutils.clilib import Table, add_format
+import collections
+
+from clldutils.clilib import Table, add_format, ParserError
+
+from pyacc.query import COLUMNS, ExperimentTable
+
+
+def column_value(s):
+    col, _, value = s.partition('=')
+    if col not in COLUMNS or not _:
+        raise ValueError(s)
+    return col, value
 
 
 def register(parser):
     add_format(parser)
+    parser.add_argument(
+        '--filter',
+        help="Only list experiments with VALUE in COLUMN (may be repeated)",
+        metavar='COLUMN=VALUE',
+        type=column_value,
+        action='append',
+        default=[])
+    parser.add_argument(
+        '--group-by',
+        help="Count experiments per distinct value of COLUMN (may be repeated)",
+        metavar='COLUMN',
+        choices=list(COLUMNS),
+        action='append',
+        default=[])
 
 
 def run(args):
+    conditions = collections.OrderedDict()
+    for col, value in args.filter:
+        if col == 'year':
+            try:
+                value = int(value)
+            except ValueError:
+                raise ParserError('Invalid year: {}'.format(value))
+        conditions.setdefault(col, []).append(value)
+
+    if not (conditions or args.group_by):
+        with Table(args, 'DOI', 'topic') as t:
+            for ex in args.api.experiments:
+                t.append([ex.doi, ex.parameter])
+        return
+
+    # Only the columns needed for the query are encoded:
+    table = ExperimentTable(
+        args.api.experiments,
+        columns=list(collections.OrderedDict.fromkeys(list(conditions) + args.group_by)))
+    if args.group_by:
+        with Table(args, *(args.group_by + ['count'])) as t:
+            for key, n in sorted(
+                    table.group_by(*args.group_by, **conditions).items(),
+                    key=lambda i: (-i[1], [str(v) for v in i[0]])):
+                t.append(list(key) + [n])
+        return
+
     with Table(args, 'DOI', 'topic') as t:
-        for ex in args.api.experiments:
+        for ex in table.filter(**conditions):
             t.append([ex.doi, ex.parameter])
@@ -8,85 +8,158 @@ PLOS Biology. https://doi.org/10.1371/journal.pbio.3000494
 Downloaded MCC consensus trees of the completed trees from
 https://github.com/n8upham/MamPhy_v1/blob/master/_DATA/MamPhy_fullPosterior_BDvr_Completed_5911sp_topoCons_NDexp_MCC_v2_target.tre
 
-import dendropy
-
-tree = dendropy.Tree.get_from_path("mammals.tre", "nexus")
-pdm = tree.phylogenetic_distance_matrix()
-hs = [n for n in tree.taxon_namespace if 'sapiens' in n.label][0]
-ordered = [tax.label for tax in sorted(tree.taxon_namespace, key=lambda t: pdm(hs, t))
-with open('mammals_ordered.csv', 'w', encoding='utf8') as fp:
-    for t in ordered:
-        comps = t.strip().split()
-        if len(comps) >= 3:
-            fp.write('{},{},{}\n'.format(' '.join(comps[:-2]), comps[-2], comps[-1]))
-
+ORDERED can be this tree (in Nexus or Newick format) - in which case species are ordered by
+phylogenetic distance from --reference - or a CSV file listing species in order, in a column
+"species".
 """
 import string
-import collections
+import itertools
 
-from clldutils.clilib import PathType
+from clldutils.clilib import PathType, ParserError
 from clldutils.jsonlib import dump
-from csvw.dsv import reader
+from csvw.dsv import reader, UnicodeWriter
+
+from pyacc.phylogeny import ordered_species
+
+RANKS = ['phylum', 'klass', 'order', 'family', 'genus']
+
+
+def sortkey(i, width=1):
+    """
+    Encode the number `i` as `width` lowercase letters, such that the sort order of sort keys of
+    equal width matches the order of the numbers.
+    """
+    res = []
+    for _ in range(width):
+        i, r = divmod(i, 26)
+        res.append(string.ascii_lowercase[r])
+    if i:
+        raise ValueError('{} sort key width exceeded'.format(width))
+    return ''.join(reversed(res))
+
+
+def sortkey_width(n):
+    """
+    :return: Number of letters needed for sort keys of `n` items.
+    """
+    res = 1
+    while n > 26 ** res:
+        res += 1
+    return res
+
+
+class Ordering:
+    """
+    Lookup of the position of species names in an ordered list of (lowercase) species names.
+    """
+    def __init__(self, names):
+        self.names, self.genera, self.size = {}, {}, 0
+        for i, name in enumerate(names):
+            self.names.setdefault(name, i)
+            words = name.split()
+            if words:
+                self.genera.setdefault(words[0], i)
+            self.size = i + 1
+
+    def __len__(self):
+        return self.size
+
+    def index(self, species):
+        """
+        :return: Position of the full name, the binomial or the first species of the genus of \
+        `species` - or `len(self) + 1` if none can be found.
+        """
+        key = species.lower()
+        words = key.split()
+        for k in [key, ' '.join(words[:2])]:
+            if k in self.names:
+                return self.names[k]
+        if words and words[0] in self.genera:
+            return self.genera[words[0]]
+        return len(self) + 1
+
+
+def is_tree(path):
+    with path.open(encoding='utf8') as f:
+        return f.read(1024).lstrip()[:1] in ('#', '(')
 
 
 def register(parser):
-    parser.add_argument('ordered', type=PathType(type='file'))
+    parser.add_argument('ordered', metavar='ORDERED', type=PathType(type='file'))
+    parser.add_argument(
+        '--reference',
+        help="Name of the taxon to compute phylogenetic distances from, if ORDERED is a tree",
+        default='Homo sapiens')
+    parser.add_argument(
+        '--write-ordered',
+        metavar='CSV',
+        help="Write the species ordered by distance from --reference to CSV",
+        type=PathType(type='file', must_exist=False),
+        default=None)
 
 
 def run(args):
-    ordered = [d['species'].lower() for d in reader(args.ordered, dicts=True)]
-    ranks = ['phylum', 'klass', 'order', 'family', 'genus']
+    if is_tree(args.ordered):
+        try:
+            ordered = ordered_species(args.ordered, reference=args.reference)
+        except ValueError as e:
+            raise ParserError(str(e))
+        if args.write_ordered:
+            with UnicodeWriter(args.write_ordered) as w:
+                w.writerow(['species', 'distance'])
+                w.writerows(ordered)
+        ordering = Ordering(name.lower() for name, _ in ordered)
+    else:
+        ordering = Ordering(d['species'].lower() for d in reader(args.ordered, dicts=True))
 
-    ordered_ranks = {r: {} for r in ranks}
-    seen = {}
-    augmented_species = []
+    classification, positions = {}, []
     for ex in args.api.experiments:
+        if not ex.gbif:
+            continue
         species = ex.gbif.cname
-        if species not in seen:
-            seen[species] = (ex.gbif.classification, ex.species_latin)
-            skey = species.lower()
-            if skey not in ordered:
-                skey = ' '.join(skey.split()[:2])
-            if skey not in ordered:
-                skey = [n for n in ordered if n.split()[0] == skey.split()[0]]
-                if skey:
-                    skey = skey[0]
-
-            if skey in ordered:
-                augmented_species.append((species, ordered.index(skey)))
-            else:
-                augmented_species.append((species, len(ordered) + 1))
-
-    for s, i in sorted(augmented_species, key=lambda t: t[1], reverse=True):
-        for r in ranks:
-            ordered_ranks[r][getattr(seen[s][0], r)] = i
-
-    fully_augmented_species = {
-        s: (
-            ordered_ranks['phylum'][seen[s][0].phylum],
-            ordered_ranks['klass'][seen[s][0].klass],
-            ordered_ranks['order'][seen[s][0].order],
-            ordered_ranks['family'][seen[s][0].family],
-            ordered_ranks['genus'][seen[s][0].genus],
-            i)
-        for s, i in sorted(augmented_species, key=lambda t: t[1])
-    }
-    clf = collections.defaultdict(lambda: [-1, None])
-    prefix = {}
-    for k, _ in sorted(fully_augmented_species.items(), key=lambda i: i[1], reverse=True):
-        for j, a in enumerate(ranks):
-            if clf[a][1] != getattr(seen[k][0], a):
-                for aa in ranks[j + 1:]:
-                    clf[aa][0] = -1
-                if a == 'genus':
-                    # reset prefix index for all deeper taxonomy ranks:
-                    clf['species'][0] = -1
-                clf[a][0] += 1
-                clf[a][1] = getattr(seen[k][0], a)
-                node_name = '_'.join(getattr(seen[k][0], aa) for aa in ranks[:j + 1])
-                prefix[node_name] = string.ascii_lowercase[clf[a][0]]
-        if clf['species'][1] != k:
-            clf['species'][0] += 1
-            clf['species'][1] = k
-            prefix[k.lower()] = string.ascii_lowercase[clf['species'][0]]
-    dump(prefix, args.api.path('taxa_sortkeys.json'), indent=4)
+        if species not in classification:
+            classification[species] = ex.gbif.classification
+            positions.append((species, ordering.index(species)))
+
+    # Taxa of all ranks are ordered by the position of their first species:
+    first = {r: {} for r in RANKS}
+    for s, i in positions:
+        for r in RANKS:
+            taxon = getattr(classification[s], r)
+            if i < first[r].get(taxon, i + 1):
+                first[r][taxon] = i
+
+    def key(item):
+        s, i = item
+        return tuple(first[r][getattr(classification[s], r)] for r in RANKS) + (i, )
+
+    # We number the children of each taxon in order, and then turn the numbers into sort keys
+    # with the width required for the number of siblings:
+    groups = itertools.count()
+    current = {r: [-1, None, next(groups)] for r in RANKS + ['species']}
+    numbers, sizes = {}, {}
+
+    def number(name, rank):
+        n, _, group = current[rank]
+        numbers[name] = (group, n)
+        sizes[group] = max(sizes.get(group, 0), n + 1)
+
+    for s, _ in sorted(positions, key=key, reverse=True):
+        clf = classification[s]
+        for j, r in enumerate(RANKS):
+            taxon = getattr(clf, r)
+            if current[r][1] != taxon:
+                # reset prefix index for all deeper taxonomy ranks:
+                for rr in RANKS[j + 1:] + (['species'] if r == 'genus' else []):
+                    current[rr][0], current[rr][2] = -1, next(groups)
+                current[r][0] += 1
+                current[r][1] = taxon
+                number('_'.join(getattr(clf, rr) for rr in RANKS[:j + 1]), r)
+        if current['species'][1] != s:
+            current['species'][0] += 1
+            current['species'][1] = s
+            number(s.lower(), 'species')
+    dump(
+        {name: sortkey(n, sortkey_width(sizes[group])) for name, (group, n) in numbers.items()},
+        args.api.path('taxa_sortkeys.json'),
+        indent=4)
@@ -0,0 +1,53 @@
+"""
+Serve queries on the dataset - held in memory - via a JSON API over HTTP or a Unix socket.
+
+The data files are checked for changes every --interval seconds and reloaded if necessary. See
+`pyacc.server` for the API endpoints, e.g.
+
+    curl "http://127.0.0.1:8000/count?group_by=order&area=memory"
+"""
+from pyacc import ACC
+from pyacc.server import HTTPServer, UnixHTTPServer, Handler
+
+
+def register(parser):
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument(
+        '--socket',
+        metavar='PATH',
+        help="Path of a Unix socket to listen on, instead of --host and --port",
+        default=None)
+    parser.add_argument(
+        '--workers',
+        help="Number of threads handling requests",
+        type=int,
+        default=8)
+    parser.add_argument(
+        '--interval',
+        help="Seconds between checks of the data files for changes (0 to never reload)",
+        type=float,
+        default=2.0)
+
+
+def run(args):
+    if args.socket:
+        server = UnixHTTPServer(args.socket, Handler, bind_and_activate=False)
+    else:
+        server = HTTPServer((args.host, args.port), Handler, bind_and_activate=False)
+    server.workers = args.workers
+    server.setup_dataset(
+        lambda: ACC(args.api.repos, use_cache=args.api.use_cache),
+        interval=args.interval or None,
+        log=args.log)
+    server.server_bind()
+    server.server_activate()
+    args.log.info('serving {} experiments on {}'.format(
+        len(server.dataset.experiments),
+        args.socket or 'http://{}:{}'.format(*server.server_address[:2])))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:  # pragma: no cover
+        pass
+    finally:
+        server.server_close()
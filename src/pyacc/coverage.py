@@ -0,0 +1,84 @@
+"""
+Coverage of the taxonomy by the species in the dataset, relative to the GBIF backbone.
+
+For each taxon in the dataset we compare the number of its child taxa (or species, for genera)
+in the dataset with the number in the backbone. Both sides are counted with
+`pyacc.backbone.taxon_counts`, i.e. on dictionary encoded rank columns.
+"""
+import collections
+
+from pyacc.backbone import RANKS, taxon_counts
+from pyacc.query import Column
+
+CHILDREN = ['classes', 'orders', 'families', 'genera', 'species']
+
+
+class Coverage:
+    """
+    .. code-block:: python
+
+        >>> cov = Coverage.from_species(classifications, SpeciesIndex.load(path).counts)
+        >>> for taxon, covered, total in cov:
+        ...     print('_'.join(taxon), covered, total)
+    """
+    def __init__(self, counts, reference, order=None):
+        """
+        :param counts: `taxon_counts` for the dataset.
+        :param reference: `taxon_counts` for the backbone.
+        :param order: `dict` mapping taxa to their rank in the listing order.
+        """
+        self.counts = counts
+        self.reference = reference
+        self.order = order or {}
+
+    @classmethod
+    def from_species(cls, species, reference):
+        """
+        :param species: Iterable of `dict`s mapping `RANKS` to names, one per distinct species.
+        :param reference: `taxon_counts` for the backbone.
+        """
+        columns, order = [Column() for _ in RANKS], {}
+        for sp in species:
+            names = tuple(sp[rank] for rank in RANKS)
+            for col, name in zip(columns, names):
+                col.append(name)
+            for i in range(1, len(names) + 1):
+                order.setdefault(names[:i], len(order))
+        return cls(taxon_counts(columns), reference, order)
+
+    def _sortkey(self, taxon):
+        # Taxa are listed depth-first, with siblings in order of first appearance in the data:
+        return tuple(self.order.get(taxon[:i + 1], -1) for i in range(len(taxon)))
+
+    def rank(self, rank):
+        """
+        :return: `list` of triples (taxon, covered, total) for the taxa of `rank` in the dataset.
+        """
+        i = RANKS.index(rank)
+        return [
+            (taxon, n, self.reference[i].get(taxon, 0))
+            for taxon, n in sorted(self.counts[i].items(), key=lambda t: self._sortkey(t[0]))]
+
+    def __iter__(self):
+        """
+        Iterate over triples (taxon, covered, total) for all taxa in the dataset, depth-first.
+        """
+        taxa = [(taxon, len(taxon) - 1) for counts in self.counts for taxon in counts]
+        for taxon, i in sorted(taxa, key=lambda t: self._sortkey(t[0])):
+            yield taxon, self.counts[i][taxon], self.reference[i].get(taxon, 0)
+
+    def as_dict(self):
+        """
+        :return: `OrderedDict` mapping `_`-joined taxon names to pairs (covered, total).
+        """
+        return collections.OrderedDict(
+            ('_'.join(taxon), (covered, total)) for taxon, covered, total in self)
+
+    def iter_rows(self, rank):
+        """
+        Rows for tabular export of the coverage at `rank`.
+        """
+        child = CHILDREN[RANKS.index(rank)]
+        yield RANKS[:RANKS.index(rank) + 1] + ['covered_' + child, 'total_' + child]
+        for taxon, covered, total in self.rank(rank):
+            yield list(taxon) + [covered, total]
@@ -0,0 +1,213 @@
+"""
+Export of the curated dataset to a normalized SQLite database.
+
+.. code-block:: python
+
+    >>> export(api, 'acc.sqlite')
+    >>> db = sqlite3.connect('acc.sqlite')
+    >>> db.execute('''SELECT e.id FROM experiment AS e JOIN species AS s ON e.species_id = s.id
+    ...               WHERE s.genus = ?''', ('Corvus',))
+
+A full export loads all tables with `executemany` in one transaction and creates the indexes
+afterwards. An incremental export compares digests of the rows with the ones stored with the last
+export and only writes rows which were added or changed - and deletes rows which are gone.
+"""
+import hashlib
+import sqlite3
+import pathlib
+import collections
+
+import attr
+
+import pyacc
+from pyacc import instrument
+
+RANKS = ['kingdom', 'phylum', 'class', 'order', 'family', 'genus']
+BATCH_SIZE = 10000
+
+
+@attr.s
+class Table:
+    name = attr.ib()
+    columns = attr.ib()
+    indexes = attr.ib(default=attr.Factory(list))
+    # Tables with foreign keys must come after the referenced tables:
+    foreign_keys = attr.ib(default=attr.Factory(dict))
+
+    def create(self):
+        cols = ['id TEXT PRIMARY KEY'] + [
+            '"{}"'.format(c) if c in RANKS else c for c in self.columns] + ['digest BLOB']
+        cols.extend(
+            'FOREIGN KEY({0}) REFERENCES {1}(id)'.format(col, ref)
+            for col, ref in sorted(self.foreign_keys.items()))
+        return 'CREATE TABLE IF NOT EXISTS {0} (\n    {1}\n)'.format(
+            self.name, ',\n    '.join(cols))
+
+    def create_indexes(self):
+        for col in self.indexes:
+            yield 'CREATE INDEX IF NOT EXISTS {0}_{1} ON {0}("{1}")'.format(self.name, col)
+
+    def upsert(self):
+        cols = ['id'] + ['"{}"'.format(c) for c in self.columns] + ['digest']
+        return 'INSERT OR REPLACE INTO {0} ({1}) VALUES ({2})'.format(
+            self.name, ', '.join(cols), ', '.join('?' * len(cols)))
+
+
+TABLES = collections.OrderedDict((t.name, t) for t in [
+    Table('contributor', ['name', 'first', 'last']),
+    Table(
+        'contribution',
+        ['contributor_id', 'name', 'title'],
+        indexes=['contributor_id'],
+        foreign_keys=dict(contributor_id='contributor')),
+    Table(
+        'species',
+        ['name', 'gbif_key', 'gbif_name'] + RANKS,
+        indexes=['name', 'gbif_key'] + RANKS),
+    Table('parameter', ['name']),
+    Table(
+        'source',
+        ['citekey', 'genre', 'author', 'title', 'year', 'journal', 'bibtex'],
+        indexes=['year']),
+    Table(
+        'experiment',
+        [
+            'contribution_id', 'species_id', 'parameter_id', 'source_id', 'paper_number',
+            'experiment_number', 'species_common_name', 'domain', 'area', 'sample_size', 'type',
+            'year', 'abstract'],
+        indexes=[
+            'contribution_id', 'species_id', 'parameter_id', 'source_id', 'domain', 'area',
+            'type', 'year'],
+        foreign_keys=dict(
+            contribution_id='contribution',
+            species_id='species',
+            parameter_id='parameter')),
+])
+
+
+def iter_rows(api):
+    """
+    :return: Iterable of pairs (table name, `OrderedDict` mapping IDs to rows).
+    """
+    tables = collections.OrderedDict((name, collections.OrderedDict()) for name in TABLES)
+    experiments = tables['experiment']
+    for ex in api.experiments:
+        if ex.id in experiments:
+            raise ValueError('duplicate experiment ID: {}'.format(ex.id))
+        experiments[ex.id] = (
+            ex.contribution_id, ex.species_id, ex.parameter_id, ex.doi, ex.paper_number,
+            ex.experiment_number, ex.species, ex.domain, ex.area, ex.sample_size, ex.type,
+            ex.year, ex.source_abstract)
+        # Rows of the other tables are only computed for the first experiment referencing them:
+        if ex.contributor_id not in tables['contributor']:
+            tables['contributor'][ex.contributor_id] = (
+                str(ex.reviewer), ex.reviewer.first, ex.reviewer.last)
+        if ex.contribution_id not in tables['contribution']:
+            tables['contribution'][ex.contribution_id] = (
+                ex.contributor_id, ex.contribution_name, ex.review_title)
+        if ex.parameter_id not in tables['parameter']:
+            tables['parameter'][ex.parameter_id] = (ex.parameter,)
+        if ex.species_id not in tables['species']:
+            md = (ex.gbif.metadata if ex.gbif else None) or {}
+            tables['species'][ex.species_id] = (
+                ex.species_latin, ex.gbif.key if ex.gbif else None, md.get('scientificName')) \
+                + tuple(md.get(rank) for rank in RANKS)
+    for doi, src in api.sources.items():
+        tables['source'][doi] = (
+            src.id, src.genre, src.get('author'), src.get('title'), src.get('year'),
+            src.get('journal'), src.bibtex())
+    return tables.items()
+
+
+def digest(row):
+    return hashlib.blake2b(repr(row).encode('utf8'), digest_size=8).digest()
+
+
+def _batches(items, size=BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export(api, path, incremental=False):
+    """
+    Export the dataset to the SQLite database at `path`.
+
+    :param incremental: Flag signaling whether to only write changes since the last export. If \
+    `path` does not exist - or was written by another version of pyacc - a full export is done.
+    :return: `OrderedDict` mapping table names to pairs (rows written, rows deleted).
+    """
+    path = pathlib.Path(path)
+    db = sqlite3.connect(str(path), isolation_level=None)
+    try:
+        version = None
+        if incremental:
+            try:
+                version = db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            except sqlite3.OperationalError:
+                pass
+        incremental = bool(version) and version[0] == pyacc.__version__
+
+        res = collections.OrderedDict()
+        with instrument.stage('export.collect'):
+            tables = list(iter_rows(api))
+        db.execute('BEGIN')
+        try:
+            if not incremental:
+                # Tables are re-created - and indexed - from scratch:
+                for name in reversed(list(TABLES)):
+                    db.execute('DROP TABLE IF EXISTS {}'.format(name))
+                db.execute('DROP TABLE IF EXISTS meta')
+                db.execute('CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)')
+                for table in TABLES.values():
+                    db.execute(table.create())
+            for name, rows in tables:
+                with instrument.stage('export.' + name):
+                    res[name] = _write(db, TABLES[name], rows, incremental)
+            if not incremental:
+                with instrument.stage('export.indexes'):
+                    for table in TABLES.values():
+                        for sql in table.create_indexes():
+                            db.execute(sql)
+            db.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)",
+                (pyacc.__version__,))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        if not incremental:
+            db.execute('ANALYZE')
+    finally:
+        db.close()
+    return res
+
+
+def _write(db, table, rows, incremental):
+    old = {}
+    if incremental:
+        old = dict(db.execute('SELECT id, digest FROM {}'.format(table.name)))
+    written = 0
+
+    def changed():
+        nonlocal written
+        for id_, row in rows.items():
+            d = digest(row)
+            if old.pop(id_, None) != d:
+                written += 1
+                yield (id_,) + row + (d,)
+
+    sql = table.upsert()
+    for batch in _batches(changed()):
+        db.executemany(sql, batch)
+    # Rows which were not in `rows` have been deleted from the dataset:
+    deleted = [(id_,) for id_ in old]
+    if deleted:
+        db.executemany('DELETE FROM {} WHERE id = ?'.format(table.name), deleted)
+    instrument.count('export.rows', written)
+    return written, len(deleted)
@@ -1,19 +1,127 @@
 """
 Functionality to retrieve data from GBIF.
 """
+import time
+import threading
+import concurrent.futures
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from pyacc import instrument
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket, allowing `rate` calls per second on average and bursts of up to
+    `burst` calls.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = burst or max(int(rate), 1)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # We take the token right away - possibly going into debt - and wait outside the lock
+            # until the debt would have been paid back.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
 
 
 class GBIF:
+    """
+    Client for the GBIF API, using a pooled HTTP session shared by `workers` threads.
+
+    Requests are rate limited to `rate` per second and retried - with exponential backoff - upon
+    connection errors and HTTP responses with status 429 or 5xx. If a `pyacc.cache.Cache` is
+    passed, lookup results - including failed name matches - are cached.
+    """
     api_url = 'https://api.gbif.org/v1'
 
+    def __init__(self,
+                 api_url=None,
+                 workers=8,
+                 rate=10,
+                 retries=5,
+                 backoff=0.5,
+                 timeout=30,
+                 cache=None):
+        self.api_url = api_url or self.api_url
+        self.cache = cache
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate) if rate else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _sleep(self, attempt, res=None):
+        delay = self.backoff * 2 ** attempt
+        if res is not None and res.headers.get('Retry-After', '').isdigit():
+            delay = max(delay, int(res.headers['Retry-After']))
+        time.sleep(delay)
+
     def _req(self, path, **params):
-        return requests.get(self.api_url + path, params=params).json()
+        for attempt in range(self.retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            instrument.count('http.requests')
+            try:
+                res = self.session.get(self.api_url + path, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                self._sleep(attempt)
+                continue
+            if (res.status_code == 429 or res.status_code >= 500) and attempt < self.retries:
+                self._sleep(attempt, res)
+                continue
+            res.raise_for_status()
+            instrument.count('http.bytes', len(res.content))
+            return res.json()
+
+    def _cached(self, key, func, *args, **kw):
+        if self.cache is None:
+            return func(*args, **kw)
+        return self.cache.lookup(key, func, *args, **kw)
+
+    def _match(self, name):
+        return self._req('/species/match/', name=name).get('usageKey')
 
     def species_key(self, name):
-        return self._req('/species/match/', name=name)['usageKey']
+        key = self._cached('gbif:match:' + name, self._match, name)
+        if key is None:
+            raise KeyError('No GBIF match for {}'.format(name))
+        return key
 
     def species_data(self, species):
         if isinstance(species, str):
             species = self.species_key(species)
-        return species, self._req('/species/{}'.format(species))
+        return species, self._cached(
+            'gbif:species:{}'.format(species), self._req, '/species/{}'.format(species))
+
+    def species_data_many(self, names):
+        """
+        Look up data for many species concurrently.
+
+        :return: generator of triples (name, (key, metadata) or None, exception or None), in the \
+        order of `names`.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(self.workers, 1)) as executor:
+            futures = [(name, executor.submit(self.species_data, name)) for name in names]
+            for name, future in futures:
+                try:
+                    yield name, future.result(), None
+                except Exception as e:
+                    yield name, None, e
@@ -0,0 +1,370 @@
+"""
+Ingestion of per-reviewer workbooks (xlsx) or CSV files into `data.Sheet1.csv`.
+
+Input files are read - and their rows mapped to the columns of `data.Sheet1.csv` by name - in
+parallel worker processes, each writing the mapped, valid rows to a temporary CSV file. These are
+then merged into `data.Sheet1.csv`, streaming rows, in the order the inputs were given:
+
+- Rows are deduplicated by experiment ID. The index of known IDs holds only 8-byte digests of the
+  ID and of the row, so memory is bounded by the number of distinct experiments. A row with a
+  known ID is skipped if it is identical to the merged one - and reported as conflict otherwise.
+- The index and the md5 checksums of the ingested files are kept in `.cache/ingest.keys` and
+  `.cache/ingest.json`. Unchanged input files are skipped, and rows of new files are appended to
+  `data.Sheet1.csv` - so ingesting one more file costs time proportional to the size of this file.
+- If a file ingested before has changed, `data.Sheet1.csv` is rewritten without the rows of the
+  previous version of the file. Since the index records all inputs supplying an experiment, the
+  inputs which supplied duplicates of - or conflicts with - these rows are ingested again, so
+  that their rows are merged instead.
+- If `data.Sheet1.csv` was changed by other means (e.g. `acc dump`), the index is rebuilt from it.
+"""
+import os
+import csv
+import struct
+import pathlib
+import tempfile
+import itertools
+import collections
+import concurrent.futures
+
+import attr
+from clldutils import jsonlib
+from clldutils.path import md5
+
+import pyacc
+from pyacc import instrument
+from pyacc.validate import Report, Issue, COLUMNS, WARNING, digest, check_experiment
+
+# Records of the index: ID digest, row digest and number of the input file the row came from -
+# or 0 for rows which were not ingested. The first record for an ID is the one of the merged row,
+# further records are for duplicates or conflicting rows from other inputs.
+KEY = struct.Struct('<8s8sI')
+
+
+def normalize(col):
+    return ' '.join(col.split()).lower()
+
+
+def row_digest(values):
+    return digest('\x1f'.join(values))
+
+
+def read_table(path):
+    """
+    :return: Generator of rows (`list`s of `str`) of a CSV file or the first sheet of a workbook.
+    """
+    path = pathlib.Path(path)
+    if path.suffix.lower() in ('.xlsx', '.xlsm'):
+        import openpyxl
+        from pyacc.api import _excel_value
+
+        wb = openpyxl.load_workbook(str(path), read_only=True, data_only=True)
+        try:
+            for row in wb.worksheets[0].iter_rows(values_only=True):
+                yield [_excel_value(v) for v in row]
+        finally:
+            wb.close()
+    else:
+        from csvw import dsv
+
+        for row in dsv.reader(path):
+            yield row
+
+
+def read_input(path, header, descriptions, corrections, tmp):
+    """
+    Map the rows of an input file to the columns `header` and write the valid ones to `tmp`.
+
+    This is a module-level function, so that it can be run in worker processes.
+
+    :param descriptions: The row of column descriptions of `data.Sheet1.csv`. If the second row \
+    of the input is the same, it is skipped.
+    :return: pair (`list` of `Issue`s, `list` of tuples (row number, ID digest, row digest, ID) \
+    for the rows written to `tmp`).
+    """
+    from csvw import dsv
+
+    issues, keys = [], []
+    # The temporary file is created in any case - possibly empty, if no rows can be merged:
+    with dsv.UnicodeWriter(tmp) as writer:
+        rows = read_table(path)
+        index = {}
+        for i, col in enumerate(next(rows, None) or []):
+            if col:
+                index.setdefault(normalize(col), i)
+        missing = [c for c in COLUMNS if normalize(c) not in index]
+        if missing:
+            issues.append(Issue(
+                1, 'columns', 'missing columns: {}'.format(', '.join(missing)), path=str(path)))
+            return issues, keys
+        known = set(normalize(c) for c in header)
+        ignored = [c for c in index if c not in known]
+        if ignored:
+            issues.append(Issue(
+                1, 'columns', 'ignored columns: {}'.format(', '.join(ignored)),
+                severity=WARNING, path=str(path)))
+
+        mapping = [index.get(normalize(c)) for c in header]
+        for rownum, row in enumerate(rows, start=2):
+            values = [row[i] if i is not None and i < len(row) else '' for i in mapping]
+            if not any(values) or (rownum == 2 and any(descriptions) and values == descriptions):
+                continue
+            problems, ex = check_experiment(dict(zip(header, values)), corrections)
+            for issue in problems:
+                issue.row, issue.path = rownum, str(path)
+                issues.append(issue)
+            if ex:
+                writer.writerow(values)
+                keys.append((rownum, digest(ex.id), row_digest(values), ex.id))
+    return issues, keys
+
+
+@attr.s
+class Input:
+    path = attr.ib()
+    status = attr.ib(default='merged')
+    rows = attr.ib(default=0)
+    added = attr.ib(default=0)
+    duplicates = attr.ib(default=0)
+    conflicts = attr.ib(default=0)
+
+
+class IngestReport(Report):
+    """
+    Problems with the rows of the input files, and an `Input` per file.
+    """
+    def __init__(self):
+        Report.__init__(self)
+        self.inputs = collections.OrderedDict()
+
+
+def _stat(path):
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_keys(path):
+    """
+    :return: pair of `dict`s mapping ID digests to pairs (row digest, input number) of the merged \
+    rows, and to `list`s of such pairs for other rows with the ID.
+    """
+    keys, others = {}, {}
+    with path.open('rb') as fp:
+        for idd, rd, origin in KEY.iter_unpack(fp.read()):
+            if idd in keys:
+                others.setdefault(idd, []).append((rd, origin))
+            else:
+                keys[idd] = (rd, origin)
+    return keys, others
+
+
+def dump_keys(keys, others, path, mode='wb'):
+    with path.open(mode) as fp:
+        fp.write(b''.join(KEY.pack(idd, rd, origin) for idd, (rd, origin) in keys.items()))
+        fp.write(b''.join(
+            KEY.pack(idd, rd, origin) for idd, rows in others.items() for rd, origin in rows))
+
+
+def data_rows(path):
+    """
+    :return: Generator of the rows of `data.Sheet1.csv`, without header and descriptions.
+    """
+    from csvw import dsv
+
+    return itertools.islice(dsv.reader(path), 2, None)
+
+
+def index_rows(rows, header, corrections, old=None):
+    """
+    Build the index of the rows of `data.Sheet1.csv`.
+
+    :param old: The previous index, to keep the input numbers of unchanged rows.
+    """
+    res, old = {}, old or {}
+    for values in rows:
+        _, ex = check_experiment(dict(zip(header, values)), corrections)
+        if ex:
+            idd, rd = digest(ex.id), row_digest(values)
+            prev = old.get(idd)
+            res.setdefault(idd, (rd, prev[1] if prev and prev[0] == rd else 0))
+    return res
+
+
+def dependents(keys, others, stale):
+    """
+    :param stale: `set` of numbers of inputs whose rows are dropped.
+    :return: `set` of numbers of the inputs which must be ingested again with the `stale` ones, \
+    because they supplied rows with IDs of the dropped rows - and so on.
+    """
+    res, todo = set(), set(stale)
+    while todo:
+        more = set(
+            origin
+            for idd, (_, merged) in keys.items() if merged in todo
+            for _, origin in others.get(idd, []))
+        todo = more - stale - res
+        res |= todo
+    return res
+
+
+def ingest(api, paths, workers=None, force=False):
+    """
+    Merge the rows of the input files `paths` into `data.Sheet1.csv`.
+
+    :param workers: Maximal number of worker processes reading inputs concurrently. Defaults to \
+    the number of CPUs; `1` reads all inputs in the current process.
+    :param force: Flag signaling whether to also ingest files which did not change.
+    :return: `IngestReport`
+    """
+    from csvw import dsv
+
+    target = api.path('data.Sheet1.csv')
+    cache = api.path('.cache')
+    cache.mkdir(exist_ok=True)
+    manifest_path, keys_path = cache / 'ingest.json', cache / 'ingest.keys'
+    manifest = jsonlib.load(manifest_path) if manifest_path.exists() else {}
+    if manifest.get('version') != pyacc.__version__ or not keys_path.exists():
+        manifest = {}
+    inputs = manifest.get('inputs', collections.OrderedDict())
+
+    header, descriptions = list(COLUMNS), [''] * len(COLUMNS)
+    if target.exists():
+        rows = list(itertools.islice(dsv.reader(target), 2))
+        header = rows[0]
+        descriptions = rows[1] if len(rows) > 1 else [''] * len(header)
+        missing = [c for c in COLUMNS if c not in header]
+        if missing:
+            raise ValueError('missing columns in {0}: {1}'.format(target, ', '.join(missing)))
+
+    # Load the index - or rebuild it, if data.Sheet1.csv has been changed by other means:
+    with instrument.stage('ingest.index'):
+        keys, others = load_keys(keys_path) if manifest else ({}, {})
+        rebuilt = False
+        if target.exists() and manifest.get('target') != _stat(target):
+            rebuilt = True
+            keys = index_rows(data_rows(target), header, api.species_corrections, old=keys)
+            others = {idd: rows for idd, rows in others.items() if idd in keys}
+
+    report, todo, stale = IngestReport(), collections.OrderedDict(), set()
+    for path in paths:
+        path = pathlib.Path(path).resolve()
+        checksum = md5(path)
+        old = inputs.get(str(path))
+        if old and old['md5'] == checksum and not force:
+            report.inputs[str(path)] = Input(str(path), status='unchanged')
+            continue
+        report.inputs[str(path)] = None
+        origin = old['number'] if old else max(
+            [i['number'] for i in inputs.values()] or [0]) + 1
+        todo[str(path)] = (path, checksum, origin)
+        if old:
+            stale.add(origin)
+        # Record the number right away, so that it isn't assigned again:
+        inputs[str(path)] = dict(md5=None, number=origin)
+
+    # Inputs which supplied rows with the IDs of dropped rows are ingested again - after the
+    # given ones, in the order they were first ingested:
+    sources = {i['number']: p for p, i in inputs.items()}
+    stale |= dependents(keys, others, stale)
+    for p in [sources[n] for n in sorted(stale) if n in sources]:
+        if p in todo:
+            continue
+        if not pathlib.Path(p).exists():
+            report.add(Issue(
+                1, 'input', 'file not found - its rows cannot be merged again',
+                severity=WARNING, path=p))
+            del inputs[p]
+            continue
+        report.inputs[p] = None
+        todo[p] = (pathlib.Path(p), inputs[p]['md5'], inputs[p]['number'])
+    # Inputs are merged in the order of the report:
+    todo = [todo[p] for p in report.inputs if p in todo]
+    if not todo:
+        return report
+
+    # Rows from the stale inputs are dropped - by rewriting the sheet:
+    drop = set(rd for rd, origin in keys.values() if origin in stale)
+    keys = {idd: v for idd, v in keys.items() if v[1] not in stale}
+    others = {
+        idd: [v for v in rows if v[1] not in stale] for idd, rows in others.items()
+        if idd in keys}
+
+    with tempfile.TemporaryDirectory(dir=str(cache)) as tmpdir:
+        tmpdir = pathlib.Path(tmpdir)
+        args = [
+            (path, header, descriptions, api.species_corrections, tmpdir / '{}.csv'.format(i))
+            for i, (path, _, _) in enumerate(todo)]
+        if drop or not target.exists():
+            out = tmpdir / 'data.Sheet1.csv'
+            with dsv.UnicodeWriter(out) as writer:
+                writer.writerow(header)
+                writer.writerow(descriptions)
+                if target.exists():
+                    for values in data_rows(target):
+                        if row_digest(values) not in drop:
+                            writer.writerow(values)
+        else:
+            out = target
+        new, new_others = {}, collections.OrderedDict()
+
+        def results():
+            if workers == 1 or len(todo) < 2:
+                for a in args:
+                    yield read_input(*a)
+                return
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(workers or os.cpu_count() or 1, len(todo))) as executor:
+                for future in [executor.submit(read_input, *a) for a in args]:
+                    yield future.result()
+
+        with out.open('a', encoding='utf8', newline='') as fp, \
+                dsv.UnicodeWriter(fp) as writer, \
+                instrument.stage('ingest.merge'):
+            for (path, checksum, origin), a, (issues, rows) in zip(todo, args, results()):
+                res = report.inputs[str(path)] = Input(str(path), rows=len(rows))
+                for issue in issues:
+                    report.add(issue)
+                # We wrote the temporary file ourselves, so the plain csv module can read it:
+                with a[-1].open(encoding='utf8', newline='') as tmp:
+                    merged = zip(csv.reader(tmp), rows)
+                    for values, (rownum, idd, rd, id_) in merged:
+                        known = keys.get(idd)
+                        if known is None:
+                            keys[idd] = new[idd] = (rd, origin)
+                            writer.writerow(values)
+                            res.added += 1
+                            continue
+                        # Record the input as supplier of the ID, too:
+                        others.setdefault(idd, []).append((rd, origin))
+                        new_others.setdefault(idd, []).append((rd, origin))
+                        if known[0] == rd:
+                            res.duplicates += 1
+                        else:
+                            res.conflicts += 1
+                            report.add(Issue(
+                                rownum,
+                                'conflict',
+                                'experiment {0} differs from the one merged from {1}'.format(
+                                    id_, sources.get(known[1], target.name)),
+                                path=str(path)))
+                report.rows += len(rows)
+                inputs[str(path)]['md5'] = checksum
+                sources[origin] = str(path)
+        if out != target:
+            os.replace(str(out), str(target))
+
+    instrument.count('ingest.rows', report.rows)
+    if drop or rebuilt or not manifest:
+        dump_keys(keys, others, keys_path)
+    else:
+        # Only records of new rows must be added to the index:
+        dump_keys(new, new_others, keys_path, mode='ab')
+    jsonlib.dump(
+        collections.OrderedDict([
+            ('version', pyacc.__version__),
+            ('target', _stat(target)),
+            ('inputs', collections.OrderedDict(
+                (p, i) for p, i in inputs.items() if i['md5'])),
+        ]),
+        manifest_path,
+        indent=4)
+    return report
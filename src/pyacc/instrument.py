@@ -0,0 +1,188 @@
+"""
+Instrumentation of the ACC pipeline: timings of stages, counters and peak memory.
+
+Code in pyacc marks coarse stages of work (reading the data, looking up GBIF data, running a
+command, ...) with `stage` and counts events (rows parsed, cache hits, HTTP requests, ...) with
+`count`. Both are no-ops unless a hook is registered, so instrumentation costs next to nothing
+when it is not used.
+
+Library users can collect the metrics with a `Recorder`:
+
+.. code-block:: python
+
+    >>> from pyacc import ACC, instrument
+    >>> with instrument.Recorder() as rec:
+    ...     ACC('acc-data').experiments
+    >>> rec.stages['experiments'].seconds, rec.counters['rows.parsed']
+
+or register any object with methods `on_stage(name, start, seconds, depth)` and
+`on_count(name, n)` using `add_hook`.
+"""
+import sys
+import time
+import functools
+import threading
+import contextlib
+import collections
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+import attr
+
+_hooks = []
+_local = threading.local()
+
+
+def add_hook(hook):
+    """
+    Register `hook` to be notified of finished stages and counted events.
+    """
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+@contextlib.contextmanager
+def _stage(name):
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _local.depth = depth
+        for hook in list(_hooks):
+            hook.on_stage(name, start, seconds, depth)
+
+
+def stage(name):
+    """
+    Context manager marking a stage of work.
+
+    .. code-block:: python
+
+        >>> with stage('experiments.read'):
+        ...     rows = list(reader)
+    """
+    return _stage(name) if _hooks else contextlib.ExitStack()
+
+
+def staged(name):
+    """
+    Decorator marking calls of a function as stage `name`.
+    """
+    def wrapper(func):
+        @functools.wraps(func)
+        def wrapped(*args, **kw):
+            if not _hooks:
+                return func(*args, **kw)
+            with _stage(name):
+                return func(*args, **kw)
+        return wrapped
+    return wrapper
+
+
+def count(name, n=1):
+    """
+    Add `n` to the counter `name`.
+    """
+    for hook in _hooks:
+        hook.on_count(name, n)
+
+
+def peak_rss():
+    """
+    :return: Peak resident set size of the current process in MB or `None`, if not available.
+    """
+    if resource is None:  # pragma: no cover
+        return None
+    res = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in KB elsewhere:
+    return res / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+@attr.s(slots=True)
+class Stage:
+    name = attr.ib()
+    calls = attr.ib(default=0)
+    seconds = attr.ib(default=0.0)
+    # Peak resident memory of the process when the stage last finished, in MB:
+    peak_rss_mb = attr.ib(default=None)
+
+
+class Recorder:
+    """
+    Hook collecting per-stage timings, counters and peak memory.
+
+    Stages are aggregated by name, in order of first completion. With `trace=True` each stage
+    run is also recorded as event, e.g. for export as JSON trace.
+    """
+    def __init__(self, trace=False):
+        self.stages = collections.OrderedDict()
+        self.counters = collections.Counter()
+        self.events = [] if trace else None
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, *args):
+        remove_hook(self)
+
+    def on_stage(self, name, start, seconds, depth):
+        rss = peak_rss()
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = Stage(name)
+            st = self.stages[name]
+            st.calls += 1
+            st.seconds += seconds
+            st.peak_rss_mb = rss
+            if self.events is not None:
+                self.events.append(collections.OrderedDict([
+                    ('name', name),
+                    ('start', start - self.start),
+                    ('seconds', seconds),
+                    ('depth', depth),
+                    ('thread', threading.current_thread().name),
+                ]))
+
+    def on_count(self, name, n):
+        with self._lock:
+            self.counters[name] += n
+
+    def as_dict(self):
+        return collections.OrderedDict([
+            ('stages', [attr.asdict(st, dict_factory=collections.OrderedDict)
+                        for st in self.stages.values()]),
+            ('counters', collections.OrderedDict(sorted(self.counters.items()))),
+            ('peak_rss_mb', peak_rss()),
+            ('events', self.events or []),
+        ])
+
+    def summary(self, fp=None):
+        """
+        Write a summary table of stages and counters to `fp` (default: `sys.stderr`).
+        """
+        fp = fp or sys.stderr
+        fp.write('{:<30} {:>6} {:>10} {:>10}\n'.format('stage', 'calls', 'seconds', 'peak MB'))
+        for st in self.stages.values():
+            fp.write('{:<30} {:>6} {:>10.3f} {:>10}\n'.format(
+                st.name,
+                st.calls,
+                st.seconds,
+                '' if st.peak_rss_mb is None else '{:.1f}'.format(st.peak_rss_mb)))
+        if self.counters:
+            fp.write('\n{:<30} {:>10}\n'.format('counter', 'value'))
+            for name, n in sorted(self.counters.items()):
+                fp.write('{:<30} {:>10}\n'.format(name, n))
@@ -0,0 +1,210 @@
+"""
+Approximate matching of species names, to detect and correct typos.
+
+Names are matched word by word: Each distinct word of the vocabulary is split into
+`max_edits + 1` segments, which are indexed by word length, segment number and content. By the
+pigeonhole principle, a word within `max_edits` edits of a query word must contain one of its
+segments unchanged - and shifted by at most `max_edits` positions - in the query word. Thus, a
+lookup only needs a few dozen hash probes, no matter how big the vocabulary is. Candidate words
+are verified by computing their (banded) Levenshtein distance to the query word, and candidate
+names are combinations of candidate words which are in the vocabulary.
+
+.. code-block:: python
+
+    >>> m = Matcher(['Pan troglodytes', 'Psittacus erithacus'])
+    >>> m.match('psittacus eithacus')
+    [Match(name='Psittacus erithacus', score=0.947...)]
+"""
+import itertools
+import collections
+
+from pyacc.backbone import Index, NameIndex, iter_rows, normalize_name
+
+Match = collections.namedtuple('Match', ['name', 'score'])
+
+
+def levenshtein(a, b, limit=None):
+    """
+    Edit distance between `a` and `b`.
+
+    :param limit: If the distance is bigger than `limit`, `limit + 1` is returned. This allows \
+    computing only a band of width `2 * limit + 1` around the diagonal of the DP matrix.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    n, m = len(a), len(b)
+    limit = n if limit is None else limit
+    big = limit + 1
+    if n - m > limit:
+        return big
+    previous = [j if j <= limit else big for j in range(m + 1)]
+    for i in range(1, n + 1):
+        lo, hi = max(1, i - limit), min(m, i + limit)
+        current = [big] * (m + 1)
+        current[0] = i if i <= limit else big
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != b[j - 1]))
+        if min(current[lo - 1:hi + 1]) > limit:
+            return big
+        previous = current
+    return min(previous[m], big)
+
+
+def segments(length, n):
+    """
+    Split a string of `length` characters into `n` segments of (almost) equal length.
+
+    :return: `list` of pairs (start, length).
+    """
+    q, r = divmod(length, n)
+    res, start = [], 0
+    for i in range(n):
+        size = q + (1 if i >= n - r else 0)
+        res.append((start, size))
+        start += size
+    return res
+
+
+class WordIndex:
+    """
+    Segment index over a vocabulary of words, for lookup of words within `max_edits` edits.
+    """
+    def __init__(self, max_edits=2):
+        self.max_edits = max_edits
+        self.words = []
+        self._ids = {}
+        self._segments = {}
+        self._short = collections.defaultdict(list)  # Words too short to be segmented.
+
+    def __getitem__(self, word):
+        return self._ids[word]
+
+    def add(self, word):
+        """
+        :return: The ID of `word` in the vocabulary.
+        """
+        if word in self._ids:
+            return self._ids[word]
+        self._ids[word] = i = len(self.words)
+        self.words.append(word)
+        if len(word) <= self.max_edits:
+            self._short[len(word)].append(i)
+        else:
+            for j, (start, size) in enumerate(segments(len(word), self.max_edits + 1)):
+                self._segments.setdefault((len(word), j, word[start:start + size]), []).append(i)
+        return i
+
+    def lookup(self, word, max_edits):
+        """
+        :return: `list` of pairs (ID, edit distance) of words within `max_edits` of `word`.
+        """
+        max_edits = min(max_edits, self.max_edits)
+        if max_edits == 0:
+            return [(self._ids[word], 0)] if word in self._ids else []
+        n, candidates = len(word), set()
+        for length in range(max(1, n - max_edits), n + max_edits + 1):
+            if length <= self.max_edits:
+                candidates.update(self._short.get(length, []))
+                continue
+            # A segment shifted by `shift` positions requires at least `abs(shift)` edits
+            # before and `abs(n - length - shift)` edits after it:
+            shifts = [
+                shift for shift in range(-max_edits, max_edits + 1)
+                if abs(shift) + abs(n - length - shift) <= max_edits]
+            for j, (start, size) in enumerate(segments(length, self.max_edits + 1)):
+                for shift in shifts:
+                    if 0 <= start + shift and start + shift + size <= n:
+                        candidates.update(self._segments.get(
+                            (length, j, word[start + shift:start + shift + size]), []))
+        res = []
+        for i in candidates:
+            d = levenshtein(word, self.words[i], limit=max_edits)
+            if d <= max_edits:
+                res.append((i, d))
+        return sorted(res, key=lambda r: r[1])
+
+
+class Matcher:
+    """
+    Index of a vocabulary of names for approximate lookup.
+
+    Typically, a misspelled name still has one word - e.g. the genus - right. So we first look
+    for matches among the names sharing the rarest correctly spelled word with the query, and only
+    if there are none, combine approximate matches for each word.
+    """
+    def __init__(self, names=(), max_edits=2):
+        self.names = []  # The vocabulary.
+        self.words = WordIndex(max_edits=max_edits)
+        self._index = {}  # Maps tuples of word IDs to indices in the vocabulary.
+        self._postings = {}  # Maps pairs (position, word ID) to lists of indices in the vocabulary.
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        key = tuple(self.words.add(w) for w in normalize_name(name).split())
+        if key not in self._index:
+            self._index[key] = i = len(self.names)
+            self.names.append(name)
+            for posting in enumerate(key):
+                self._postings.setdefault(posting, []).append(i)
+
+    def match(self, name, threshold=0.8, limit=5):
+        """
+        :param threshold: Minimal similarity score of matches, i.e. 1 minus the number of edits \
+        divided by the length of the longer name.
+        :param limit: Maximal number of matches to return.
+        :return: `list` of `Match` objects, ordered by descending score.
+        """
+        key = normalize_name(name)
+        budget = min(self.words.max_edits, int(len(key) * (1 - threshold)))
+        words = key.split()
+        anchors = [
+            self._postings.get((i, self.words._ids.get(w)), []) for i, w in enumerate(words)]
+        anchors = [a for a in anchors if a]
+        res = []
+        if anchors:
+            for i in min(anchors, key=len):
+                other = normalize_name(self.names[i])
+                d = levenshtein(key, other, limit=budget)
+                if d <= budget:
+                    res.append((i, d))
+        if not res:
+            for combination in itertools.product(*[self.words.lookup(w, budget) for w in words]):
+                d = sum(d for _, d in combination)
+                if d <= budget:
+                    i = self._index.get(tuple(wid for wid, _ in combination))
+                    if i is not None:
+                        res.append((i, d))
+        res = [
+            Match(self.names[i], 1 - d / float(max(len(key), len(self.names[i]))))
+            for i, d in res]
+        return sorted(
+            [m for m in res if m.score >= threshold], key=lambda m: (-m.score, m.name))[:limit]
+
+    def best(self, name, threshold=0.8):
+        res = self.match(name, threshold=threshold, limit=1)
+        return res[0] if res else None
+
+
+class BackboneMatcher(Index, Matcher):
+    """
+    `Matcher` for the names of species-level taxa - accepted or not - of a kingdom in the backbone.
+    """
+    def __init__(self, kingdom='Animalia', source=None):
+        Index.__init__(self, kingdom=kingdom, source=source)
+        Matcher.__init__(self)
+
+    @classmethod
+    def from_taxa(cls, path, kingdom='Animalia'):
+        res = cls(kingdom=kingdom, source=cls.fingerprint(path))
+        prefilter = ['\t{}\t'.format(kingdom)] if kingdom else None
+        for name, rank, kingdom_ in iter_rows(
+                path, ['canonicalName', 'taxonRank', 'kingdom'], prefilter=prefilter):
+            if name and rank in NameIndex.ranks and (kingdom_ == kingdom or not kingdom):
+                res.add(name)
+        return res
@@ -0,0 +1,189 @@
+"""
+Ordering of species by phylogenetic distance from a reference taxon.
+
+Distances are computed from the tree directly, without a distance matrix: The distance between
+the reference tip `r` and a tip `t` is `depth(r) + depth(t) - 2 * depth(lca(r, t))`, and the
+lowest common ancestor of `r` and `t` is the nearest ancestor of `t` on the path from the root
+to `r`. Thus, one walk up from `r` and one walk down from the root - carrying the depth of the
+nearest ancestor on the path - give all distances in O(n).
+"""
+import re
+import pathlib
+
+import newick
+
+NEXUS_COMMENT = re.compile(r'\[[^\]]*\]')
+# Unquoted labels and branch lengths end at whitespace, punctuation of the format or a comment:
+NEWICK_TOKEN = re.compile(r"[^\s(),:;\[]*")
+NEWICK_LENGTH = re.compile(r"\s*([^\s(),:;\[]*)")
+NEWICK_QUOTED = re.compile(r"'(?:[^']|'')*'")
+
+
+def preorder(tree):
+    """
+    Iterate over the nodes of `tree` in pre-order, without recursion (unlike `newick.Node.walk`,
+    which nests one generator per level).
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.descendants))
+
+
+def loads(text):
+    """
+    Parse the first tree in a Newick string.
+
+    Unlike `newick.loads`, which parses nested clades recursively, this keeps the path to the
+    current node as ancestor links - so trees of any depth can be read, e.g. caterpillar trees
+    of thousands of tips. Comments in square brackets are skipped.
+
+    :return: `newick.Node`
+    """
+    root = node = newick.Node()
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c == '(':
+            child = newick.Node()
+            node.add_descendant(child)
+            node = child
+        elif c == ',':
+            if node.ancestor is None:
+                raise ValueError('Unbalanced parentheses in Newick string')
+            child = newick.Node()
+            node.ancestor.add_descendant(child)
+            node = child
+        elif c == ')':
+            if node.ancestor is None:
+                raise ValueError('Unbalanced parentheses in Newick string')
+            node = node.ancestor
+        elif c == ';':
+            break
+        elif c == '[':
+            end = text.find(']', i)
+            if end < 0:
+                raise ValueError('Unterminated comment in Newick string')
+            i = end
+        elif c == ':':
+            m = NEWICK_LENGTH.match(text, i + 1)
+            node.length = m.group(1) or None
+            i = m.end() - 1
+        elif c == "'":
+            m = NEWICK_QUOTED.match(text, i)
+            if not m:
+                raise ValueError('Unterminated quoted label in Newick string')
+            node.name = m.group(0)
+            i = m.end() - 1
+        elif not c.isspace():
+            m = NEWICK_TOKEN.match(text, i)
+            node.name = m.group(0)
+            i = m.end() - 1
+        i += 1
+    if node is not root:
+        raise ValueError('Unbalanced parentheses in Newick string')
+    return root
+
+
+def read_tree(path):
+    """
+    Read the first tree from a file in Newick or Nexus format.
+
+    Leaf names in Nexus files are translated using the `TRANSLATE` command of the `TREES` block.
+
+    :return: `newick.Node`
+    """
+    text = pathlib.Path(path).read_text(encoding='utf8')
+    if not text.lstrip().upper().startswith('#NEXUS'):
+        return loads(text)
+
+    block = re.split(r'begin\s+trees\s*;', text, flags=re.IGNORECASE)
+    if len(block) < 2:
+        raise ValueError('No TREES block in {}'.format(path))
+    translate = {}
+    for command in NEXUS_COMMENT.sub('', block[1]).split(';'):
+        keyword, rest = (re.split(r'\s+', command.strip(), maxsplit=1) + [''])[:2]
+        keyword = keyword.lower()
+        if keyword == 'translate':
+            for item in rest.split(','):
+                key, label = (re.split(r'\s+', item.strip(), maxsplit=1) + [''])[:2]
+                translate[key] = label
+        elif keyword in ('tree', 'utree'):
+            tree = loads(rest.partition('=')[2])
+            if translate:
+                for node in preorder(tree):
+                    if node.name in translate:
+                        node.name = translate[node.name]
+            return tree
+        elif keyword == 'end':
+            break
+    raise ValueError('No tree in {}'.format(path))
+
+
+def species_name(label):
+    """
+    Turn a tip label into a species name, following the Newick conventions for underscores and
+    quotes, and stripping trailing uppercase words, like family and order in the labels of the
+    MamPhy trees (e.g. `Homo_sapiens_HOMINIDAE_PRIMATES`).
+    """
+    label = label or ''
+    if len(label) > 1 and label[0] == label[-1] == "'":
+        label = label[1:-1].replace("''", "'")
+    else:
+        label = label.replace('_', ' ')
+    words = label.split()
+    while len(words) > 1 and words[-1].isupper():
+        words.pop()
+    return ' '.join(words)
+
+
+def distances(tree, reference):
+    """
+    Compute the distances of all tips of `tree` from the tip `reference`.
+
+    :param reference: Species name of the reference tip - or a prefix, e.g. `Homo sapiens` for \
+    `Homo sapiens sapiens`.
+    :return: `list` of pairs (species name, distance) in tree order.
+    """
+    ref, prefix = reference.lower(), reference.lower() + ' '
+    ref_node = None
+    for node in preorder(tree):
+        if not node.descendants:
+            name = species_name(node.name).lower()
+            if name == ref:
+                ref_node = node
+                break
+            if ref_node is None and name.startswith(prefix):
+                ref_node = node
+    if ref_node is None:
+        raise ValueError('Reference taxon {} not in tree'.format(reference))
+
+    path, node = set(), ref_node
+    while node is not None:
+        path.add(id(node))
+        node = node.ancestor
+
+    res, ref_depth = [], None
+    # Stack of (node, depth, depth of the nearest ancestor on the path to the reference):
+    stack = [(tree, 0.0, 0.0)]
+    while stack:
+        node, depth, anchor = stack.pop()
+        if id(node) in path:
+            anchor = depth
+        if node is ref_node:
+            ref_depth = depth
+        if node.descendants:
+            for child in reversed(node.descendants):
+                stack.append((child, depth + (child.length or 0.0), anchor))
+        else:
+            res.append((species_name(node.name), depth, anchor))
+    return [(name, depth + ref_depth - 2 * anchor) for name, depth, anchor in res]
+
+
+def ordered_species(path, reference='Homo sapiens'):
+    """
+    :return: `list` of pairs (species name, distance) for the tips of the tree in `path`, sorted \
+    by distance from `reference`.
+    """
+    return sorted(distances(read_tree(path), reference), key=lambda i: i[1])
@@ -0,0 +1,190 @@
+"""
+A columnar, in-memory view of the experiments, supporting simple filter and group-by queries.
+
+Column values are dictionary encoded, i.e. stored as `array` of integer codes into a list of
+distinct values. Filters are resolved on the codes, resulting in byte masks of the matching rows:
+
+- For columns with up to 256 distinct values, the codes are also kept as `bytes`, so a mask is
+  computed with a single `bytes.translate` - i.e. in C, without a Python loop over rows.
+- For columns with more distinct values - e.g. IDs or DOIs - where filters typically match few
+  rows, the matching rows are looked up in a hash index from codes to row numbers.
+
+Masks for multiple conditions are combined with a single bitwise `and` on big integers, and
+grouping and counting boils down to counting tuples of integers.
+
+.. code-block:: python
+
+    >>> table = ExperimentTable(api.experiments)
+    >>> table.group_by('parameter', 'order')  # Experiments per parameter per order.
+    >>> table.distinct('doi', genus='Corvus')  # All DOIs for genus Corvus.
+"""
+import array
+import operator
+import itertools
+import collections
+
+RANKS = ['kingdom', 'phylum', 'class', 'order', 'family', 'genus']
+
+
+def _rank_getter(rank):
+    def get(ex):
+        if ex.gbif and ex.gbif.metadata:
+            return ex.gbif.metadata.get(rank)
+    return get
+
+
+COLUMNS = collections.OrderedDict([
+    ('id', operator.attrgetter('id')),
+    ('doi', operator.attrgetter('doi')),
+    ('species', operator.attrgetter('species')),
+    ('species_latin', operator.attrgetter('species_latin')),
+    ('parameter', operator.attrgetter('parameter')),
+    ('domain', operator.attrgetter('domain')),
+    ('area', operator.attrgetter('area')),
+    ('reviewer', lambda ex: str(ex.reviewer)),
+    ('contributor_id', operator.attrgetter('contributor_id')),
+    ('type', operator.attrgetter('type')),
+    ('year', operator.attrgetter('year')),
+])
+COLUMNS.update([(rank, _rank_getter(rank)) for rank in RANKS])
+
+
+class Column:
+    """
+    A dictionary encoded column.
+    """
+    def __init__(self, values=()):
+        self.values, self.codes, self._codes = [], array.array('l'), {}
+        self._index, self._bytes = None, None
+        for v in values:
+            self.append(v)
+
+    def __getstate__(self):
+        return dict(values=self.values, codes=self.codes)
+
+    def __setstate__(self, state):
+        self.values, self.codes = state['values'], state['codes']
+        self._codes = {v: i for i, v in enumerate(self.values)}
+        self._index, self._bytes = None, None
+
+    def append(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+        self._index, self._bytes = None, None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def code(self, value):
+        return self._codes.get(value)
+
+    @property
+    def index(self):
+        """
+        Hash index mapping codes to arrays of row numbers.
+        """
+        if self._index is None:
+            self._index = [array.array('l') for _ in self.values]
+            for i, code in enumerate(self.codes):
+                self._index[code].append(i)
+        return self._index
+
+    def mask(self, *values):
+        """
+        :return: `bytes` with `1` for the rows with one of `values` in this column, `0` otherwise.
+        """
+        codes = set(c for c in map(self.code, values) if c is not None)
+        if not codes:
+            return bytes(len(self))
+        if len(self.values) <= 256:
+            if self._bytes is None:
+                self._bytes = array.array('B', self.codes).tobytes()
+            table = bytearray(256)
+            for code in codes:
+                table[code] = 1
+            return self._bytes.translate(table)
+        res = bytearray(len(self))
+        for code in codes:
+            for i in self.index[code]:
+                res[i] = 1
+        return bytes(res)
+
+    def rows(self, *values):
+        """
+        :return: Sorted list of row numbers with one of `values` in this column.
+        """
+        return positions(self.mask(*values))
+
+
+def positions(mask):
+    """
+    :return: `list` of the positions of `1` in a byte mask.
+    """
+    n = mask.count(1)
+    if n * 32 > len(mask):
+        return list(itertools.compress(range(len(mask)), mask))
+    # For sparse masks, searching for the next `1` is faster than checking each byte:
+    res, i = [], -1
+    for _ in range(n):
+        i = mask.index(1, i + 1)
+        res.append(i)
+    return res
+
+
+class ExperimentTable:
+    def __init__(self, experiments, columns=None):
+        self.experiments = experiments
+        self.columns = collections.OrderedDict(
+            (name, Column(map(COLUMNS[name], experiments))) for name in (columns or COLUMNS))
+
+    def __len__(self):
+        return len(self.experiments)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def mask(self, **conditions):
+        """
+        :param conditions: Mapping of column names to a value or a `list` of values.
+        :return: `bytes` with `1` for the rows matching all conditions, or `None` if there are \
+        no conditions.
+        """
+        res = None
+        for col, v in conditions.items():
+            m = int.from_bytes(self[col].mask(*(v if isinstance(v, list) else [v])), 'little')
+            res = m if res is None else res & m
+        return None if res is None else res.to_bytes(len(self), 'little')
+
+    def select(self, **conditions):
+        """
+        :param conditions: Mapping of column names to a value or a `list` of values.
+        :return: Sorted list of the numbers of rows matching all conditions.
+        """
+        mask = self.mask(**conditions)
+        return list(range(len(self))) if mask is None else positions(mask)
+
+    def filter(self, **conditions):
+        return [self.experiments[i] for i in self.select(**conditions)]
+
+    def distinct(self, column, **conditions):
+        col, mask = self[column], self.mask(**conditions)
+        if mask is None:
+            return list(col.values)
+        return [col.values[c] for c in sorted(set(itertools.compress(col.codes, mask)))]
+
+    def group_by(self, *columns, **conditions):
+        """
+        Count the (filtered) rows per combination of values in `columns`.
+
+        :return: `collections.Counter` mapping value tuples to row counts.
+        """
+        cols, mask = [self[name] for name in columns], self.mask(**conditions)
+        keys = zip(*[col.codes for col in cols])
+        if mask is not None:
+            keys = itertools.compress(keys, mask)
+        return collections.Counter({
+            tuple(col.values[c] for col, c in zip(cols, key)): n
+            for key, n in collections.Counter(keys).items()})
@@ -0,0 +1,305 @@
+"""
+A JSON API over HTTP - or a Unix socket - answering queries from the dataset held in memory.
+
+The experiments, sources, GBIF data and taxonomy are loaded once into a `Dataset`. A watcher
+thread polls the data files and loads a new `Dataset` when they change, which then replaces the
+current one with a single reference assignment - so requests are never blocked by a reload, and
+each request sees one consistent version of the data.
+
+Endpoints (all `GET`, filters are given as query parameters `COLUMN=VALUE`, see `pyacc.query`):
+
+- `/`: Status of the server and size of the dataset.
+- `/experiments?COLUMN=VALUE&limit=N&offset=N`: Experiments matching the filters.
+- `/count?group_by=COLUMN&COLUMN=VALUE`: Number of experiments per group.
+- `/distinct/COLUMN?COLUMN=VALUE`: Distinct values of a column.
+- `/species/NAME`: GBIF data and experiment count for a latin species name.
+- `/sources/DOI`: BibTeX fields of a source.
+- `/tree?root=TAXON&depth=N&format=json|newick|ascii&collapse=1&counts=1`: The taxonomy - or the
+  fragment below `root`.
+"""
+import io
+import os
+import json
+import time
+import socket
+import logging
+import pathlib
+import threading
+import http.server
+import socketserver
+import urllib.parse
+import collections
+import concurrent.futures
+
+import pyacc
+from pyacc import instrument
+from pyacc.query import COLUMNS
+from pyacc.taxonomy import Taxonomy
+
+WATCHED = [
+    'data.Sheet1.csv', 'gbif.json', 'gbif.sqlite', 'sources.bib', 'species_corrections.json']
+DEFAULT_LIMIT = 100
+
+
+def fingerprint(repos):
+    """
+    :return: `tuple` of (size, mtime) of the data files, `None` for missing ones.
+    """
+    res = []
+    for name in WATCHED:
+        try:
+            st = os.stat(str(pathlib.Path(repos) / name))
+            res.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            res.append(None)
+    return tuple(res)
+
+
+class Dataset:
+    """
+    Everything needed to answer queries, loaded up front.
+    """
+    def __init__(self, api):
+        self.fingerprint = fingerprint(api.repos)
+        self.loaded = time.time()
+        with instrument.stage('serve.load'):
+            self.experiments = api.experiments
+            self.table = api.table
+            self.sources = api.sources
+            self.gbif, self.counts = {}, collections.Counter()
+            for ex in self.experiments:
+                self.counts[ex.species_latin] += 1
+                if ex.gbif:
+                    self.gbif[ex.species_latin] = ex.gbif
+            self.taxonomy = Taxonomy.from_experiments(self.experiments)
+
+
+def experiment_dict(ex):
+    return collections.OrderedDict((name, get(ex)) for name, get in COLUMNS.items())
+
+
+class QueryError(ValueError):
+    pass
+
+
+def conditions(params):
+    """
+    Turn query parameters - other than the reserved ones - into conditions for
+    `pyacc.query.ExperimentTable.select`.
+    """
+    res = collections.OrderedDict()
+    for name, values in params.items():
+        if name in ('limit', 'offset', 'group_by'):
+            continue
+        if name not in COLUMNS:
+            raise QueryError('Unknown column: {}'.format(name))
+        if name == 'year':
+            try:
+                values = [int(v) for v in values]
+            except ValueError:
+                raise QueryError('Invalid year: {}'.format(values))
+        res[name] = values
+    return res
+
+
+def _int(params, name, default):
+    try:
+        return int(params.get(name, [default])[0])
+    except ValueError:
+        raise QueryError('Invalid {}: {}'.format(name, params[name][0]))
+
+
+def query(ds, path, params):
+    """
+    Answer a query.
+
+    :param ds: `Dataset`
+    :param path: Path of the request URL, split into components.
+    :param params: Query parameters, as returned by `urllib.parse.parse_qs`.
+    :return: JSON serializable object - or `str` for non-JSON tree formats.
+    :raises KeyError: If the requested object does not exist.
+    :raises QueryError: If the query is invalid.
+    """
+    if not path:
+        return collections.OrderedDict([
+            ('pyacc', pyacc.__version__),
+            ('loaded', ds.loaded),
+            ('experiments', len(ds.experiments)),
+            ('sources', len(ds.sources)),
+            ('species', len(ds.counts)),
+        ])
+    endpoint, args = path[0], path[1:]
+    if endpoint == 'experiments':
+        limit, offset = _int(params, 'limit', DEFAULT_LIMIT), _int(params, 'offset', 0)
+        rows = ds.table.select(**conditions(params))
+        return collections.OrderedDict([
+            ('total', len(rows)),
+            ('experiments', [
+                experiment_dict(ds.experiments[i]) for i in rows[offset:offset + limit]]),
+        ])
+    if endpoint == 'count':
+        group_by = params.get('group_by', [])
+        for col in group_by:
+            if col not in COLUMNS:
+                raise QueryError('Unknown column: {}'.format(col))
+        cond = conditions(params)
+        if not group_by:
+            return len(ds.table.select(**cond))
+        return [
+            collections.OrderedDict(list(zip(group_by, key)) + [('count', n)])
+            for key, n in ds.table.group_by(*group_by, **cond).most_common()]
+    if endpoint == 'distinct' and len(args) == 1:
+        if args[0] not in COLUMNS:
+            raise QueryError('Unknown column: {}'.format(args[0]))
+        return ds.table.distinct(args[0], **conditions(params))
+    if endpoint == 'species' and len(args) == 1:
+        if args[0] not in ds.counts:
+            raise KeyError(args[0])
+        gbif = ds.gbif.get(args[0])
+        return collections.OrderedDict([
+            ('name', args[0]),
+            ('experiments', ds.counts[args[0]]),
+            ('gbif_key', gbif.key if gbif else None),
+            ('gbif', gbif.metadata if gbif else None),
+        ])
+    if endpoint == 'sources' and args:
+        src = ds.sources['/'.join(args)]
+        return collections.OrderedDict(
+            [('id', src.id), ('genre', src.genre)] + list(src.items()))
+    if endpoint == 'tree' and not args:
+        root = 0
+        if 'root' in params:
+            root = ds.taxonomy.find(params['root'][0])
+            if root is None:
+                raise KeyError(params['root'][0])
+        fmt = params.get('format', ['json'])[0]
+        if fmt not in ('json', 'newick', 'ascii'):
+            raise QueryError('Unknown format: {}'.format(fmt))
+        out = io.StringIO()
+        ds.taxonomy.write(
+            out,
+            format=fmt,
+            max_depth=_int(params, 'depth', None) if 'depth' in params else None,
+            collapse=params.get('collapse', [''])[0] not in ('', '0', 'false'),
+            counts=params.get('counts', [''])[0] not in ('', '0', 'false'),
+            root=root)
+        return json.loads(out.getvalue()) if fmt == 'json' else out.getvalue()
+    raise KeyError('/'.join(path))
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        self.server.log.debug(fmt % args)
+
+    def address_string(self):
+        # Clients of Unix sockets have no address:
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def _send(self, status, body, content_type='application/json'):
+        body = body.encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type + '; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # We grab the current dataset once, so a reload during the request does not affect it:
+        ds = self.server.dataset
+        url = urllib.parse.urlparse(self.path)
+        path = [urllib.parse.unquote(p) for p in url.path.split('/') if p]
+        try:
+            res = query(ds, path, urllib.parse.parse_qs(url.query))
+        except QueryError as e:
+            self._send(400, json.dumps({'error': str(e)}))
+        except KeyError as e:
+            self._send(404, json.dumps({'error': 'not found: {}'.format(e.args[0])}))
+        else:
+            if isinstance(res, str):
+                self._send(200, res, content_type='text/plain')
+            else:
+                self._send(200, json.dumps(res))
+        instrument.count('serve.requests')
+
+
+class PoolMixIn:
+    """
+    Handle requests in a pool of worker threads - rather than one new thread per request, as
+    `socketserver.ThreadingMixIn` does.
+    """
+    workers = 8
+
+    def process_request(self, request, client_address):
+        if getattr(self, '_executor', None) is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pragma: no cover
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        if getattr(self, '_executor', None) is not None:
+            self._executor.shutdown(wait=True)
+
+
+class ServerMixIn(PoolMixIn):
+    """
+    Holds the current `Dataset` and reloads it when the data files change.
+    """
+    def setup_dataset(self, api_factory, interval=2.0, log=None):
+        """
+        :param api_factory: Callable returning a fresh `ACC` instance.
+        :param interval: Seconds between checks of the data files - or `None` to not watch them.
+        """
+        api = api_factory()
+        self.api_factory, self.repos = api_factory, api.repos
+        self.log = log or logging.getLogger(__name__)
+        self.dataset = Dataset(api)
+        self._stop = threading.Event()
+        if interval:
+            threading.Thread(target=self._watch, args=(interval,), daemon=True).start()
+
+    def reload(self):
+        """
+        Load a new `Dataset` if the data files changed since the current one was loaded.
+
+        :return: Flag signaling whether the dataset was replaced.
+        """
+        if fingerprint(self.repos) == self.dataset.fingerprint:
+            return False
+        ds = Dataset(self.api_factory())
+        # Replacing the reference is atomic; requests holding the old dataset complete with it.
+        self.dataset = ds
+        self.log.info('reloaded {} experiments'.format(len(ds.experiments)))
+        return True
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:  # pragma: no cover
+                self.log.error('reload failed: {}'.format(e))
+
+    def server_close(self):
+        self._stop.set()
+        super().server_close()
+
+
+class HTTPServer(ServerMixIn, http.server.HTTPServer):
+    pass
+
+
+if hasattr(socket, 'AF_UNIX'):
+    class UnixHTTPServer(ServerMixIn, socketserver.UnixStreamServer):
+        def server_bind(self):
+            if os.path.exists(self.server_address):
+                os.unlink(self.server_address)
+            socketserver.UnixStreamServer.server_bind(self)
+else:  # pragma: no cover
+    UnixHTTPServer = None
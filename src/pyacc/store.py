@@ -0,0 +1,304 @@
+"""
+Storage of the GBIF data for the latin species names in the dataset.
+
+`gbif.json` maps names to pairs (GBIF taxon key, metadata). Looking up a name means parsing all of
+it, and adding a name means rewriting all of it. Alternatively, the data can be kept in
+`gbif.sqlite`, indexed by name, where lookups and updates only touch the affected rows. `gbif.json`
+can be exported from it, e.g. to track changes in version control.
+
+Both backends implement the same interface:
+
+.. code-block:: python
+
+    >>> store = open_store(repos)
+    >>> store.get_many(['Pan troglodytes', 'Pan paniscus'])
+    OrderedDict([('Pan troglodytes', [5219534, {...}])])
+    >>> store.update([('Pan paniscus', [5219533, {...}])])
+    >>> store.flush()
+"""
+import os
+import abc
+import json
+import uuid
+import sqlite3
+import warnings
+import pathlib
+import threading
+import collections
+
+from clldutils import jsonlib
+from clldutils.path import md5
+
+from pyacc import instrument
+
+
+def open_store(repos):
+    """
+    :return: `SQLiteStore` if there is a `gbif.sqlite` in the `repos` directory, `JSONStore` \
+    for `gbif.json` otherwise.
+    """
+    repos = pathlib.Path(repos)
+    if (repos / SQLiteStore.filename).exists():
+        store = SQLiteStore(repos / SQLiteStore.filename)
+        if store.stale_export():
+            warnings.warn(
+                '{0} has been changed since it was exported from {1} - run `acc gbif --sqlite` '
+                'to copy its data to {1}, which is used instead'.format(
+                    JSONStore.filename, SQLiteStore.filename))
+        return store
+    return JSONStore(repos / JSONStore.filename)
+
+
+class Store(abc.ABC):
+    """
+    Mapping of latin species names to pairs (GBIF taxon key, metadata), ordered by insertion.
+    """
+    filename = None
+    # Number of names to look up before the results are written, see `pyacc.ACC.update_gbif`:
+    batch_size = 100
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __iter__(self):
+        for name, _ in self.items():
+            yield name
+
+    def get_many(self, names):
+        """
+        :return: `OrderedDict` mapping the names in `names` which are in the store to their data.
+        """
+        res = collections.OrderedDict()
+        for name in names:
+            data = self.get(name)
+            if data is not None:
+                res[name] = data
+        return res
+
+    def export(self, path):
+        """
+        Write the data to `path` in the format of `gbif.json`.
+        """
+        path = pathlib.Path(path)
+        tmp = path.parent / (path.name + '.tmp')
+        jsonlib.dump(collections.OrderedDict(self.items()), tmp, indent=4)
+        os.replace(str(tmp), str(path))
+
+    def flush(self):
+        """
+        Write pending updates.
+        """
+
+    @abc.abstractmethod
+    def fingerprint(self):
+        """
+        :return: A value which changes whenever the data changes.
+        """
+
+    @abc.abstractmethod
+    def get(self, name):
+        """
+        :return: The data for `name` or `None`.
+        """
+
+    @abc.abstractmethod
+    def items(self):
+        """
+        :return: Iterable of pairs (name, data), ordered by insertion.
+        """
+
+    @abc.abstractmethod
+    def update(self, items):
+        """
+        Add or replace the data for the names in `items`, an iterable of pairs (name, data).
+        """
+
+
+class JSONStore(Store):
+    """
+    The data in `gbif.json`, which is read completely upon first access. Updates are kept in
+    memory until `flush` rewrites the file.
+    """
+    filename = 'gbif.json'
+
+    def __init__(self, path):
+        Store.__init__(self, path)
+        self._data = None
+        self._dirty = False
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = jsonlib.load(
+                self.path, object_pairs_hook=collections.OrderedDict) \
+                if self.path.exists() else collections.OrderedDict()
+            instrument.count('bytes.read', self.path.stat().st_size if self.path.exists() else 0)
+        return self._data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, name):
+        return name in self.data
+
+    def fingerprint(self):
+        return md5(self.path) if self.path.exists() else None
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def items(self):
+        return self.data.items()
+
+    def update(self, items):
+        self.data.update(items)
+        self._dirty = True
+
+    def flush(self):
+        if self._dirty:
+            # `export` writes to a temporary file first, so a failed write does not truncate the
+            # file:
+            self.export(self.path)
+            self._dirty = False
+
+
+def _stat(path):
+    st = pathlib.Path(path).stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+class SQLiteStore(Store):
+    """
+    The data in a SQLite database, with names as primary key.
+    """
+    filename = 'gbif.sqlite'
+    # Maximal number of host parameters in a query:
+    chunk_size = 500
+
+    def __init__(self, path):
+        Store.__init__(self, path)
+        self._lock = threading.Lock()
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                str(self.path), isolation_level=None, check_same_thread=False)
+            self._db.execute("""\
+CREATE TABLE IF NOT EXISTS species (
+    name TEXT PRIMARY KEY,
+    key INTEGER,
+    metadata TEXT
+)""")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        return self._db
+
+    def __len__(self):
+        with self._lock:
+            return self.db.execute("SELECT count(*) FROM species").fetchone()[0]
+
+    def _meta(self, name):
+        with self._lock:
+            row = self.db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def fingerprint(self):
+        return self._meta('version')
+
+    def export(self, path):
+        """
+        Write the data to `path` - and record size and modification time of the file, to detect
+        changes of it by other means.
+        """
+        Store.export(self, path)
+        self._synced(path)
+
+    def load(self, path):
+        """
+        Add or replace the data with the data from the `gbif.json` at `path`.
+        """
+        self.update(JSONStore(path).items())
+        self._synced(path)
+
+    def _synced(self, path):
+        if not pathlib.Path(path).exists():
+            return
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('export', ?)",
+                (json.dumps(_stat(path)),))
+
+    def stale_export(self):
+        """
+        :return: Flag signaling whether `gbif.json` next to the database has been changed since \
+        it was last exported - or copied into the database.
+        """
+        path = self.path.parent / JSONStore.filename
+        return path.exists() and json.loads(self._meta('export') or 'null') != _stat(path)
+
+    def get(self, name):
+        with self._lock:
+            row = self.db.execute(
+                "SELECT key, metadata FROM species WHERE name = ?", (name,)).fetchone()
+        instrument.count('store.reads')
+        return [row[0], json.loads(row[1])] if row else None
+
+    def get_many(self, names):
+        names = list(collections.OrderedDict((name, None) for name in names))
+        found = {}
+        with self._lock:
+            for i in range(0, len(names), self.chunk_size):
+                chunk = names[i:i + self.chunk_size]
+                for name, key, md in self.db.execute(
+                        "SELECT name, key, metadata FROM species WHERE name IN ({})".format(
+                            ','.join('?' * len(chunk))),
+                        chunk):
+                    found[name] = [key, json.loads(md)]
+        instrument.count('store.reads', len(names))
+        return collections.OrderedDict((name, found[name]) for name in names if name in found)
+
+    def items(self):
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT name, key, metadata FROM species ORDER BY rowid").fetchall()
+        for name, key, md in rows:
+            yield name, [key, json.loads(md)]
+
+    def update(self, items):
+        """
+        Upsert the data in one transaction - so either all or none of `items` are stored.
+        """
+        with self._lock:
+            db = self.db
+            db.execute('BEGIN')
+            try:
+                n = 0
+                for n, (name, (key, md)) in enumerate(items, start=1):
+                    md = json.dumps(md)
+                    # Updating in place - rather than INSERT OR REPLACE - keeps the rowid, and
+                    # thus the position of the name in the export.
+                    if not db.execute(
+                            "UPDATE species SET key = ?, metadata = ? WHERE name = ?",
+                            (key, md, name)).rowcount:
+                        db.execute(
+                            "INSERT INTO species (name, key, metadata) VALUES (?, ?, ?)",
+                            (name, key, md))
+                db.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)",
+                    (uuid.uuid4().hex,))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        instrument.count('store.writes', n)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
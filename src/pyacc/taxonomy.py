@@ -0,0 +1,213 @@
+"""
+The taxonomy of the species in the dataset, as tree with experiment counts per taxon.
+
+Nodes are integer IDs into parallel lists of names, ranks, parents, children and counts, so a tree
+is cheap to build and to traverse without recursion. The renderers write to a file handle as they
+traverse the tree, rather than assembling the output in memory.
+
+.. code-block:: python
+
+    >>> tax = Taxonomy.from_experiments(api.experiments)
+    >>> tax.write_ascii(sys.stdout, max_depth=3, counts=True)
+"""
+import re
+import sys
+import json
+import array
+
+RANKS = ['kingdom', 'phylum', 'class', 'order', 'family', 'genus', 'species']
+NEWICK_PLAIN = re.compile(r"^[^\s()\[\]':;,]+$")
+
+
+def newick_name(s):
+    """
+    Format `s` as Newick node name: Spaces are replaced with underscores - unless the name
+    contains other reserved characters, in which case it is quoted.
+    """
+    s = s.replace(' ', '_')
+    return s if NEWICK_PLAIN.match(s) else "'{}'".format(s.replace("'", "''"))
+
+
+class Taxonomy:
+    """
+    A tree of taxa. Node `i` has name `names[i]`, rank `ranks[i]`, parent `parents[i]`, children
+    `children[i]` and an experiment count `counts[i]`, which includes the experiments for all
+    descendants.
+    """
+    def __init__(self):
+        # The root node, with ID 0, has no name:
+        self.names, self.ranks, self.labels = [None], [None], {}
+        self.parents, self.counts = array.array('l', [-1]), array.array('l', [0])
+        self.children = [[]]
+        self._ids = {}  # Maps pairs (parent ID, name) to node IDs.
+        self._first = {}  # Maps names to the ID of the first node with the name.
+
+    def __len__(self):
+        return len(self.names) - 1
+
+    def add(self, path, count=1):
+        """
+        Add a lineage to the tree, creating nodes as needed.
+
+        :param path: Iterable of pairs (rank, name), from the top down.
+        :param count: Number to add to the counts of all nodes on `path`.
+        :return: ID of the last node on `path`.
+        """
+        node = 0
+        self.counts[0] += count
+        for rank, name in path:
+            child = self._ids.get((node, name))
+            if child is None:
+                child = self._ids[(node, name)] = len(self.names)
+                self.names.append(sys.intern(name))
+                self._first.setdefault(name, child)
+                self.ranks.append(rank)
+                self.parents.append(node)
+                self.counts.append(0)
+                self.children.append([])
+                self.children[node].append(child)
+            self.counts[child] += count
+            node = child
+        return node
+
+    @classmethod
+    def from_experiments(cls, experiments):
+        """
+        Build the tree from the GBIF classification of the species of experiments, with leaves for
+        the latin names used in the data, labeled with the common names.
+        """
+        res, leaves = cls(), {}
+        for ex in experiments:
+            if ex.gbif and ex.gbif.metadata:
+                key = (ex.gbif.key, ex.species_latin, ex.species)
+                if key in leaves:
+                    res.increment(leaves[key])
+                    continue
+                path = []
+                for rank in RANKS:
+                    name = ex.gbif.metadata.get(rank)
+                    if name is None:
+                        break
+                    path.append((rank, name))
+                path.append(('taxon', ex.species_latin))
+                leaves[key] = node = res.add(path)
+                res.labels[node] = ex.species
+        return res
+
+    def find(self, name):
+        """
+        :return: ID of the first node with name `name` or `None`.
+        """
+        return self._first.get(name)
+
+    def increment(self, node, count=1):
+        """
+        Add `count` to the counts of `node` and its ancestors.
+        """
+        while node >= 0:
+            self.counts[node] += count
+            node = self.parents[node]
+
+    def traverse(self, max_depth=None, collapse=False, root=0):
+        """
+        Iterative depth-first traversal of the nodes below `root`.
+
+        :param max_depth: Maximal depth of nodes to visit, relative to `root`.
+        :param collapse: Flag signaling whether to merge chains of nodes with just one child into \
+        the last node of the chain.
+        :return: Generator of tuples (entering, node, names, depth, last), where `entering` is \
+        `False` when all descendants of `node` have been visited, `names` is the list of names \
+        of the (collapsed) nodes and `last` signals whether `node` is the last of its siblings.
+        """
+        stack = []
+
+        def push(node, depth):
+            children = self.children[node]
+            for i in range(len(children) - 1, -1, -1):
+                stack.append((True, children[i], depth + 1, i == len(children) - 1))
+
+        push(root, 0)
+        while stack:
+            entering, node, depth, last = stack.pop()
+            if not entering:
+                yield False, node, None, depth, last
+                continue
+            names = [self.names[node]]
+            if collapse:
+                while len(self.children[node]) == 1:
+                    node = self.children[node][0]
+                    names.append(self.names[node])
+            yield True, node, names, depth, last
+            stack.append((False, node, depth, last))
+            if max_depth is None or depth < max_depth:
+                push(node, depth)
+
+    def _label(self, node, names, counts):
+        res = '/'.join(names)
+        if node in self.labels:
+            res = '{} - {}'.format(res, self.labels[node])
+        if counts:
+            res = '{} [{}]'.format(res, self.counts[node])
+        return res
+
+    def write_ascii(self, fp, max_depth=None, collapse=False, counts=False, root=0):
+        """
+        Write the tree as ASCII art, one node per line, starting with the top-level taxa.
+        """
+        prefix = []
+        for entering, node, names, depth, last in self.traverse(max_depth, collapse, root):
+            if not entering:
+                continue
+            del prefix[max(depth - 2, 0):]
+            if depth == 1:
+                fp.write(self._label(node, names, counts) + '\n')
+                continue
+            fp.write('{}{}{}\n'.format(
+                ''.join(prefix), '└── ' if last else '├── ', self._label(node, names, counts)))
+            prefix.append('    ' if last else '│   ')
+
+    def write_newick(self, fp, max_depth=None, collapse=False, counts=False, root=0):
+        """
+        Write the tree in Newick format, with counts as node comments `[&count=N]`.
+        """
+        pending = {}  # Maps IDs of nodes being visited to pairs (names, has visited children).
+        fp.write('(')
+        for entering, node, names, depth, last in self.traverse(max_depth, collapse, root):
+            if entering:
+                inner = bool(self.children[node]) and (max_depth is None or depth < max_depth)
+                pending[node] = (names, inner)
+                if inner:
+                    fp.write('(')
+                continue
+            names, inner = pending.pop(node)
+            if inner:
+                fp.write(')')
+            fp.write(newick_name('/'.join(names)))
+            if counts:
+                fp.write('[&count={}]'.format(self.counts[node]))
+            if not last:
+                fp.write(',')
+        fp.write(');\n')
+
+    def write_json(self, fp, max_depth=None, collapse=False, counts=False, root=0):
+        """
+        Write the tree as JSON array of objects for the top-level taxa, with nested `children`.
+        """
+        fp.write('[')
+        for entering, node, names, depth, last in self.traverse(max_depth, collapse, root):
+            if entering:
+                obj = dict(name='/'.join(names), rank=self.ranks[node])
+                if node in self.labels:
+                    obj['label'] = self.labels[node]
+                if counts:
+                    obj['count'] = self.counts[node]
+                fp.write(json.dumps(obj)[:-1] + ', "children": [')
+                continue
+            fp.write(']}' if last else ']}, ')
+        fp.write(']\n')
+
+    def write(self, fp, format='ascii', **kw):
+        """
+        :param format: One of `ascii`, `newick` or `json`.
+        """
+        return getattr(self, 'write_' + format)(fp, **kw)
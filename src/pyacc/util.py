@@ -4,12 +4,28 @@ import urllib.request
 from clldutils.misc import slug
 from clldutils.source import Source
 
+from pyacc import instrument
 
-def doi2bibtex(doi):
-    url = 'https://scipython.com/apps/doi2bib/?doi={}'.format(urllib.parse.quote_plus(doi))
-    req = urllib.request.urlopen(url)
+DOI2BIB_URL = 'https://scipython.com/apps/doi2bib/?doi={}'
+
+
+def doi2bibtex(doi, cache=None):
+    """
+    :param cache: `pyacc.cache.Cache` instance to lookup/store the BibTeX for `doi`.
+    :return: BibTeX record for `doi` or `None`.
+    """
+    if cache is None:
+        return _doi2bibtex(doi)
+    return cache.lookup('doi2bibtex:' + doi, _doi2bibtex, doi)
+
+
+def _doi2bibtex(doi):
+    url = DOI2BIB_URL.format(urllib.parse.quote_plus(doi))
+    instrument.count('http.requests')
+    content = urllib.request.urlopen(url).read()
+    instrument.count('http.bytes', len(content))
     bibtex, in_bibtex = [], False
-    for line in req.read().decode('utf8').split('\n'):
+    for line in content.decode('utf8').split('\n'):
         if line.strip().startswith('</textarea>'):
             break
         if in_bibtex:
@@ -0,0 +1,242 @@
+"""
+Validation of the experiments in `data.Sheet1.csv` in a single streaming pass.
+
+Rows are read one by one and checked in chunks - optionally in parallel worker processes - for
+values which are invalid by themselves (row rules). Checks across rows and files run in the main
+process, as the chunk results come in:
+
+- Experiment IDs must be unique. Only an 8-byte digest is kept per ID, so memory use is bounded
+  by the number of experiments, not by the size of the data.
+- DOIs should have a record in `sources.bib`, and a DOI must not have more than one record.
+- Latin species names should have GBIF data in `gbif.json`.
+
+Problems are collected - with the row number in the sheet (the header being row 1) - rather than
+raised, so one run reports all of them.
+"""
+import os
+import hashlib
+import itertools
+import collections
+import concurrent.futures
+
+import attr
+
+from pyacc import instrument
+
+ERROR = 'error'
+WARNING = 'warning'
+RESEARCH_KINDS = ['experimental', 'observational', 'other']
+COLUMNS = [
+    'Working Title',
+    'Reviewer',
+    'Paper #',
+    'Experiment #',
+    'Species   (common name)',
+    'Species         (latin name)',
+    'DOI',
+    'Domain',
+    'Area',
+    'Cognitive ability',
+    'Sample size',
+    'Research Kind',
+    'Publication Year',
+    'Abstract',
+]
+
+
+@attr.s(slots=True)
+class Issue:
+    row = attr.ib()
+    rule = attr.ib()
+    message = attr.ib()
+    severity = attr.ib(default=ERROR)
+    column = attr.ib(default=None)
+    # Path of the file the row is in - if not data.Sheet1.csv:
+    path = attr.ib(default=None)
+
+    def __str__(self):
+        res = 'row {0}: {1}'.format(self.row, self.message)
+        return '{0}: {1}'.format(self.path, res) if self.path else res
+
+
+class Report:
+    """
+    The result of a validation run: A list of `Issue`s, ordered by row.
+    """
+    def __init__(self):
+        self.issues = []
+        self.rows = 0
+
+    def add(self, issue):
+        self.issues.append(issue)
+
+    @property
+    def errors(self):
+        return [i for i in self.issues if i.severity == ERROR]
+
+    @property
+    def warnings(self):
+        return [i for i in self.issues if i.severity == WARNING]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def counts(self):
+        """
+        :return: `Counter` of issues per pair (severity, rule).
+        """
+        return collections.Counter((i.severity, i.rule) for i in self.issues)
+
+    def as_dict(self):
+        return collections.OrderedDict([
+            ('rows', self.rows),
+            ('errors', len(self.errors)),
+            ('warnings', len(self.warnings)),
+            ('issues', [attr.asdict(i, dict_factory=collections.OrderedDict)
+                        for i in self.issues]),
+        ])
+
+
+def digest(s):
+    return hashlib.blake2b(s.encode('utf8'), digest_size=8).digest()
+
+
+def check_row(d):
+    """
+    Check the values of a row by themselves.
+
+    :return: Generator of `Issue`s, with `row` set to `None`.
+    """
+    from pyacc.api import clean_doi, valid_doi
+
+    try:
+        valid_doi(None, None, clean_doi(d['DOI']))
+    except ValueError as e:
+        yield Issue(None, 'doi', str(e), column='DOI')
+    if d['Research Kind'] not in RESEARCH_KINDS:
+        yield Issue(
+            None,
+            'research-kind',
+            'Invalid research kind: {}'.format(d['Research Kind']),
+            column='Research Kind')
+    if d['Publication Year'] and not d['Publication Year'].strip().isdigit():
+        yield Issue(
+            None,
+            'year',
+            'Invalid publication year: {}'.format(d['Publication Year']),
+            column='Publication Year')
+
+
+def check_experiment(d, corrections=None):
+    """
+    Run the row rules on a row and - if they pass - create an `Experiment` from it.
+
+    :return: Pair (`list` of `Issue`s, with `row` set to `None`, `Experiment` or `None`).
+    """
+    from pyacc.api import Experiment
+
+    problems = list(check_row(d))
+    if problems:
+        return problems, None
+    try:
+        return [], Experiment.from_dict(d, {}, corrections=corrections)
+    except (TypeError, ValueError) as e:
+        return [Issue(None, 'experiment', str(e))], None
+
+
+def check_chunk(chunk, corrections=None):
+    """
+    Run the row rules on a chunk of rows. This is a module-level function, so that it can be run
+    in worker processes.
+
+    :param chunk: `list` of pairs (row number, `dict`).
+    :return: `list` of `Issue`s and `list` of tuples (row number, ID digest, ID, DOI, latin \
+    species name) for the valid rows.
+    """
+    issues, keys = [], []
+    for row, d in chunk:
+        problems, ex = check_experiment(d, corrections)
+        if ex:
+            keys.append((row, digest(ex.id), ex.id, ex.doi, ex.species_latin))
+        for issue in problems:
+            issue.row = row
+            issues.append(issue)
+    return issues, keys
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _results(chunks, corrections, workers):
+    if workers == 1:
+        for chunk in chunks:
+            yield check_chunk(chunk, corrections)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep at most two chunks per worker in flight, to bound memory use:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(check_chunk, chunk, corrections))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def validate(rows, sources=None, species=None, corrections=None, workers=1, chunksize=10000):
+    """
+    :param rows: Iterable of pairs (row number, `dict`).
+    :param sources: `dict` mapping DOIs to the number of records in `sources.bib` or `None`, to \
+    skip the checks of sources.
+    :param species: Container of the latin species names in `gbif.json` or `None`, to skip the \
+    check of species.
+    :param corrections: Mapping of misspelled to correct latin species names.
+    :param workers: Number of worker processes for the row rules; `None` means number of CPUs.
+    :return: `Report`
+    """
+    report, ids, seen = Report(), {}, set()
+    workers = workers or os.cpu_count() or 1
+
+    def counted(rows):
+        for row in rows:
+            report.rows += 1
+            yield row
+
+    for issues, keys in _results(chunked(counted(rows), chunksize), corrections, workers):
+        for issue in issues:
+            report.add(issue)
+        for row, key, id_, doi, species_latin in keys:
+            if key in ids:
+                report.add(Issue(
+                    row,
+                    'unique-id',
+                    'duplicate experiment ID: {0} (see row {1})'.format(id_, ids[key])))
+            else:
+                ids[key] = row
+            # Referential checks are done once per DOI and species:
+            if sources is not None and ('doi', doi) not in seen:
+                seen.add(('doi', doi))
+                if doi not in sources:
+                    report.add(Issue(
+                        row, 'source', 'no record in sources.bib for DOI {}'.format(doi),
+                        severity=WARNING, column='DOI'))
+                elif sources[doi] > 1:
+                    report.add(Issue(
+                        row, 'unique-doi', '{0} records in sources.bib for DOI {1}'.format(
+                            sources[doi], doi), column='DOI'))
+            if species is not None and ('species', species_latin) not in seen:
+                seen.add(('species', species_latin))
+                if species_latin not in species:
+                    report.add(Issue(
+                        row, 'gbif', 'no GBIF data for species {}'.format(species_latin),
+                        severity=WARNING, column='Species         (latin name)'))
+    instrument.count('rows.validated', report.rows)
+    report.issues.sort(key=lambda i: i.row)
+    return report
@@ -0,0 +1,52 @@
+import json
+import shutil
+import pathlib
+
+import pytest
+
+from pyacc.validate import COLUMNS
+
+
+@pytest.fixture
+def make_repos(tmp_path):
+    """
+    Write a minimal data repository, with one experiment on Corvus corax per area in `areas` - \
+    citing the DOIs in `dois` (default: 10.1000/a).
+    """
+    def make(areas, d=tmp_path / 'repos', dois=None):
+        d.mkdir(exist_ok=True)
+        with (d / 'data.Sheet1.csv').open('w', encoding='utf8') as f:
+            f.write(','.join(COLUMNS) + '\n')
+            f.write(','.join(COLUMNS) + '\n')
+            dois = dois or ['10.1000/a'] * len(areas)
+            for i, (area, doi) in enumerate(zip(areas, dois), start=1):
+                row = dict((c, '') for c in COLUMNS)
+                row.update({
+                    'Reviewer': 'Jane Doe',
+                    'Working Title': 'Review',
+                    'Experiment #': str(i),
+                    'Species         (latin name)': 'Corvus corax',
+                    'DOI': doi,
+                    'Area': area,
+                    'Cognitive ability': 'tool use',
+                    'Research Kind': 'experimental',
+                    'Publication Year': '2000',
+                })
+                f.write(','.join(row[c] for c in COLUMNS) + '\n')
+        (d / 'gbif.json').write_text(json.dumps({'Corvus corax': [1, {
+            'kingdom': 'Animalia', 'phylum': 'Chordata', 'class': 'Aves',
+            'order': 'Passeriformes', 'family': 'Corvidae', 'genus': 'Corvus'}]}),
+            encoding='utf8')
+        (d / 'sources.bib').write_text(
+            '@article{a,\n  key = {10.1000/a},\n  title = {Ravens}\n}\n', encoding='utf8')
+        return d
+    return make
+
+
+@pytest.fixture
+def taxa(tmp_path):
+    """
+    Path of a copy of a small excerpt of the GBIF backbone's Taxon.tsv.
+    """
+    return pathlib.Path(shutil.copy(
+        str(pathlib.Path(__file__).parent / 'fixtures' / 'Taxon.tsv'), str(tmp_path)))
@@ -0,0 +1,227 @@
+import sys
+import pickle
+
+import attr
+import openpyxl
+import pytest
+from csvw import dsv
+
+from pyacc import ACC, instrument
+from pyacc.api import Experiment, _excel_value, _dump_sheet
+from pyacc.validate import COLUMNS
+
+
+def _workbook(path, sheets):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets:
+        ws = wb.create_sheet(name)
+        for row in rows:
+            ws.append(row)
+    wb.save(str(path))
+    return path
+
+
+def _baseline(xlsx, sname):
+    # The export as done before sheets were streamed from a read-only workbook:
+    wb = openpyxl.load_workbook(str(xlsx), data_only=True)
+    return [[_excel_value(c.value) for c in row] for row in wb[sname].rows]
+
+
+@pytest.fixture
+def xlsx(tmp_path):
+    return _workbook(tmp_path / 'COMBINED.xlsx', [
+        ('Sheet1', [['a', 'b', 'c'], [' x ', 1.0, None], [None, 'y', 2]]),
+        ('Other sheet', [['n'], [3.0]]),
+        ('Sheet3', [['only header']]),
+    ])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_dump(xlsx, workers):
+    api = ACC(xlsx.parent)
+    res = api.dump(workers=workers)
+    assert [p.name for p in res.values()] == [
+        'data.Sheet1.csv', 'data.Othersheet.csv', 'data.Sheet3.csv']
+    for sname, path in res.items():
+        assert list(dsv.reader(path)) == _baseline(xlsx, sname)
+
+
+def test_dump_incremental(xlsx, mocker):
+    api = ACC(xlsx.parent)
+    api.dump(workers=1)
+
+    def mtimes():
+        return {p.name: p.stat().st_mtime_ns for p in xlsx.parent.glob('data.*.csv')}
+
+    before = mtimes()
+    # Change one sheet - re-saving the workbook:
+    wb = openpyxl.load_workbook(str(xlsx))
+    wb['Other sheet'].append([4.0])
+    wb.save(str(xlsx))
+
+    spy = mocker.patch('pyacc.api._dump_sheet', side_effect=_dump_sheet)
+    assert list(api.dump(workers=1)) == ['Other sheet']
+    # Unchanged sheets are not even parsed:
+    assert [c[0][1] for c in spy.call_args_list] == ['Other sheet']
+    after = mtimes()
+    assert [n for n in before if before[n] != after[n]] == ['data.Othersheet.csv']
+    assert not api.dump(workers=1)
+
+    assert list(api.dump(workers=1, force=True)) == ['Sheet1', 'Other sheet', 'Sheet3']
+    assert all(mtimes()[n] > after[n] for n in after)
+
+
+def _bibtex(doi):
+    return '@article{{{0},\n  key = {{{1}}}\n}}'.format(doi.replace('/', '').replace('.', ''), doi)
+
+
+def test_write_bib(make_repos, mocker):
+    repos = make_repos(['a', 'b', 'c'], dois=['10.1000/a', '10.1000/b', '10.1000/c'])
+    bib = repos / 'sources.bib'
+    bib.write_text(bib.read_text(encoding='utf8') + '\n% FIXME: 10.1000/b\n', encoding='utf8')
+    fetch = mocker.patch(
+        'pyacc.util.doi2bibtex',
+        side_effect=lambda doi, cache=None: _bibtex(doi) if doi == '10.1000/b' else None)
+
+    api = ACC(repos, use_cache=False)
+    assert api.write_bib(workers=2) == {'10.1000/b': _bibtex('10.1000/b'), '10.1000/c': None}
+    # Existing records are kept, only missing DOIs and failed lookups are fetched:
+    assert sorted(c[0][0] for c in fetch.call_args_list) == ['10.1000/b', '10.1000/c']
+    text = bib.read_text(encoding='utf8')
+    assert 'title = {Ravens}' in text and '% FIXME: 10.1000/c' in text
+    assert list(api.sources) == ['10.1000/a', '10.1000/b']
+
+    fetch.reset_mock()
+    api.write_bib()
+    assert [c[0][0] for c in fetch.call_args_list] == ['10.1000/c']
+    api.write_bib(incremental=False)
+    assert fetch.call_count == 4
+
+
+def test_write_bib_interrupted(make_repos, mocker):
+    class Unwritable(str):
+        def __format__(self, spec):
+            raise OSError('disk full')
+
+    repos = make_repos(['a', 'b'], dois=['10.1000/a', '10.1000/b'])
+    before = (repos / 'sources.bib').read_text(encoding='utf8')
+    mocker.patch('pyacc.util.doi2bibtex', return_value=Unwritable(_bibtex('10.1000/b')))
+    with pytest.raises(OSError):
+        ACC(repos, use_cache=False).write_bib()
+    assert (repos / 'sources.bib').read_text(encoding='utf8') == before
+
+
+def test_update_gbif(make_repos, mocker):
+    class GBIF:
+        def species_data_many(self, names):
+            for i, name in enumerate(names):
+                yield (name, None, ValueError()) if name == 'x' else (name, [i, {}], None)
+
+    api = ACC(make_repos(['a']), use_cache=False)
+    mocker.patch.object(api.gbif_store, 'batch_size', 2)
+    export = mocker.spy(api.gbif_store, 'export')
+    mocker.patch.object(ACC, 'unmatched_species', return_value=['a', 'b', 'x', 'c', 'd', 'e'])
+    assert api.update_gbif(api=GBIF()) == ['x']
+    # gbif.json is written once, not per batch:
+    assert export.call_count == 1
+    assert list(ACC(api.repos).gbif_store) == ['Corvus corax', 'a', 'b', 'c', 'd', 'e']
+
+
+def test_experiments_snapshot(make_repos, mocker):
+    repos = make_repos(['memory', 'planning'])
+
+    def load():
+        with instrument.Recorder() as rec:
+            api = ACC(repos)
+            experiments = api.experiments
+        return api, experiments, rec.counters
+
+    _, experiments, counters = load()
+    assert counters['snapshot.misses'] == 1 and counters['rows.parsed'] == 2
+    api, copy, counters = load()
+    assert counters['snapshot.hits'] == 1 and not counters['rows.parsed']
+    assert [ex.id for ex in copy] == [ex.id for ex in experiments]
+    assert copy[0].source is api.sources['10.1000/a'] and copy[0].source['year'] == '2000'
+    assert copy[0].gbif == experiments[0].gbif
+
+    # A snapshot of another layout is not loaded:
+    mocker.patch('pyacc.api.SNAPSHOT_FORMAT', 0)
+    assert load()[2]['snapshot.misses'] == 1
+    # Neither is a truncated one:
+    snapshot = repos / '.cache' / 'experiments.pickle'
+    snapshot.write_bytes(snapshot.read_bytes()[:100])
+    assert load()[2]['snapshot.misses'] == 1
+
+    # A failed write leaves neither a temporary file, nor a broken snapshot:
+    mocker.patch('pyacc.api.pickle.dump', side_effect=OSError('disk full'))
+    (repos / 'data.Sheet1.csv').write_text(
+        (repos / 'data.Sheet1.csv').read_text(encoding='utf8') + '\n', encoding='utf8')
+    with pytest.raises(OSError):
+        ACC(repos).experiments
+    assert not list(snapshot.parent.glob('*.tmp')) and snapshot.exists()
+
+
+@pytest.mark.parametrize('row,ids', [
+    (
+        {},
+        ('doejane', 'doejane-review', 'corvuscorax', 'tooluse', 'doejane-101000a-1-corvuscorax')),
+    (
+        {
+            'Reviewer': 'Dr. Jane van der Doe',
+            'Working Title': 'Tool Use: A Review',
+            'Experiment #': '3',
+            'Species         (latin name)': 'pan troglydytes',
+            'DOI': ' https://doi.org/10.1000/A.b ,',
+            'Cognitive ability': 'Causal Reasoning',
+        },
+        (
+            'vanderdoejane',
+            'vanderdoejane-tooluseareview',
+            'pantroglodytes',
+            'causalreasoning',
+            'vanderdoejane-101000ab-3-pantroglodytes')),
+])
+def test_Experiment(row, ids):
+    d = dict((c, '') for c in COLUMNS)
+    d.update({
+        'Reviewer': 'Jane Doe',
+        'Working Title': 'Review',
+        'Experiment #': '1',
+        'Species         (latin name)': 'Corvus corax',
+        'DOI': '10.1000/a',
+        'Area': 'memory',
+        'Cognitive ability': 'tool use',
+        'Research Kind': 'experimental',
+        'Publication Year': '2000',
+    })
+    d.update(row)
+    ex = Experiment.from_dict(d, {})
+    # The IDs are the ones computed by the properties of the former, unslotted class:
+    assert (
+        ex.contributor_id, ex.contribution_id, ex.species_id, ex.parameter_id, ex.id) == ids
+    assert not hasattr(ex, '__dict__')
+    assert ex.area is sys.intern('memory') and ex.type is sys.intern('experimental')
+
+    copy = pickle.loads(pickle.dumps(ex, protocol=pickle.HIGHEST_PROTOCOL))
+    # `HumanName` objects are compared by identity, so we compare their string representations:
+    assert str(copy.reviewer) == str(ex.reviewer)
+    assert all(
+        getattr(copy, a.name) == getattr(ex, a.name)
+        for a in attr.fields(Experiment) if a.name != 'reviewer')
+
+
+def test_Experiment_corrections():
+    d = dict((c, '') for c in COLUMNS)
+    d.update({
+        'Reviewer': 'Jane Doe',
+        'DOI': '10.1000/a',
+        'Research Kind': 'other',
+        'Species         (latin name)': 'pan troglydytes',
+    })
+    assert Experiment.from_dict(d, {}).species_latin == 'pan troglodytes'
+    # A custom mapping replaces the default corrections:
+    assert Experiment.from_dict(d, {}, corrections={}).species_latin == 'pan troglydytes'
+    assert Experiment.from_dict(
+        d, {}, corrections={'pan troglydytes': 'Pan troglodytes'}).species_latin == \
+        'Pan troglodytes'
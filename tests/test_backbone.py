@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from pyacc.backbone import Index, SpeciesIndex, NameIndex, Resolver, iter_rows, iter_species
+
+CORVIDAE = ('Chordata', 'Aves', 'Passeriformes', 'Corvidae')
+
+
+def test_Index():
+    with pytest.raises(TypeError):
+        Index()
+
+
+def test_iter_rows(taxa):
+    assert len(list(iter_rows(taxa, ['taxonID']))) == 9
+    assert list(iter_rows(taxa, ['genus', 'canonicalName'], prefilter=['\tPlantae\t'])) == [
+        ['Quercus', 'Quercus robur']]
+
+
+def test_iter_species(taxa):
+    # Only accepted species - even if other lines pass the prefilter:
+    assert [sp['genus'] for sp in iter_species(taxa)] == ['Corvus', 'Corvus', 'Pan', 'Pan']
+    assert [sp['family'] for sp in iter_species(taxa, kingdom='Plantae')] == ['Fagaceae']
+
+
+def test_SpeciesIndex(taxa):
+    index = SpeciesIndex.from_taxa(taxa)
+    assert len(index) == 4
+    assert list(index)[0] == dict(zip(
+        ['phylum', 'class', 'order', 'family', 'genus'], CORVIDAE + ('Corvus',)))
+    phyla, classes, orders, families, genera = index.counts
+    assert phyla == {('Chordata',): 2}
+    assert classes[('Chordata', 'Aves')] == 1
+    assert families[CORVIDAE] == 1
+    assert genera[CORVIDAE + ('Corvus',)] == 2
+
+
+def test_SpeciesIndex_cached(taxa, tmp_path, mocker):
+    path = tmp_path / 'backbone.pickle'
+    assert len(SpeciesIndex.cached(taxa, path)) == 4
+    spy = mocker.spy(SpeciesIndex, 'from_taxa')
+    assert len(SpeciesIndex.cached(taxa, path)) == 4
+    assert not spy.called
+
+    # Another kingdom or a changed backbone invalidate the index:
+    assert len(SpeciesIndex.cached(taxa, path, kingdom='Plantae')) == 1
+    assert spy.call_count == 1
+    with taxa.open('a', encoding='utf8') as f:
+        f.write('\t'.join(
+            ['1', 'd', '', '', '', 'Corvus x', '', 'Corvus x', '', '', '', 'species', '', '',
+             'accepted', '', '', 'Animalia', 'Chordata', 'Aves', 'Passeriformes', 'Corvidae',
+             'Corvus']) + '\n')
+    st = taxa.stat()
+    os.utime(str(taxa), ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert len(SpeciesIndex.cached(taxa, path)) == 5
+    assert spy.call_count == 2
+
+    # An index of another type cannot be loaded - and is rebuilt, as is an unreadable one:
+    with pytest.raises(ValueError):
+        NameIndex.load(path)
+    assert len(NameIndex.cached(taxa, path)) == 5
+    path.write_bytes(b'not a pickle')
+    assert len(SpeciesIndex.cached(taxa, path)) == 5
+
+
+def test_NameIndex(taxa):
+    index = NameIndex.from_taxa(taxa)
+    key, md = index.resolve('Corvus corax')
+    assert key == 2482468 and md['family'] == 'Corvidae' and md['species'] == 'Corvus corax'
+    # Synonyms resolve to the accepted taxon:
+    assert index.resolve('Corvus maximus')[0] == 2482468
+    # An accepted taxon wins over a synonym with the same name:
+    assert index.resolve('Pan paniscus')[0] == 5219533
+    # Scientific names and normalized names are looked up, too:
+    assert index.resolve('Pan troglodytes (Blumenbach, 1775)')[0] == 2436436
+    assert index.resolve(' corvus  CORONE')[0] == 2482473
+    assert index.resolve('Corvus dubius') is None
+    assert index.resolve('Quercus robur') is None
+
+
+def test_Resolver(taxa, mocker):
+    names = ['Homo sapiens', 'Corvus corax', 'Quercus robur', 'Pan troglodytes']
+    res = list(Resolver(NameIndex.from_taxa(taxa)).species_data_many(names))
+    assert [r[0] for r in res] == names
+    assert [bool(r[1]) for r in res] == [False, True, False, True]
+    assert isinstance(res[0][2], KeyError)
+
+    fallback = mocker.Mock(species_data_many=lambda names: (
+        (name, (1, {}), None) for name in names))
+    res = list(Resolver(NameIndex.from_taxa(taxa), fallback=fallback).species_data_many(names))
+    # Results come in the order of the names, whether they are resolved locally or not:
+    assert [(r[0], r[1][0]) for r in res] == [
+        ('Homo sapiens', 1), ('Corvus corax', 2482468), ('Quercus robur', 1),
+        ('Pan troglodytes', 2436436)]
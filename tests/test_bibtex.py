@@ -0,0 +1,32 @@
+from pyacc.bibtex import BibFile
+
+
+def test_BibFile(tmp_path):
+    p = tmp_path / 'sources.bib'
+    p.write_text("""\
+% a comment
+@string{foo = "bar"}
+@Article{a1,
+  key = {10.1/a},
+  note = {mail: a@b.org, see {nested {deep}}},
+  title = "A {"}quoted{"} title
+  over two lines",
+  year = 2001,
+  month = jan # "~1"
+}
+
+% FIXME: 10.1/c
+
+@misc(b2,
+  key = {10.1/b},
+  url = "http://example.org/@me (x)"
+)""", encoding='utf8')
+    bib = BibFile(p)
+    entries = list(bib)
+    assert [(e.genre, e.id) for e in entries] == [('article', 'a1'), ('misc', 'b2')]
+    assert entries[0].fields['note'] == 'mail: a@b.org, see {nested {deep}}'
+    assert entries[0].fields['title'] == 'A {"}quoted{"} title\n  over two lines'
+    assert entries[0].fields['month'] == 'jan~1'
+    src = bib.get(*bib.index('key')['10.1/b']).as_source()
+    assert src['url'] == 'http://example.org/@me (x)'
+    assert list(BibFile(tmp_path / 'missing.bib')) == []
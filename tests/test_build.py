@@ -0,0 +1,91 @@
+import pickle
+import threading
+
+import pytest
+
+from pyacc import ACC
+from pyacc.build import Pipeline, Stage, UP_TO_DATE, pipeline as acc_pipeline
+
+
+def _copy(src, dst):
+    def func(api, log):
+        api.calls.append(dst)
+        (api.repos / dst).write_text((api.repos / src).read_text(encoding='utf8'), encoding='utf8')
+    return func
+
+
+def _fail(api, log):
+    raise ValueError()
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    (tmp_path / 'in.txt').write_text('a', encoding='utf8')
+    return lambda *stages: Pipeline(tmp_path, [
+        Stage('b', _copy('mid.txt', 'out.txt'), ['mid.txt'], ['out.txt']),
+        Stage('a', _copy('in.txt', 'mid.txt'), ['in.txt'], ['mid.*']),
+        Stage('c', _copy('in.txt', 'other.txt'), ['in.txt', 'missing.txt'], ['other.txt']),
+    ] + list(stages))
+
+
+def test_Pipeline(pipeline, tmp_path, mocker):
+    api = mocker.Mock(repos=tmp_path, calls=[])
+    pl = pipeline()
+    assert pl.waves() == [['a', 'c'], ['b']]
+    assert pl.plan()['b'] == 'never built'
+
+    res = pl.run(lambda: api, mocker.Mock())
+    assert set(res.values()) == {'built'}
+    assert sorted(api.calls) == ['mid.txt', 'other.txt', 'out.txt']
+
+    api.calls = []
+    pl = pipeline()
+    assert set(pl.plan().values()) == {UP_TO_DATE}
+    assert set(pl.run(lambda: api, mocker.Mock()).values()) == {UP_TO_DATE}
+    assert not api.calls
+
+    (tmp_path / 'in.txt').write_text('b', encoding='utf8')
+    pl = pipeline()
+    assert pl.plan() == {'a': 'changed: in.txt', 'c': 'changed: in.txt', 'b': 'after a'}
+    pl.run(lambda: api, mocker.Mock())
+    assert (tmp_path / 'out.txt').read_text(encoding='utf8') == 'b'
+
+
+def test_Pipeline_failure(pipeline, tmp_path, mocker):
+    pl = pipeline(Stage('d', _fail, ['in.txt'], ['d.txt']), Stage('e', _fail, ['d.txt']))
+    res = pl.run(lambda: mocker.Mock(repos=tmp_path, calls=[]), mocker.Mock())
+    assert res['d'] == 'failed' and res['e'] == 'skipped'
+    assert 'd' not in pipeline().state and 'a' in pipeline().state
+
+
+def test_Pipeline_instances(pipeline, tmp_path, mocker):
+    apis = []
+
+    def api_factory():
+        apis.append(mocker.Mock(repos=tmp_path, calls=[]))
+        return apis[-1]
+
+    pipeline().run(api_factory, mocker.Mock())
+    # Each stage - including the ones run in parallel in the first wave - has its own instance:
+    assert sorted(api.calls[0] for api in apis) == ['mid.txt', 'other.txt', 'out.txt']
+    assert all(len(api.calls) == 1 for api in apis)
+
+
+def test_pipeline_snapshot(make_repos, mocker):
+    repos = make_repos(['memory'])
+    ACC(repos).experiments
+    make_repos(['memory', 'planning'])
+    # Make sure the gbif and bib stages write the experiments snapshot at the same time:
+    barrier, dump = threading.Barrier(2, timeout=5), pickle.dump
+
+    def concurrent_dump(*args, **kw):
+        barrier.wait()
+        return dump(*args, **kw)
+
+    mocker.patch('pyacc.api.pickle.dump', concurrent_dump)
+    pl = acc_pipeline(repos)
+    assert pl.waves() == [['gbif', 'bib']]
+    res = pl.run(lambda: ACC(repos), mocker.Mock())
+    assert set(res.values()) == {'built'}
+    mocker.stopall()
+    assert len(ACC(repos).experiments) == 2
@@ -0,0 +1,34 @@
+import pytest
+
+from pyacc.__main__ import main
+from pyacc.cache import Cache, MISSING
+
+
+def test_Cache(tmp_path, mocker):
+    cache = Cache(tmp_path / 'cache.sqlite', max_size=100)
+    func = mocker.Mock(return_value={'a': 1})
+    assert cache.lookup('k', func) == {'a': 1}
+    assert cache.lookup('k', func) == {'a': 1}
+    assert func.call_count == 1
+
+    cache.set('none', None, ttl=-1)
+    assert cache.get('none') is MISSING
+
+    # Exceeding max_size evicts the least recently used entries:
+    for i in range(10):
+        cache.set(str(i), 'x' * 20)
+    assert cache.get('k') is MISSING
+    assert cache.get('9') == 'x' * 20
+    assert len(Cache(tmp_path / 'cache.sqlite')) == len(cache) < 10
+
+    cache.purge()
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize('no_cache', [[], ['--no-cache']])
+def test_purge_cache(make_repos, no_cache):
+    repos = make_repos([])
+    cache = Cache(repos / '.cache' / 'http.sqlite')
+    cache.set('k', 'v')
+    main(['--repos', str(repos)] + no_cache + ['--purge-cache', 'gbif'], log=object())
+    assert len(cache) == 0
@@ -1,6 +1,51 @@
+import sys
+import json
+import time
+import subprocess
+
 from pyacc import commands
+from pyacc.__main__ import iter_commands, selected_command
+
+# Budget for the time to start `acc`, as multiple of the time to start the interpreter - generous,
+# to account for slow CI runners. Importing pyacc.__main__ takes about 6 times as long.
+IMPORT_TIME_FACTOR = 20
+HEAVY_MODULES = [
+    'openpyxl', 'pybtex', 'csvw', 'newick', 'nameparser', 'requests', 'clldutils.source']
 
 
 def test_cli():
     pass
 
+
+def test_iter_commands():
+    cmds = dict(iter_commands(commands))
+    assert 'ls' in cmds and cmds['ls'].strip()
+
+
+def test_selected_command(tmp_path):
+    repos = str(tmp_path)
+    assert selected_command(['--repos', repos, 'ls', 'gbif', '-U'], {'ls', 'gbif'}) == 'ls'
+    assert selected_command(['--repos={}'.format(repos), 'gbif'], {'ls', 'gbif'}) == 'gbif'
+    assert selected_command(['--log-level', 'DEBUG', '--profile', 'ls', '-h'], {'ls'}) == 'ls'
+    assert selected_command(['--profile-output', 'ls', 'gbif'], {'ls', 'gbif'}) == 'gbif'
+    assert selected_command(['x'], {'ls'}) is None
+    assert selected_command(['-h'], {'ls'}) is None
+
+
+def test_import():
+    code = "import sys, json; import pyacc.__main__; print(json.dumps(sorted(sys.modules)))"
+    modules = json.loads(subprocess.check_output([sys.executable, '-c', code]).decode('utf8'))
+    assert not set(HEAVY_MODULES).intersection(modules)
+
+
+def _startup_time(code, repeat=3):
+    res = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', code])
+        res.append(time.perf_counter() - start)
+    return min(res)
+
+
+def test_import_time():
+    assert _startup_time('import pyacc.__main__') < IMPORT_TIME_FACTOR * _startup_time('pass')
@@ -0,0 +1,28 @@
+from pyacc.backbone import RANKS, taxon_counts
+from pyacc.coverage import Coverage
+from pyacc.query import Column
+
+
+def _species(*names):
+    return dict(zip(RANKS, names))
+
+
+def test_Coverage():
+    backbone = [
+        _species('Chordata', 'Aves', 'Passeriformes', 'Corvidae', 'Corvus'),
+        _species('Chordata', 'Aves', 'Passeriformes', 'Corvidae', 'Corvus'),
+        _species('Chordata', 'Aves', 'Passeriformes', 'Corvidae', 'Pica'),
+        _species('Chordata', 'Mammalia', 'Primates', 'Hominidae', 'Pan'),
+    ]
+    counts = taxon_counts([Column(sp[rank] for sp in backbone) for rank in RANKS])
+    assert counts[0] == {('Chordata',): 2}
+    assert counts[4][('Chordata', 'Aves', 'Passeriformes', 'Corvidae', 'Corvus')] == 2
+
+    cov = Coverage.from_species(
+        [backbone[0], _species('Chordata', 'Aves', 'Psittaciformes', 'Psittacidae', 'Psittacus')],
+        counts)
+    assert cov.rank('class') == [(('Chordata', 'Aves'), 2, 1)]
+    # Taxa missing in the backbone have total 0:
+    assert cov.as_dict()['Chordata_Aves_Psittaciformes'] == (1, 0)
+    assert list(cov)[0] == (('Chordata',), 1, 2)
+    assert next(cov.iter_rows('phylum')) == ['phylum', 'covered_classes', 'total_classes']
@@ -0,0 +1,25 @@
+import sqlite3
+
+from pyacc import ACC
+from pyacc.database import export
+
+
+def test_export(tmp_path, make_repos):
+    repos = make_repos(['memory', 'memory'])
+    db = tmp_path / 'acc.sqlite'
+
+    res = export(ACC(repos, use_cache=False), db)
+    assert res['experiment'] == (2, 0) and res['species'] == (1, 0)
+    conn = sqlite3.connect(str(db))
+    assert conn.execute("""\
+SELECT count(*) FROM experiment AS e JOIN species AS s ON e.species_id = s.id
+WHERE s.genus = 'Corvus'""").fetchone()[0] == 2
+    assert conn.execute('SELECT title FROM source').fetchone()[0] == 'Ravens'
+    conn.close()
+
+    assert export(ACC(repos, use_cache=False), db, incremental=True)['experiment'] == (0, 0)
+    make_repos(['planning'])
+    res = export(ACC(repos, use_cache=False), db, incremental=True)
+    assert res['experiment'] == (1, 1) and res['contributor'] == (0, 0)
+    conn = sqlite3.connect(str(db))
+    assert conn.execute('SELECT area FROM experiment').fetchall() == [('planning',)]
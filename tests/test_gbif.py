@@ -0,0 +1,66 @@
+import json
+import threading
+import http.server
+import socketserver
+import urllib.parse
+
+import pytest
+
+from pyacc.gbif import GBIF, RateLimiter
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    calls = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        self.calls.append(url.path)
+        if len(self.calls) == 1:  # Make sure we retry.
+            self.send_response(503)
+            self.end_headers()
+            return
+        if url.path == '/species/match/':
+            name = urllib.parse.parse_qs(url.query)['name'][0]
+            res = {'usageKey': len(name)} if name != 'unknown' else {'matchType': 'NONE'}
+        else:
+            res = {'key': int(url.path.split('/')[-1])}
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(res).encode('utf8'))
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def api_url():
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+    Handler.calls = []
+
+
+def test_GBIF(api_url):
+    api = GBIF(api_url=api_url, workers=4, rate=None, backoff=0.01)
+    res = list(api.species_data_many(['abc', 'unknown', 'abcd']))
+    assert [r[0] for r in res] == ['abc', 'unknown', 'abcd']
+    assert res[0][1] == (3, {'key': 3})
+    assert isinstance(res[1][2], KeyError)
+    assert res[2][1][0] == 4
+    assert len(Handler.calls) == 6
+
+
+def test_RateLimiter(mocker):
+    sleep = mocker.patch('pyacc.gbif.time.sleep')
+    limiter = RateLimiter(2, burst=2)
+    for _ in range(3):
+        limiter.acquire()
+    assert sleep.call_count == 1
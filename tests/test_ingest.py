@@ -0,0 +1,117 @@
+import pytest
+from csvw import dsv
+
+from pyacc import ACC
+from pyacc.validate import COLUMNS
+
+
+def _write(path, *rows, **kw):
+    # Columns in another order and with different whitespace than in data.Sheet1.csv:
+    cols = [' '.join(c.split()) for c in reversed(COLUMNS)] + ['Notes']
+    with dsv.UnicodeWriter(path) as w:
+        w.writerow(cols)
+        for number, area in rows:
+            d = {
+                'Reviewer': kw.get('reviewer', 'Jane Doe'),
+                'Working Title': 'Review',
+                'Experiment #': str(number),
+                'Species (latin name)': 'Corvus corax',
+                'DOI': kw.get('doi', '10.1000/a'),
+                'Area': area,
+                'Cognitive ability': 'tool use',
+                'Research Kind': 'experimental',
+                'Publication Year': '2000',
+            }
+            w.writerow([d.get(c, '') for c in cols])
+    return path
+
+
+def _areas(repos):
+    return [r['Area'] for r in list(dsv.reader(repos / 'data.Sheet1.csv', dicts=True))[1:]]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_ingest(tmp_path, make_repos, workers):
+    repos = make_repos(['memory'])
+    api = ACC(repos, use_cache=False)
+    a = _write(tmp_path / 'a.csv', (1, 'memory'), (2, 'planning'))
+    b = _write(tmp_path / 'b.csv', (2, 'tool use'), (1, 'play'), reviewer='John Smith')
+    invalid = _write(tmp_path / 'invalid.csv', (1, 'memory'), doi='x')
+
+    report = api.ingest([a, b, invalid], workers=workers)
+    assert [(i.added, i.duplicates, i.conflicts) for i in report.inputs.values()] == [
+        (1, 1, 0), (2, 0, 0), (0, 0, 0)]
+    assert [(i.row, i.rule) for i in report.errors] == [(2, 'doi')]
+    assert _areas(repos) == ['memory', 'planning', 'tool use', 'play']
+    assert len(api.experiments) == 4
+
+    c = _write(tmp_path / 'c.csv', (2, 'memory'), (3, 'memory'))
+    report = api.ingest([a, b, c], workers=workers)
+    assert [i.status for i in report.inputs.values()] == ['unchanged', 'unchanged', 'merged']
+    assert [(i.row, i.rule) for i in report.errors] == [(2, 'conflict')]
+    assert 'a.csv' in report.errors[0].message
+    assert _areas(repos) == ['memory', 'planning', 'tool use', 'play', 'memory']
+
+    # A changed input replaces the rows of its previous version - and c, which supplied a
+    # conflicting row for one of them, is ingested again:
+    _write(a, (1, 'memory'), (2, 'causal reasoning'))
+    report = api.ingest([a])
+    assert list(report.inputs) == [str(a), str(c)]
+    assert [(i.added, i.conflicts) for i in report.inputs.values()] == [(1, 0), (1, 1)]
+    assert _areas(repos) == ['memory', 'tool use', 'play', 'causal reasoning', 'memory']
+
+
+def test_ingest_duplicates(tmp_path, make_repos):
+    repos = make_repos([])
+    a = _write(tmp_path / 'a.csv', (1, 'memory'))
+    b = _write(tmp_path / 'b.csv', (1, 'memory'))
+    report = ACC(repos).ingest([a, b])
+    assert report.inputs[str(b)].duplicates == 1
+
+    # The rows of a changed input are dropped - but not if an unchanged input supplies them, too:
+    _write(a, (2, 'planning'))
+    report = ACC(repos).ingest([a, b])
+    assert [(i.status, i.added) for i in report.inputs.values()] == [('merged', 1), ('merged', 1)]
+    assert _areas(repos) == ['planning', 'memory']
+    report = ACC(repos).ingest([b, a])
+    assert [i.status for i in report.inputs.values()] == ['unchanged', 'unchanged']
+
+    # Inputs are reported in the given order:
+    c = _write(tmp_path / 'c.csv', (3, 'play'))
+    report = ACC(repos).ingest([c, a, b], force=True)
+    assert list(report.inputs) == [str(c), str(a), str(b)]
+    assert _areas(repos) == ['play', 'planning', 'memory']
+
+    # Rows of removed inputs cannot be merged again:
+    d = _write(tmp_path / 'd.csv', (3, 'play'))
+    assert ACC(repos).ingest([d]).inputs[str(d)].duplicates == 1
+    d.unlink()
+    _write(c, (4, 'play'))
+    report = ACC(repos).ingest([c])
+    assert [i.path for i in report.warnings if i.rule == 'input'] == [str(d)]
+    assert _areas(repos) == ['planning', 'memory', 'play']
+
+
+def test_ingest_rebuild_index(tmp_path, make_repos):
+    repos = make_repos(['memory'])
+    a = _write(tmp_path / 'a.csv', (2, 'planning'))
+    ACC(repos).ingest([a])
+    # data.Sheet1.csv is replaced, e.g. by `acc dump`:
+    make_repos(['memory', 'planning'])
+    b = _write(tmp_path / 'b.csv', (2, 'planning'), (3, 'play'))
+    report = ACC(repos).ingest([a, b])
+    assert report.inputs[str(a)].status == 'unchanged'
+    assert report.inputs[str(b)].duplicates == 1
+    assert _areas(repos) == ['memory', 'planning', 'play']
+
+
+@pytest.mark.parametrize('content', ['a,b\n1,2\n', ''])
+def test_ingest_invalid_header(tmp_path, make_repos, content):
+    repos = make_repos(['memory'])
+    bad = tmp_path / 'bad.csv'
+    bad.write_text(content, encoding='utf8')
+    a = _write(tmp_path / 'a.csv', (2, 'planning'))
+    report = ACC(repos).ingest([bad, a], workers=1)
+    assert [(i.path, i.row, i.rule) for i in report.errors] == [(str(bad), 1, 'columns')]
+    assert report.inputs[str(bad)].rows == 0 and report.inputs[str(a)].added == 1
+    assert _areas(repos) == ['memory', 'planning']
@@ -0,0 +1,42 @@
+import io
+import json
+
+from pyacc import instrument
+from pyacc.cache import Cache
+from pyacc.__main__ import main
+
+
+def test_Recorder(tmp_path):
+    instrument.count('ignored')
+    with instrument.Recorder(trace=True) as rec:
+        with instrument.stage('outer'):
+            instrument.staged('inner')(lambda: instrument.count('rows', 5))()
+            instrument.staged('inner')(lambda: None)()
+        cache = Cache(tmp_path / 'cache.sqlite')
+        cache.lookup('k', lambda: 1)
+        cache.lookup('k', lambda: 1)
+    instrument.count('rows')
+
+    assert list(rec.stages) == ['inner', 'outer']
+    assert rec.stages['inner'].calls == 2
+    assert rec.stages['outer'].seconds >= rec.stages['inner'].seconds
+    assert rec.counters == {'rows': 5, 'cache.hits': 1, 'cache.misses': 1}
+    assert [(e['name'], e['depth']) for e in rec.events] == \
+        [('inner', 1), ('inner', 1), ('outer', 0)]
+    out = io.StringIO()
+    rec.summary(out)
+    assert 'outer' in out.getvalue() and 'cache.hits' in out.getvalue()
+
+
+def test_profile(tmp_path, capsys):
+    (tmp_path / 'data.Sheet1.csv').write_text('a\nb\n', encoding='utf8')
+    (tmp_path / 'gbif.json').write_text('{}', encoding='utf8')
+    (tmp_path / 'sources.bib').write_text('', encoding='utf8')
+    main(
+        ['--repos', str(tmp_path), '--no-cache', '--profile-output', str(tmp_path / 'p.json'),
+         'gbif'],
+        log=object())
+    assert 'command.gbif' in capsys.readouterr().err
+    trace = json.loads((tmp_path / 'p.json').read_text(encoding='utf8'))
+    assert trace['stages'][-1]['name'] == 'command.gbif'
+    assert trace['counters']['rows.parsed'] == 0
@@ -0,0 +1,23 @@
+import pytest
+
+from pyacc.names import levenshtein, Matcher
+
+
+@pytest.mark.parametrize('a,b,limit,expected', [
+    ('kitten', 'sitting', None, 3),
+    ('kitten', 'sitting', 1, 2),
+    ('abc', 'abc', 0, 0),
+    ('', 'ab', None, 2),
+])
+def test_levenshtein(a, b, limit, expected):
+    assert levenshtein(a, b, limit=limit) == expected
+
+
+def test_Matcher():
+    m = Matcher(['Pan troglodytes', 'Pan paniscus', 'Psittacus erithacus', 'Varecia variegata'])
+    assert m.best('pan troglydytes').name == 'Pan troglodytes'
+    assert m.best('Psittacus  eithacus').name == 'Psittacus erithacus'
+    # Typos in all words:
+    assert m.best('Varecya variegsta').name == 'Varecia variegata'
+    assert m.match('Pan paniscus')[0].score == 1
+    assert m.best('Homo sapiens') is None
@@ -0,0 +1,18 @@
+from pyacc.commands.order import Ordering, sortkey, sortkey_width
+
+
+def test_sortkey():
+    assert [sortkey(i) for i in range(3)] == ['a', 'b', 'c']
+    assert sortkey_width(26) == 1
+    assert sortkey_width(27) == 2
+    keys = [sortkey(i, 2) for i in range(100)]
+    assert keys[27] == 'bb'
+    assert sorted(keys) == keys
+
+
+def test_Ordering():
+    ordering = Ordering(['homo sapiens', 'pan troglodytes', 'pan paniscus'])
+    assert ordering.index('Pan paniscus') == 2
+    assert ordering.index('Homo sapiens sapiens') == 0
+    assert ordering.index('Pan sp') == 1
+    assert ordering.index('Corvus corone') == 4
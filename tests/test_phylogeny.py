@@ -0,0 +1,60 @@
+import pytest
+
+from pyacc.phylogeny import loads, read_tree, species_name, distances, ordered_species
+
+NEWICK = "((Homo_sapiens_HOMINIDAE_PRIMATES:1,Pan_troglodytes:2):1," \
+         "(Mus_musculus:3,'Rattus rattus':1):2);"
+NEXUS = """#NEXUS
+begin trees;
+    translate
+        1 Homo_sapiens,
+        2 Pan_troglodytes,
+        3 Mus_musculus
+    ;
+    tree con_50 = [&R] ((1:1,2:2):1,3:[&prob=1]5);
+end;
+"""
+
+
+def test_species_name():
+    assert species_name('Homo_sapiens_HOMINIDAE_PRIMATES') == 'Homo sapiens'
+    assert species_name("'Pan_x troglodytes'") == 'Pan_x troglodytes'
+
+
+@pytest.mark.parametrize('text', [NEWICK, NEXUS])
+def test_ordered_species(tmp_path, text):
+    p = tmp_path / 'tree'
+    p.write_text(text, encoding='utf8')
+    res = ordered_species(p)
+    assert res[:2] == [('Homo sapiens', 0), ('Pan troglodytes', 3)]
+    assert dict(res)['Mus musculus'] == 7
+
+
+def test_distances(tmp_path):
+    p = tmp_path / 'tree.nwk'
+    p.write_text(NEWICK, encoding='utf8')
+    tree = read_tree(p)
+    assert dict(distances(tree, 'Rattus rattus')) == {
+        'Homo sapiens': 5, 'Pan troglodytes': 6, 'Mus musculus': 4, 'Rattus rattus': 0}
+    with pytest.raises(ValueError):
+        distances(tree, 'Corvus corone')
+
+
+def test_loads():
+    tree = loads("((A_b:1,'C d''e': 2)x:1[&comment],E)root;")
+    assert tree.name == 'root' and [n.name for n in tree.descendants] == ['x', 'E']
+    assert [(n.name, n.length) for n in tree.descendants[0].descendants] == [
+        ('A_b', 1), ("'C d''e'", 2)]
+    for text in ['((a,b);', '(a,b));', "('a,b);"]:
+        with pytest.raises(ValueError):
+            loads(text)
+
+
+def test_ordered_species_deep(tmp_path):
+    # A caterpillar tree, deeper than the recursion limit:
+    n = 5000
+    p = tmp_path / 'tree.nwk'
+    tips = ','.join('T{}:1):1'.format(i) for i in range(n - 1))
+    p.write_text('(' * (n - 1) + 'Homo_sapiens:1,' + tips + ';', encoding='utf8')
+    res = ordered_species(p)
+    assert len(res) == n and res[1] == ('T0', 2) and res[-1] == ('T{}'.format(n - 2), n)
@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+
+from pyacc import ACC
+from pyacc.api import Experiment, GBIF
+from pyacc.build import run_command
+from pyacc.query import ExperimentTable, Column, positions
+
+
+def _experiment(doi, parameter, genus):
+    return Experiment(
+        review_title='t',
+        reviewer='Jane Doe',
+        paper_number='1',
+        experiment_number='1',
+        species='x',
+        species_latin='{} sp'.format(genus),
+        doi=doi,
+        domain='d',
+        area='a',
+        parameter=parameter,
+        sample_size='1',
+        type='other',
+        year='2000',
+        source_abstract='NA',
+        gbif=GBIF(key=1, metadata={'genus': genus, 'order': genus + 'ales'}))
+
+
+def test_ExperimentTable():
+    table = ExperimentTable([
+        _experiment('10.1000/1', 'memory', 'Pan'),
+        _experiment('10.1000/2', 'memory', 'Corvus'),
+        _experiment('10.1000/2', 'tools', 'Corvus'),
+    ])
+    assert table.select(genus='Corvus', parameter='memory') == [1]
+    assert table.select(genus=['Corvus', 'Pan']) == [0, 1, 2]
+    assert table.select(genus='Homo') == []
+    assert table.distinct('doi', genus='Corvus') == ['10.1000/2']
+    assert table.group_by('parameter', 'order') == {
+        ('memory', 'Panales'): 1, ('memory', 'Corvusales'): 1, ('tools', 'Corvusales'): 1}
+    assert table.group_by('doi', year=2000)[('10.1000/2',)] == 2
+
+
+@pytest.mark.parametrize('n', [10, 1000])
+def test_Column(n):
+    # Columns with up to 256 distinct values are masked via `bytes.translate`, others via index:
+    col = Column(i % n for i in range(3000))
+    assert col.mask(1, 2, 'x')[:4] == b'\x00\x01\x01\x00'
+    assert col.rows(3) == list(range(3, 3000, n))
+    assert col.rows('x') == []
+    assert positions(b'\x01' * 100) == list(range(100))
+
+
+def test_ls(make_repos, capsys):
+    api = ACC(make_repos(['memory', 'planning']), use_cache=False)
+    run_command('ls', [], api, logging.getLogger(__name__))
+    assert capsys.readouterr().out.count('10.1000/a') == 2
+    # A plain listing does not need the columnar table:
+    assert 'table' not in api.__dict__
+    run_command('ls', ['--filter', 'area=memory', '--group-by', 'genus'], api, None)
+    assert 'Corvus' in capsys.readouterr().out
@@ -0,0 +1,48 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from pyacc import ACC
+from pyacc.server import HTTPServer, Handler
+
+
+@pytest.fixture
+def server(make_repos):
+    repos = make_repos(['memory', 'planning'])
+    srv = HTTPServer(('127.0.0.1', 0), Handler)
+    srv.setup_dataset(lambda: ACC(repos, use_cache=False), interval=None)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _get(server, path):
+    url = 'http://127.0.0.1:{}{}'.format(server.server_address[1], path)
+    return json.loads(urllib.request.urlopen(url).read().decode('utf8'))
+
+
+def test_server(server, make_repos):
+    assert _get(server, '/')['experiments'] == 2
+    res = _get(server, '/experiments?area=memory&limit=1')
+    assert res['total'] == 1 and res['experiments'][0]['genus'] == 'Corvus'
+    assert _get(server, '/count?group_by=area') == [
+        {'area': 'memory', 'count': 1}, {'area': 'planning', 'count': 1}]
+    assert _get(server, '/count?year=2000') == 2
+    assert _get(server, '/distinct/area?area=memory') == ['memory']
+    assert _get(server, '/species/Corvus%20corax')['gbif_key'] == 1
+    assert _get(server, '/sources/10.1000/a')['title'] == 'Ravens'
+    assert _get(server, '/tree?root=Corvidae&counts=1')[0]['count'] == 2
+    for path, status in [('/experiments?nope=1', 400), ('/species/x', 404), ('/x', 404)]:
+        with pytest.raises(urllib.error.HTTPError) as e:
+            _get(server, path)
+        assert e.value.code == status
+
+    old = server.dataset
+    assert not server.reload()
+    make_repos(['memory'])
+    assert server.reload() and server.dataset is not old
+    assert _get(server, '/')['experiments'] == 1
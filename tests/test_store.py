@@ -0,0 +1,76 @@
+import json
+import warnings
+
+import pytest
+
+from pyacc.store import Store, JSONStore, SQLiteStore, open_store
+
+
+@pytest.mark.parametrize('cls', [JSONStore, SQLiteStore])
+def test_Store(tmp_path, cls):
+    store = cls(tmp_path / cls.filename)
+    assert store.fingerprint() is None and len(store) == 0
+    store.update([('b', (2, {'rank': 'SPECIES'})), ('a', (1, {}))])
+    store.flush()
+    fingerprint = store.fingerprint()
+    store.update([('c', (3, {})), ('b', (4, {'rank': 'GENUS'}))])
+    store.flush()
+    assert store.fingerprint() != fingerprint
+
+    store = cls(tmp_path / cls.filename)
+    assert list(store) == ['b', 'a', 'c']
+    assert 'a' in store and 'x' not in store
+    assert store.get('b') == [4, {'rank': 'GENUS'}]
+    assert list(store.get_many(['c', 'x', 'a', 'c'])) == ['c', 'a']
+    store.export(tmp_path / 'export.json')
+    assert json.loads((tmp_path / 'export.json').read_text(encoding='utf8')) == \
+        dict(b=[4, {'rank': 'GENUS'}], a=[1, {}], c=[3, {}])
+
+
+def test_SQLiteStore_rollback(tmp_path):
+    store = SQLiteStore(tmp_path / 'gbif.sqlite')
+
+    def items():
+        yield 'a', (1, {})
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        store.update(items())
+    assert len(store) == 0
+
+
+def test_Store_abstract():
+    with pytest.raises(TypeError):
+        Store('gbif.json')
+
+
+def test_JSONStore_flush(tmp_path, mocker):
+    store = JSONStore(tmp_path / 'gbif.json')
+    export = mocker.spy(store, 'export')
+    for i in range(3):
+        store.update([('a{}'.format(i), (i, {}))])
+    assert not store.path.exists()
+    store.flush()
+    store.flush()
+    assert export.call_count == 1
+    assert list(JSONStore(store.path)) == ['a0', 'a1', 'a2']
+
+
+def test_open_store(tmp_path):
+    assert isinstance(open_store(tmp_path), JSONStore)
+    SQLiteStore(tmp_path / 'gbif.sqlite').update([])
+    assert isinstance(open_store(tmp_path), SQLiteStore)
+
+    json_store = JSONStore(tmp_path / 'gbif.json')
+    json_store.update([('a', (1, {}))])
+    json_store.flush()
+    with pytest.warns(UserWarning, match='gbif.json'):
+        store = open_store(tmp_path)
+    assert 'a' not in store
+
+    store.load(tmp_path / 'gbif.json')
+    store.update([('b', (2, {}))])
+    store.export(tmp_path / 'gbif.json')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert list(open_store(tmp_path)) == ['a', 'b']
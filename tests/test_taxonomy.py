@@ -0,0 +1,55 @@
+import io
+import json
+
+import newick
+
+from pyacc.taxonomy import Taxonomy, newick_name
+
+RANKS = ['kingdom', 'phylum', 'class', 'genus']
+
+
+def _taxonomy():
+    tax = Taxonomy()
+    for path in [
+        ['Animalia', 'Chordata', 'Aves', 'Corvus'],
+        ['Animalia', 'Chordata', 'Aves', 'Corvus'],
+        ['Animalia', 'Chordata', 'Mammalia', 'Pan'],
+        ['Animalia', 'Arthropoda', 'Insecta', 'Apis'],
+    ]:
+        tax.add(zip(RANKS, path))
+    return tax
+
+
+def _render(tax, format, **kw):
+    fp = io.StringIO()
+    tax.write(fp, format=format, **kw)
+    return fp.getvalue()
+
+
+def test_newick_name():
+    assert newick_name('Pan troglodytes') == 'Pan_troglodytes'
+    assert newick_name("Pan (x)") == "'Pan_(x)'"
+
+
+def test_Taxonomy():
+    tax = _taxonomy()
+    assert len(tax) == 9
+    assert _render(tax, 'ascii', max_depth=2, counts=True).split('\n') == [
+        'Animalia [4]', '├── Chordata [3]', '└── Arthropoda [1]', '']
+    assert 'Arthropoda/Insecta/Apis' in _render(tax, 'ascii', collapse=True)
+
+    tree = newick.loads(_render(tax, 'newick'))[0]
+    assert len(tree.get_leaves()) == 3
+
+    data = json.loads(_render(tax, 'json', counts=True))
+    assert data[0]['count'] == 4
+    assert data[0]['children'][0]['children'][0]['name'] == 'Aves'
+
+
+def test_Taxonomy_find():
+    tax = _taxonomy()
+    assert tax.names[tax.find('Aves')] == 'Aves' and tax.find('Corvidae') is None
+    # The first of several nodes with the same name is found:
+    node = tax.find('Pan')
+    tax.add(zip(RANKS, ['Plantae', 'Tracheophyta', 'Magnoliopsida', 'Pan']))
+    assert tax.find('Pan') == node and tax.find('Plantae') == len(tax) - 3
@@ -0,0 +1,63 @@
+import pytest
+
+from pyacc import ACC
+from pyacc.validate import validate, check_row, COLUMNS
+
+
+def _row(**kw):
+    d = dict((c, '') for c in COLUMNS)
+    d.update({
+        'Reviewer': 'Jane Doe',
+        'Working Title': 'Review',
+        'Experiment #': '1',
+        'Species         (latin name)': 'Pan troglodytes',
+        'DOI': '10.1000/a',
+        'Research Kind': 'experimental',
+        'Publication Year': '2000',
+    })
+    d.update(kw)
+    return d
+
+
+def test_check_row():
+    assert not list(check_row(_row()))
+    issues = list(check_row(_row(DOI='x', **{'Research Kind': 'y', 'Publication Year': 'z'})))
+    assert [i.rule for i in issues] == ['doi', 'research-kind', 'year']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_validate(workers):
+    rows = enumerate([
+        _row(),
+        _row(DOI='invalid', **{'Research Kind': 'none'}),
+        _row(),
+        _row(**{'Experiment #': '2', 'DOI': '10.1000/b'}),
+        _row(**{'Experiment #': '3', 'Species         (latin name)': 'Homo sapiens'}),
+    ], start=3)
+    report = validate(
+        rows,
+        sources={'10.1000/a': 1, '10.1000/c': 2},
+        species={'Pan troglodytes'},
+        workers=workers,
+        chunksize=2)
+    assert report.rows == 5
+    assert [(i.row, i.rule) for i in report.issues] == [
+        (4, 'doi'), (4, 'research-kind'), (5, 'unique-id'), (6, 'source'), (7, 'gbif')]
+    assert 'see row 3' in report.issues[2].message
+    assert len(report.errors) == 3 and not report.ok
+    assert report.as_dict()['warnings'] == 2
+
+
+def test_ACC_check(tmp_path):
+    with (tmp_path / 'data.Sheet1.csv').open('w', encoding='utf8') as f:
+        f.write(','.join(COLUMNS) + '\n')
+        f.write(','.join(COLUMNS) + '\n')
+        for _ in range(2):
+            f.write(','.join(_row()[c] for c in COLUMNS) + '\n')
+    api = ACC(tmp_path)
+    assert [i.rule for i in api.validate().issues] == ['source', 'gbif', 'unique-id']
+    with pytest.raises(ValueError, match='row 4: duplicate'):
+        api.check()
+
+    (tmp_path / 'data.Sheet1.csv').write_text('a\n', encoding='utf8')
+    assert api.validate().issues[0].rule == 'columns'